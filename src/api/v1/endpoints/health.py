@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends
 from src.core.container import Container
+from src.core.metrics import metrics
 import structlog
 
 router = APIRouter()
@@ -45,6 +46,99 @@ async def health_check(container: Container = Depends(get_container)):
             "timestamp": "2024-01-01T00:00:00Z"
         }
 
+@router.get("/queue")
+async def queue_status(container: Container = Depends(get_container)):
+    """Inbound job queue depth: queued, pending (unacked) and dead-lettered jobs."""
+    try:
+        depth = await container.job_queue.depth()
+        logger.info("queue_status", depth=depth)
+        return {"status": "ok", "queue": depth}
+    except Exception as e:
+        logger.error("queue_status_failed", error=str(e))
+        return {"status": "unavailable", "error": str(e)}
+
+@router.get("/admission")
+async def admission_status(container: Container = Depends(get_container)):
+    """Admission control limits, current load and shed counts."""
+    return container.admission_controller.stats()
+
+@router.get("/metrics")
+async def metrics_snapshot(container: Container = Depends(get_container)):
+    """In-process counters and latency summaries for this API process."""
+    snapshot = metrics.snapshot()
+    counters = snapshot["counters"]
+    hits, misses = counters.get("dedup.hit", 0), counters.get("dedup.miss", 0)
+    snapshot["dedup"] = {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+    }
+    memory_hits = counters.get("extraction_cache.hit.memory", 0)
+    redis_hits = counters.get("extraction_cache.hit.redis", 0)
+    cache_misses = counters.get("extraction_cache.miss", 0)
+    lookups = memory_hits + redis_hits + cache_misses
+    snapshot["extraction_cache"] = {
+        "memory_hits": memory_hits,
+        "redis_hits": redis_hits,
+        "misses": cache_misses,
+        "hit_ratio": round((memory_hits + redis_hits) / lookups, 4) if lookups else 0.0,
+    }
+    media_exact = counters.get("media_cache.hit.exact", 0) + counters.get("media_cache.hit.redis", 0)
+    media_misses = counters.get("media_cache.miss", 0)
+    media_lookups = media_exact + media_misses
+    snapshot["media_cache"] = {
+        "exact_hits": media_exact,
+        "misses": media_misses,
+        "hit_ratio": round(media_exact / media_lookups, 4) if media_lookups else 0.0,
+    }
+    fast_hits = counters.get("fast_path.hit", 0)
+    fast_misses = counters.get("fast_path.miss", 0)
+    snapshot["fast_path"] = {
+        "hits": fast_hits,
+        "misses": fast_misses,
+        "hit_rate": round(fast_hits / (fast_hits + fast_misses), 4) if fast_hits + fast_misses else 0.0,
+        "parse_ms": snapshot["timings"].get("fast_path.parse_ms", {}),
+    }
+    routed_calls = sum(count for name, count in counters.items() if name.startswith("router.") and name.endswith(".calls"))
+    escalations = counters.get("router.escalations", 0)
+    snapshot["model_router"] = {
+        "escalations": escalations,
+        # Each escalation adds one call, so extractions = calls - escalations.
+        "escalation_rate": round(escalations / (routed_calls - escalations), 4) if routed_calls > escalations else 0.0,
+        "cost_usd": {
+            name[len("openai."):-len(".cost_usd")]: round(count, 6)
+            for name, count in counters.items()
+            if name.startswith("openai.") and name.endswith(".cost_usd")
+        },
+    }
+    snapshot["rate_limiter"] = {
+        "models": container.openai_rate_limiter.stats(),
+        "throttled": {
+            name[len("ratelimit."):-len(".throttled")]: count
+            for name, count in counters.items()
+            if name.startswith("ratelimit.") and name.endswith(".throttled")
+        },
+        "rate_limited_429": {
+            name[len("ratelimit."):-len(".429")]: count
+            for name, count in counters.items()
+            if name.startswith("ratelimit.") and name.endswith(".429")
+        },
+    }
+    timings = snapshot["timings"]
+    snapshot["hedging"] = {
+        model: {
+            "hedges_sent": counters.get(f"hedge.{model}.sent", 0),
+            "hedges_won": counters.get(f"hedge.{model}.won", 0),
+            "extra_call_rate": round(counters.get(f"hedge.{model}.sent", 0) / counters[f"hedge.{model}.calls"], 4) if counters.get(f"hedge.{model}.calls") else 0.0,
+            "p99_ms": timings[name]["p99"],
+            "primary_p99_ms": timings.get(f"hedge.{model}.primary_ms", {}).get("p99", 0),
+        }
+        for name in timings
+        if name.startswith("hedge.") and name.endswith(".latency_ms")
+        for model in [name[len("hedge."):-len(".latency_ms")]]
+    }
+    return snapshot
+
 @router.get("/ready")
 async def readiness_check(container: Container = Depends(get_container)):
     """Readiness check for Kubernetes and load balancers."""
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, Form, HTTPException
+import asyncio
+import re
+from typing import Any, Dict, List
+from xml.sax.saxutils import escape
+from fastapi import APIRouter, Depends, Form, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
 from src.core.container import Container
-from src.models.webhook import WebhookRequest
+from src.models.webhook import WebhookRequest, InboundMessage, MediaAttachment
 # from src.models.session import MessageType, MessageDirection, SessionUpdate
-from src.core.exceptions import BaseAppException
+from src.core.exceptions import BaseAppException, OverloadedError, QueueError
 from src.services.openai_service import OpenAIService
 from src.services.frappe_service import FrappeService
 from src.services.twillio_service import TwillioService
@@ -13,49 +18,78 @@ logger.info("🚀 Custom logger test: webhook.py loaded")
 router = APIRouter()
 logger = structlog.get_logger(__name__)
 
+MEDIA_URL_FIELD = re.compile(r"MediaUrl(\d+)")
+BUSY_MESSAGE = "⏳ We're receiving a lot of orders right now. Your order is queued and we'll confirm it shortly."
+RETRY_AFTER_SECONDS = 5
+
 def get_container() -> Container:
     return Container()
 
-def format_order_confirmation(order_details: str) -> str:
-    if not order_details:
-        return "✅ Order received: No order details found."
-    formatted_order = order_details.strip()
-    confirmation = f"✅ Order received:\n{formatted_order}"
-    
-    return confirmation
-
 @router.post("/webhook")
 async def webhook(
     request: WebhookRequest,
     container: Container = Depends(get_container)
 ):
+    """Process a batch of messaging events.
+
+    Events are extracted concurrently, at most ``WEBHOOK_BATCH_CONCURRENCY``
+    at a time. A failing event is reported in its own result and does not
+    fail the rest of the batch. Events the admission controller sheds are
+    reported as ``shed``; if every event was shed the batch gets a 503 so
+    the sender retries it later.
+    """
     try:
         logger = container.logger.bind(endpoint="webhook")
         logger.info("webhook_received", request=request.dict())
         
         if not request.entry:
             raise HTTPException(status_code=400, detail="No entries found in webhook request")
-            
-        for entry in request.entry:
-            if not entry.get("messaging"):
-                continue
-                
-            for message in entry["messaging"]:
-                if not message.get("message", {}).get("text"):
-                    continue
-                    
-                text = message["message"]["text"]
-                logger.info("processing_message", text=text)
-                
-                order_details = await container.openai_service.extract_order_details(text)
-                if not order_details:
-                    logger.warning("no_order_details_found", text=text)
-                    continue
-                    
-                logger.info("order_details_extracted", details=order_details.dict())
-                
-        return {"status": "success"}
+
+        semaphore = asyncio.Semaphore(max(container.settings.WEBHOOK_BATCH_CONCURRENCY, 1))
+
+        async def process_event(entry_index: int, message_index: int, message: Dict[str, Any]) -> Dict[str, Any]:
+            result = {
+                "entry": entry_index,
+                "index": message_index,
+                "message_id": message.get("message", {}).get("mid"),
+            }
+            text = message.get("message", {}).get("text")
+            if not text:
+                return {**result, "status": "skipped"}
+            try:
+                async with semaphore, container.admission_controller.admit("webhook"):
+                    logger.info("processing_message", text=text)
+                    order_details = await container.openai_service.extract_order_details(text)
+            except OverloadedError:
+                return {**result, "status": "shed"}
+            except Exception as e:
+                logger.error("message_processing_failed", entry=entry_index, index=message_index, error=str(e))
+                return {**result, "status": "error", "error": str(e)}
+            if not order_details:
+                logger.warning("no_order_details_found", text=text)
+                return {**result, "status": "no_order_found"}
+            logger.info("order_details_extracted", details=order_details.dict())
+            return {**result, "status": "processed", "order_details": order_details.dict()}
+
+        results = await asyncio.gather(*(
+            process_event(entry_index, message_index, message)
+            for entry_index, entry in enumerate(request.entry)
+            for message_index, message in enumerate(entry.get("messaging") or [])
+        ))
+
+        summary: Dict[str, int] = {}
+        for result in results:
+            summary[result["status"]] = summary.get(result["status"], 0) + 1
+        if summary.get("shed") and summary["shed"] == len(results) - summary.get("skipped", 0):
+            return JSONResponse(
+                status_code=503,
+                content={"status": "busy", "summary": summary, "results": results},
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+        return {"status": "success", "summary": summary, "results": results}
         
+    except HTTPException:
+        raise
     except BaseAppException as e:
         logger.error("application_error", error=str(e), exc_info=True)
         raise HTTPException(status_code=400, detail=str(e))
@@ -63,201 +97,68 @@ async def webhook(
         logger.error("unexpected_error", error=str(e), exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error") 
 
+def twiml_message(text: str) -> str:
+    return f'<?xml version="1.0" encoding="UTF-8"?><Response><Message>{escape(text)}</Message></Response>'
+
+def parse_media_attachments(form) -> List[MediaAttachment]:
+    """Collect every ``MediaUrlN``/``MediaContentTypeN`` pair from a Twilio form, in index order."""
+    indexes = sorted(
+        int(match.group(1))
+        for match in (MEDIA_URL_FIELD.fullmatch(key) for key in form.keys())
+        if match
+    )
+    return [
+        MediaAttachment(url=form[f"MediaUrl{index}"], content_type=form.get(f"MediaContentType{index}"))
+        for index in indexes
+        if form.get(f"MediaUrl{index}")
+    ]
+
 @router.post("/twilio-webhook-opt")
 async def twilio_webhook(
+    request: Request,
     From: str = Form(...),
     Body: str = Form(None),
+    MessageSid: str = Form(None),
     NumMedia: int = Form(0),
-    MediaUrl0: str = Form(None),
-    MediaContentType0: str = Form(None),
-    MediaUrl1: str = Form(None),  # Optional, can add more if needed
-    MediaContentType1: str = Form(None),
     container=Depends(get_container)
 ):
-    try:
-        from src.core.logging import logger
-        logger.info("🚀 Custom logger test: twilio_webhook endpoint entered", from_number=From)
-    except Exception as e:
-        print("Logger failed:", e)
-    try:
-        text_message = Body.strip() if Body else None
-        image_url = None
-        audio_url = None
-        pdf_url = None
+    """Accept a Twilio message and hand it to the worker queue.
 
-        if NumMedia > 0 and MediaContentType0:
-            if MediaContentType0.startswith("image/"):
-                image_url = MediaUrl0
-            elif MediaContentType0.startswith("audio/"):
-                audio_url = MediaUrl0
-            elif MediaContentType0 == "application/pdf":
-                pdf_url = MediaUrl0
+    Extraction and the reply happen in the worker (``python -m src.worker``),
+    so Twilio gets its 200 back well within its 15 second timeout. A retried
+    delivery of the same ``MessageSid`` is answered from the dedup store and
+    never enqueued twice.
+    """
+    if MessageSid:
+        existing = await container.dedup_store.claim(MessageSid)
+        if existing:
+            return {
+                "success": True,
+                "duplicate": True,
+                "status": existing.status,
+                "outcome": existing.outcome,
+            }
 
-        # TEXT HANDLING
-        if text_message:
-            try:
-                logger.info("Processing text message", from_number=From, text=text_message)
-                # session = container.session_service.add_message(
-                #     phone_number=From,
-                #     content=text_message,
-                #     message_type=MessageType.TEXT,
-                #     direction=MessageDirection.INBOUND
-                # )
-                # all_previous_messages = container.session_service.get_conversation_history(From)
-                # logger.info("Fetched previous messages", count=len(all_previous_messages))
-                order_json = await container.openai_service.extract_order_details(text_message)
-                logger.info("Order details extracted from text", order_json=order_json)
-                confirmation_message = format_order_confirmation(order_json)
-                container.twillio_service.send_message(confirmation_message, to=From)
-            except Exception as e:
-                logger.error("failed_to_process_text_order", error=str(e))
-                error_message = "⚠️ There was an error processing your order. Please try again later."
-                container.twillio_service.send_message(error_message, to=From)
-                # container.session_service.add_message(
-                #     phone_number=From,
-                #     content=error_message,
-                #     message_type=MessageType.TEXT,
-                #     direction=MessageDirection.OUTBOUND,
-                #     metadata={"error": str(e)}
-                # )
-                raise
+    media = parse_media_attachments(await request.form()) if NumMedia > 0 else []
+    message = InboundMessage(from_number=From, message_sid=MessageSid, body=Body, media=media)
 
-        # IMAGE HANDLING
-        elif image_url:
-            try:
-                logger.info("Processing image message", from_number=From, image_url=image_url)
-                # session = container.session_service.add_message(
-                #     phone_number=From,
-                #     content=f"Image: {image_url}",
-                #     message_type=MessageType.IMAGE,
-                #     direction=MessageDirection.INBOUND,
-                #     metadata={"image_url": image_url, "content_type": MediaContentType0}
-                # )
-                order_details = await container.openai_service.extract_order_from_image(image_url)
-                if order_details:
-                    logger.info("Order details extracted from image", order_details=order_details)
-                    confirmation_message = format_order_confirmation(order_details)
-                    container.twillio_service.send_message(confirmation_message, to=From)
-                else:
-                    logger.warning("No order details found in image", image_url=image_url)
-                    no_order_message = "I couldn't detect any order details in the image. Please send your order as text."
-                    container.twillio_service.send_message(no_order_message, to=From)
-                    # container.session_service.add_message(
-                    #     phone_number=From,
-                    #     content=no_order_message,
-                    #     message_type=MessageType.TEXT,
-                    #     direction=MessageDirection.OUTBOUND
-                    # )
-            except Exception as e:
-                logger.error("failed_to_process_image_order", error=str(e))
-                error_message = "⚠️ Sorry, we couldn't process the image. Please try again with a clearer photo or send it as text."
-                container.twillio_service.send_message(error_message, to=From)
-                # container.session_service.add_message(
-                #     phone_number=From,
-                #     content=error_message,
-                #     message_type=MessageType.TEXT,
-                #     direction=MessageDirection.OUTBOUND,
-                #     metadata={"error": str(e)}
-                # )
-
-        elif audio_url:
-            try:
-                logger.info("Processing audio message", from_number=From, audio_url=audio_url)
-                # session = container.session_service.add_message(
-                #     phone_number=From,
-                #     content=f"Audio: {audio_url}",
-                #     message_type=MessageType.AUDIO,
-                #     direction=MessageDirection.INBOUND,
-                #     metadata={"audio_url": audio_url, "content_type": MediaContentType0}
-                # )
-                order_details = await container.openai_service.extract_order_from_audio(audio_url)
-                if order_details:
-                    logger.info("Order details extracted from audio", order_details=order_details)
-                    # container.session_service.update_session(
-                    #     session.session_id,
-                    #     SessionUpdate(order_details=order_details)
-                    # )
-                    confirmation_message = format_order_confirmation(order_details)
-                    container.twillio_service.send_message(confirmation_message, to=From)
-                    # container.session_service.add_message(
-                    #     phone_number=From,
-                    #     content=confirmation_message,
-                    #     message_type=MessageType.TEXT,
-                    #     direction=MessageDirection.OUTBOUND
-                    # )
-                else:
-                    logger.warning("No order details found in audio", audio_url=audio_url)
-                    no_order_message = "I couldn't detect any order details in the audio. Please send your order as text or try speaking more clearly."
-                    container.twillio_service.send_message(no_order_message, to=From)
-                    # container.session_service.add_message(
-                    #     phone_number=From,
-                    #     content=no_order_message,
-                    #     message_type=MessageType.TEXT,
-                    #     direction=MessageDirection.OUTBOUND
-                    # )
-            except Exception as e:
-                logger.error("failed_to_process_audio_order", error=str(e))
-                error_message = "⚠️ Sorry, we couldn't process the audio. Please try again with clearer speech or send your order as text."
-                container.twillio_service.send_message(error_message, to=From)
-                # container.session_service.add_message(
-                #     phone_number=From,
-                #     content=error_message,
-                #     message_type=MessageType.TEXT,
-                #     direction=MessageDirection.OUTBOUND,
-                #     metadata={"error": str(e)}
-                # )
-
-        # PDF HANDLING
-        elif pdf_url:
-            try:
-                logger.info("Processing PDF message", from_number=From, pdf_url=pdf_url)
-                # session = container.session_service.add_message(
-                #     phone_number=From,
-                #     content=f"PDF: {pdf_url}",
-                #     message_type=MessageType.PDF,
-                #     direction=MessageDirection.INBOUND,
-                #     metadata={"pdf_url": pdf_url, "content_type": MediaContentType0}
-                # )
-                order_details = await container.openai_service.extract_order_from_pdf(pdf_url)
-                logger.info("Order details extracted from PDF", order_details=order_details)
-                confirmation_message = format_order_confirmation(order_details)
-                container.twillio_service.send_message(confirmation_message, to=From)
-            except Exception as e:
-                logger.error("failed_to_process_pdf_order", error=str(e))
-                error_message = "⚠️ Sorry, we couldn't process the PDF. Please try again with a different file or send your order as text."
-                container.twillio_service.send_message(error_message, to=From)
-                # container.session_service.add_message(
-                #     phone_number=From,
-                #     content=error_message,
-                #     message_type=MessageType.TEXT,
-                #     direction=MessageDirection.OUTBOUND,
-                #     metadata={"error": str(e)}
-                # )
-        else:
-            help_message = "Please send your order as text, image, audio, or PDF."
-            logger.warning("empty_or_unsupported_input", from_number=From)
-            container.twillio_service.send_message(help_message, to=From)
-            # container.session_service.add_message(
-            #     phone_number=From,
-            #     content=help_message,
-            #     message_type=MessageType.TEXT,
-            #     direction=MessageDirection.OUTBOUND
-            # )
-
-        return {"success": True}
+    try:
+        job_id = await container.job_queue.enqueue(message)
+    except QueueError as err:
+        # Let Twilio retry the delivery rather than dropping the order.
+        logger.error("failed_to_enqueue_message", from_number=From, error=str(err))
+        if MessageSid:
+            await container.dedup_store.release(MessageSid)
+        raise HTTPException(status_code=503, detail="Message queue unavailable")
 
-    except Exception as err:
-        logger.error("unexpected_error", error=str(err))
-        error_message = "❌ Internal error. Please try again later or contact support."
-        container.twillio_service.send_message(error_message, to=From)
-        # container.session_service.add_message(
-        #     phone_number=From,
-        #     content=error_message,
-        #     message_type=MessageType.TEXT,
-        #     direction=MessageDirection.OUTBOUND,
-        #     metadata={"error": str(err)}
-        # )
-        raise HTTPException(status_code=500, detail="Internal server error")
+    logger.info("twilio_message_enqueued", from_number=From, message_sid=MessageSid, job_id=job_id, num_media=len(media))
+    admission = container.admission_controller
+    if await admission.backlog_overloaded(container.job_queue) and admission.should_send_busy_notice(From):
+        # The order is queued either way; reply inline via TwiML so the
+        # sender knows a confirmation may take a while.
+        logger.warning("twilio_backlog_busy_reply", from_number=From, job_id=job_id)
+        return Response(content=twiml_message(BUSY_MESSAGE), media_type="application/xml")
+    return {"success": True, "job_id": job_id}
 
 # # New endpoint to get session information
 # @router.get("/session/{phone_number}")
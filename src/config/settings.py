@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Shipra Backend"
@@ -8,16 +9,160 @@ class Settings(BaseSettings):
     PORT: int = 8000
     
     OPENAI_API_KEY: str = "dummy_key"
-    OPENAI_MODEL: str = "gpt-3.5-turbo"
+    OPENAI_MODEL: str = "gpt-3.5-turbo"  # first (cheap) tier for text extraction
+    OPENAI_ESCALATION_MODEL: str = "gpt-4"  # used when the first tier's output fails validation
+    OPENAI_ROUTER_MIN_CONFIDENCE: float = 0.8
+    OPENAI_VISION_MODEL: str = "gpt-4o-mini"
+    OPENAI_VISION_DETAIL: str = "auto"  # "low", "high" or "auto"
+    OPENAI_TRANSCRIPTION_MODEL: str = "whisper-1"
+    OPENAI_MAX_TOKENS: int = 1000
+    
+    # Stream text/audio/PDF extraction from the last model tier so line items are resolved
+    # while the rest is generated; skips cheap-first routing and hedging, so only worth it
+    # for a slow (remote) item resolver
+    OPENAI_STREAM_ITEMS: bool = False
+    
+    # USD per 1K tokens as [prompt, completion], used for cost metrics
+    OPENAI_MODEL_COSTS: Dict[str, List[float]] = {
+        "gpt-3.5-turbo": [0.0005, 0.0015],
+        "gpt-4": [0.03, 0.06],
+        "gpt-4o-mini": [0.00015, 0.0006],
+    }
+    # Client-side budgets as [requests per minute, tokens per minute], per process
+    OPENAI_RATE_LIMITS: Dict[str, List[int]] = {
+        "gpt-3.5-turbo": [3500, 160000],
+        "gpt-4": [500, 10000],
+        "gpt-4o-mini": [500, 200000],
+        "whisper-1": [50, 0],
+    }
+    OPENAI_DEFAULT_RPM: int = 500
+    OPENAI_DEFAULT_TPM: int = 30000
+    OPENAI_MAX_RETRIES: int = 5  # retries of 429s and transient errors
+    OPENAI_BACKOFF_BASE_SECONDS: float = 1.0
+    OPENAI_BACKOFF_MAX_SECONDS: float = 30.0
+    # Hedging: resend a chat completion that is slower than this percentile of recent ones
+    OPENAI_HEDGE_ENABLED: bool = False
+    OPENAI_HEDGE_PERCENTILE: float = 95.0
+    OPENAI_HEDGE_BUDGET_RATIO: float = 0.05  # extra requests allowed, as a fraction of all requests
+    OPENAI_HEDGE_MIN_SAMPLES: int = 20
+    OPENAI_HEDGE_MIN_DELAY_SECONDS: float = 0.5
+    
+    # Local product names replaced before extraction (JSON object in the environment)
+    PRODUCT_SYNONYMS: Dict[str, str] = {
+        "badam": "Almond",
+        "kaju": "Cashew",
+        "pista": "Pistachio",
+    }
+    
+    # Parse simple "<qty> <uom> <item>" orders locally instead of calling the model
+    FAST_PATH_ENABLED: bool = True
+    
+    EXTRACTION_CACHE_MAX_ENTRIES: int = 5000
+    EXTRACTION_CACHE_TTL_SECONDS: int = 7 * 86400
+    EXTRACTION_CACHE_USE_REDIS: bool = True
+    
+    # Long inputs are extracted in chunks of about this many prompt tokens, up to
+    # EXTRACTION_MAX_PARALLEL_CHUNKS at a time per document
+    EXTRACTION_CHUNK_MAX_TOKENS: int = 1500
+    EXTRACTION_MAX_PARALLEL_CHUNKS: int = 4
+    # How many times a truncated chunk may be halved and retried
+    EXTRACTION_CHUNK_MAX_SPLITS: int = 2
+    
+    # Results for downloaded images/PDFs, by SHA-256 of the file
+    MEDIA_CACHE_MAX_ENTRIES: int = 2000
+    MEDIA_CACHE_TTL_SECONDS: int = 3 * 86400
+    MEDIA_CACHE_USE_REDIS: bool = True
     
     FRAPPE_API_URL: str = "http://localhost:8000"
     FRAPPE_API_KEY: str = "dummy_key"
     FRAPPE_API_SECRET: str = "dummy_secret"
     FRAPPE_BASE_URL: str = "http://localhost:8000"
     
+    # Local copy of Frappe's Item master, used to resolve product names to item codes
+    ITEM_CATALOG_ENABLED: bool = True
+    ITEM_CATALOG_REFRESH_SECONDS: int = 3600
+    ITEM_CATALOG_RETRY_SECONDS: int = 60  # after a failed load
+    ITEM_CATALOG_MIN_SCORE: float = 0.55  # trigram similarity needed to accept a match
+    
     TWILIO_ACCOUNT_SID: str = "dummy_sid"
     TWILIO_AUTH_TOKEN: str = "dummy_token"
     
+    # Media downloads: one pooled session, bodies streamed and capped
+    MEDIA_MAX_BYTES: int = 25 * 1024 * 1024
+    MEDIA_SPOOL_THRESHOLD_BYTES: int = 2 * 1024 * 1024  # larger files are spooled to disk
+    MEDIA_SPOOL_DIR: Optional[str] = None  # defaults to the system temp dir
+    MEDIA_POOL_SIZE: int = 20
+    MEDIA_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    MEDIA_READ_TIMEOUT_SECONDS: float = 60.0
+    
+    # Order photos are oriented, cropped, downscaled and re-encoded before the vision call
+    IMAGE_PREPROCESS_ENABLED: bool = True
+    IMAGE_MAX_LONG_EDGE: int = 1568
+    IMAGE_JPEG_QUALITY: int = 80
+    IMAGE_CROP_ENABLED: bool = True
+    IMAGE_GRAYSCALE_MAX_SATURATION: float = 40.0  # mean HSV saturation below which photos go grayscale (0 disables)
+    
+    # Voice notes larger than AUDIO_SPLIT_MIN_BYTES are trimmed and split at pauses (needs ffmpeg)
+    AUDIO_PIPELINE_ENABLED: bool = True
+    AUDIO_SPLIT_MIN_BYTES: int = 384 * 1024
+    AUDIO_TARGET_CHUNK_SECONDS: float = 40.0
+    AUDIO_MAX_CHUNK_SECONDS: float = 75.0
+    AUDIO_SILENCE_DB: float = -35.0
+    AUDIO_MIN_SILENCE_SECONDS: float = 0.35
+    AUDIO_MAX_PARALLEL_CHUNKS: int = 4
+    
+    # PDF text layer: pages read per PDF and characters sent to extraction
+    PDF_MAX_PAGES: int = 20
+    PDF_MAX_TEXT_CHARS: int = 20000
+    # Pages with less text than this (or image pages under PDF_OCR_MIN_DENSITY chars per sq. inch) are OCR'd
+    PDF_OCR_MIN_CHARS: int = 20
+    PDF_OCR_MIN_DENSITY: float = 2.0
+    # Read line items straight from PO tables when every row is recognized, skipping the model
+    PDF_TABLE_FAST_PATH_ENABLED: bool = True
+    PDF_TABLE_MAX_ITEMS: int = 200
+    
+    # OCR of scanned PDFs runs on a process pool, one task per page
+    OCR_MAX_WORKERS: int = 0  # 0 = CPU count
+    OCR_MAX_PAGES: int = 20
+    OCR_TIMEOUT_SECONDS: float = 60.0
+    # Per-page OCR renders the long edge at about OCR_TARGET_PIXELS, within the DPI bounds
+    OCR_TARGET_PIXELS: int = 3300
+    OCR_MIN_DPI: int = 150
+    OCR_MAX_DPI: int = 300
+    OCR_LANGUAGE: str = "eng"
+    
+    REDIS_URL: str = "redis://localhost:6379/0"
+    JOB_QUEUE_STREAM: str = "shipra:inbound"
+    JOB_QUEUE_GROUP: str = "order-workers"
+    JOB_QUEUE_MAXLEN: int = 100000
+    JOB_CLAIM_IDLE_MS: int = 60000
+    JOB_MAX_DELIVERIES: int = 5
+    
+    DEDUP_BACKEND: str = "redis"  # "redis" (shared) or "memory" (single process)
+    DEDUP_TTL_SECONDS: int = 86400
+    DEDUP_MAX_ENTRIES: int = 10000
+    
+    WORKER_CONCURRENCY: int = 4
+    WORKER_PREFETCH: int = 32
+    WORKER_BLOCK_MS: int = 5000
+    WORKER_RECLAIM_INTERVAL_SECONDS: float = 30.0
+    WORKER_METRICS_INTERVAL_SECONDS: float = 60.0
+    WORKER_SESSION_CLEANUP_INTERVAL_SECONDS: float = 600.0
+    # Admission control: pipeline work admitted in the API process and worker backlog limits
+    ADMISSION_MAX_IN_FLIGHT: int = 16
+    ADMISSION_MAX_WAITING: int = 32
+    ADMISSION_MAX_QUEUE_WAIT_SECONDS: float = 2.0
+    ADMISSION_MAX_BACKLOG: int = 200
+    ADMISSION_MAX_BACKLOG_AGE_SECONDS: float = 30.0
+    
+    WEBHOOK_BATCH_CONCURRENCY: int = 8  # messaging events of one /webhook batch extracted in parallel
+    MEDIA_CONCURRENCY: int = 4  # attachments of one message extracted in parallel
+    
+    # Texts from one sender arriving within this window are merged into one order (0 disables)
+    BURST_WINDOW_SECONDS: float = 4.0
+    BURST_MAX_WAIT_SECONDS: float = 15.0
+    BURST_MAX_MESSAGES: int = 10
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
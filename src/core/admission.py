@@ -0,0 +1,116 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+import structlog
+from src.core.cache import TTLCache
+from src.core.exceptions import OverloadedError
+from src.core.metrics import metrics
+
+class AdmissionController:
+    """Bounds pipeline work in the API process and sheds load beyond it.
+
+    ``admit`` lets at most ``max_in_flight`` pipeline calls run at once.
+    A caller waits for a slot at most ``max_queue_wait_seconds``, and is
+    rejected immediately when ``max_waiting`` callers are already queued,
+    so overload turns into a fast 503 instead of unbounded latency.
+
+    ``backlog_overloaded`` applies the same idea to the worker queue: when
+    too many jobs are outstanding, or the oldest has waited too long, the
+    Twilio webhook still enqueues the message but tells the sender we are
+    busy.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 16,
+        max_waiting: Optional[int] = None,
+        max_queue_wait_seconds: float = 2.0,
+        max_backlog: int = 200,
+        max_backlog_age_seconds: float = 30.0,
+        backlog_refresh_seconds: float = 1.0,
+        busy_notice_interval_seconds: float = 300.0,
+    ):
+        self.max_in_flight = max(max_in_flight, 1)
+        self.max_waiting = self.max_in_flight if max_waiting is None else max_waiting
+        self.max_queue_wait_seconds = max_queue_wait_seconds
+        self.max_backlog = max_backlog
+        self.max_backlog_age_seconds = max_backlog_age_seconds
+        self.backlog_refresh_seconds = backlog_refresh_seconds
+        self.logger = structlog.get_logger(__name__)
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._in_flight = 0
+        self._waiting = 0
+        self._backlog: Dict[str, Any] = {}
+        self._backlog_checked_at = 0.0
+        self._busy_notified: TTLCache[bool] = TTLCache(max_entries=10000, ttl_seconds=busy_notice_interval_seconds)
+
+    @asynccontextmanager
+    async def admit(self, route: str) -> AsyncIterator[None]:
+        """Hold a pipeline slot for the duration of the block, or raise ``OverloadedError``."""
+        if self._waiting >= self.max_waiting and self._in_flight >= self.max_in_flight:
+            self._shed(route, "too_many_waiting")
+        started = time.monotonic()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_queue_wait_seconds)
+        except asyncio.TimeoutError:
+            self._shed(route, "queue_wait_exceeded")
+        finally:
+            self._waiting -= 1
+        metrics.observe("admission.queue_wait_ms", (time.monotonic() - started) * 1000)
+
+        self._in_flight += 1
+        metrics.set_gauge("admission.in_flight", self._in_flight)
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            metrics.set_gauge("admission.in_flight", self._in_flight)
+            self._semaphore.release()
+
+    async def backlog_overloaded(self, job_queue) -> bool:
+        """Whether the worker queue is too deep or too old to promise a quick reply."""
+        now = time.monotonic()
+        if now - self._backlog_checked_at >= self.backlog_refresh_seconds:
+            self._backlog_checked_at = now
+            try:
+                self._backlog = await job_queue.depth()
+            except Exception as e:
+                self.logger.warning("backlog_check_failed", error=str(e))
+                self._backlog = {}
+        outstanding = self._backlog.get("pending", 0) + self._backlog.get("lag", 0)
+        oldest = self._backlog.get("oldest_job_age_seconds", 0.0)
+        overloaded = outstanding > self.max_backlog or oldest > self.max_backlog_age_seconds
+        if overloaded:
+            metrics.increment("admission.shed.twilio_backlog")
+        return overloaded
+
+    def should_send_busy_notice(self, sender: str) -> bool:
+        """True at most once per sender per ``busy_notice_interval_seconds``."""
+        return self._busy_notified.add(sender, True)
+
+    def stats(self) -> Dict[str, Any]:
+        counters = metrics.snapshot()["counters"]
+        return {
+            "limits": {
+                "max_in_flight": self.max_in_flight,
+                "max_waiting": self.max_waiting,
+                "max_queue_wait_seconds": self.max_queue_wait_seconds,
+                "max_backlog": self.max_backlog,
+                "max_backlog_age_seconds": self.max_backlog_age_seconds,
+            },
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "backlog": self._backlog,
+            "shed": {
+                name[len("admission.shed."):]: count
+                for name, count in counters.items()
+                if name.startswith("admission.shed.")
+            },
+        }
+
+    def _shed(self, route: str, reason: str) -> None:
+        metrics.increment(f"admission.shed.{route}")
+        self.logger.warning("request_shed", route=route, reason=reason, in_flight=self._in_flight, waiting=self._waiting)
+        raise OverloadedError("Server is busy, please retry shortly", details={"route": route, "reason": reason})
@@ -1,10 +1,28 @@
 from typing import Optional
+import redis.asyncio as redis
 from src.config.settings import get_settings
 from src.core.logging import get_logger
+from src.core.admission import AdmissionController
 from src.services.openai_service import OpenAIService
 from src.services.frappe_service import FrappeService
 from src.services.twillio_service import TwillioService
 from src.services.session_service import SessionService
+from src.services.order_processor import OrderProcessor
+from src.services.job_queue import JobQueue
+from src.services.dedup_store import create_dedup_store
+from src.services.extraction_cache import ExtractionCache
+from src.services.normalizer import OrderTextNormalizer
+from src.services.order_parser import FastPathOrderParser
+from src.services.model_router import ModelRouter
+from src.services.rate_limiter import OpenAIRateLimiter
+from src.services.hedging import RequestHedger
+from src.services.media_fetcher import MediaFetcher
+from src.services.media_cache import MediaCache
+from src.services.image_preprocessor import ImagePreprocessor
+from src.services.pdf_table import PdfTableParser
+from src.services.audio_pipeline import AudioPipeline
+from src.services.ocr_service import OcrService
+from src.services.item_catalog import ItemCatalog
 from src.repositories.frappe_repository import FrappeRepository
 
 class Container:
@@ -19,14 +37,122 @@ class Container:
     def _initialize(self):
         settings = get_settings()
         self.logger = get_logger("app")
-        self.openai_service = OpenAIService(settings.OPENAI_API_KEY)
+        self.redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self.extraction_cache = ExtractionCache(
+            max_entries=settings.EXTRACTION_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.EXTRACTION_CACHE_TTL_SECONDS,
+            redis_client=self.redis if settings.EXTRACTION_CACHE_USE_REDIS else None
+        )
+        self.openai_rate_limiter = OpenAIRateLimiter(
+            settings.OPENAI_RATE_LIMITS,
+            default_rpm=settings.OPENAI_DEFAULT_RPM,
+            default_tpm=settings.OPENAI_DEFAULT_TPM,
+            max_retries=settings.OPENAI_MAX_RETRIES,
+            backoff_base_seconds=settings.OPENAI_BACKOFF_BASE_SECONDS,
+            backoff_max_seconds=settings.OPENAI_BACKOFF_MAX_SECONDS
+        )
+        self.media_cache = MediaCache(
+            max_entries=settings.MEDIA_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.MEDIA_CACHE_TTL_SECONDS,
+            redis_client=self.redis if settings.MEDIA_CACHE_USE_REDIS else None
+        )
+        self.media_fetcher = MediaFetcher(
+            settings.TWILIO_ACCOUNT_SID,
+            settings.TWILIO_AUTH_TOKEN,
+            max_bytes=settings.MEDIA_MAX_BYTES,
+            spool_threshold_bytes=settings.MEDIA_SPOOL_THRESHOLD_BYTES,
+            spool_dir=settings.MEDIA_SPOOL_DIR,
+            pool_size=settings.MEDIA_POOL_SIZE,
+            connect_timeout_seconds=settings.MEDIA_CONNECT_TIMEOUT_SECONDS,
+            read_timeout_seconds=settings.MEDIA_READ_TIMEOUT_SECONDS
+        )
+        self.ocr_service = OcrService(
+            max_workers=settings.OCR_MAX_WORKERS or None,
+            max_pages=settings.OCR_MAX_PAGES,
+            timeout_seconds=settings.OCR_TIMEOUT_SECONDS,
+            language=settings.OCR_LANGUAGE
+        )
+        self.openai_service = OpenAIService(
+            settings.OPENAI_API_KEY,
+            cache=self.extraction_cache,
+            normalizer=OrderTextNormalizer(settings.PRODUCT_SYNONYMS),
+            fast_parser=FastPathOrderParser() if settings.FAST_PATH_ENABLED else None,
+            router=ModelRouter(
+                [settings.OPENAI_MODEL, settings.OPENAI_ESCALATION_MODEL],
+                min_confidence=settings.OPENAI_ROUTER_MIN_CONFIDENCE,
+                costs=settings.OPENAI_MODEL_COSTS
+            ),
+            rate_limiter=self.openai_rate_limiter,
+            hedger=RequestHedger(
+                percentile=settings.OPENAI_HEDGE_PERCENTILE,
+                budget_ratio=settings.OPENAI_HEDGE_BUDGET_RATIO,
+                min_samples=settings.OPENAI_HEDGE_MIN_SAMPLES,
+                min_delay_seconds=settings.OPENAI_HEDGE_MIN_DELAY_SECONDS
+            ) if settings.OPENAI_HEDGE_ENABLED else None,
+            media_fetcher=self.media_fetcher,
+            media_cache=self.media_cache,
+            image_preprocessor=ImagePreprocessor(
+                max_long_edge=settings.IMAGE_MAX_LONG_EDGE,
+                jpeg_quality=settings.IMAGE_JPEG_QUALITY,
+                detail=settings.OPENAI_VISION_DETAIL,
+                crop=settings.IMAGE_CROP_ENABLED,
+                grayscale_max_saturation=settings.IMAGE_GRAYSCALE_MAX_SATURATION
+            ) if settings.IMAGE_PREPROCESS_ENABLED else None,
+            audio_pipeline=AudioPipeline(
+                split_min_bytes=settings.AUDIO_SPLIT_MIN_BYTES,
+                target_chunk_seconds=settings.AUDIO_TARGET_CHUNK_SECONDS,
+                max_chunk_seconds=settings.AUDIO_MAX_CHUNK_SECONDS,
+                silence_db=settings.AUDIO_SILENCE_DB,
+                min_silence_seconds=settings.AUDIO_MIN_SILENCE_SECONDS
+            ) if settings.AUDIO_PIPELINE_ENABLED else None,
+            ocr_service=self.ocr_service,
+            table_parser=PdfTableParser(
+                max_items=settings.PDF_TABLE_MAX_ITEMS
+            ) if settings.PDF_TABLE_FAST_PATH_ENABLED else None
+        )
         self.frappe_service = FrappeService(
             base_url=settings.FRAPPE_API_URL,
             api_key=settings.FRAPPE_API_KEY,
             api_secret=settings.FRAPPE_API_SECRET
         )
+        self.item_catalog = ItemCatalog(
+            loader=self.frappe_service.get_items,
+            synonyms=settings.PRODUCT_SYNONYMS,
+            min_score=settings.ITEM_CATALOG_MIN_SCORE,
+            refresh_seconds=settings.ITEM_CATALOG_REFRESH_SECONDS,
+            retry_seconds=settings.ITEM_CATALOG_RETRY_SECONDS
+        ) if settings.ITEM_CATALOG_ENABLED else None
+        self.frappe_service.catalog = self.item_catalog
         self.twillio_service = TwillioService(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
         self.session_service = SessionService(self.logger)
+        self.order_processor = OrderProcessor(
+            self.openai_service,
+            self.twillio_service,
+            media_concurrency=settings.MEDIA_CONCURRENCY,
+            item_resolver=self.item_catalog.resolve_item if self.item_catalog else None,
+            stream_items=settings.OPENAI_STREAM_ITEMS
+        )
+        self.job_queue = JobQueue(
+            redis_client=self.redis,
+            stream=settings.JOB_QUEUE_STREAM,
+            group=settings.JOB_QUEUE_GROUP,
+            max_len=settings.JOB_QUEUE_MAXLEN,
+            claim_idle_ms=settings.JOB_CLAIM_IDLE_MS,
+            max_deliveries=settings.JOB_MAX_DELIVERIES
+        )
+        self.dedup_store = create_dedup_store(
+            backend=settings.DEDUP_BACKEND,
+            redis_client=self.redis,
+            ttl_seconds=settings.DEDUP_TTL_SECONDS,
+            max_entries=settings.DEDUP_MAX_ENTRIES
+        )
+        self.admission_controller = AdmissionController(
+            max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+            max_waiting=settings.ADMISSION_MAX_WAITING,
+            max_queue_wait_seconds=settings.ADMISSION_MAX_QUEUE_WAIT_SECONDS,
+            max_backlog=settings.ADMISSION_MAX_BACKLOG,
+            max_backlog_age_seconds=settings.ADMISSION_MAX_BACKLOG_AGE_SECONDS
+        )
         self.settings = settings
     
     def logger(self):
@@ -34,12 +160,42 @@ class Container:
     
     def openai_service(self):
         return self.openai_service
+
+    def openai_rate_limiter(self):
+        return self.openai_rate_limiter
+
+    def media_fetcher(self):
+        return self.media_fetcher
+
+    def media_cache(self):
+        return self.media_cache
+
+    def ocr_service(self):
+        return self.ocr_service
     
     def frappe_service(self):
         return self.frappe_service
+
+    def item_catalog(self):
+        return self.item_catalog
         
     def twillio_service(self):
         return self.twillio_service
     
     def session_service(self):
-        return self.session_service 
\ No newline at end of file
+        return self.session_service
+    
+    def order_processor(self):
+        return self.order_processor
+    
+    def job_queue(self):
+        return self.job_queue
+    
+    def dedup_store(self):
+        return self.dedup_store
+    
+    def admission_controller(self):
+        return self.admission_controller
+    
+    def extraction_cache(self):
+        return self.extraction_cache 
\ No newline at end of file
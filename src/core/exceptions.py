@@ -24,4 +24,26 @@ class ValidationError(BaseAppException):
 class ConfigurationException(BaseAppException):
     """Exception raised for configuration errors."""
     def __init__(self, message: str, details: Optional[Dict[str, Any]] = None):
-        super().__init__(message, status_code=500, details=details) 
\ No newline at end of file
+        super().__init__(message, status_code=500, details=details) 
+
+class QueueError(BaseAppException):
+    """Exception raised when the inbound job queue is unavailable."""
+
+class OverloadedError(BaseAppException):
+    """Exception raised when admission control sheds a request."""
+    def __init__(self, message: str, details: Optional[Dict[str, Any]] = None):
+        super().__init__(message, status_code=503, details=details)
+
+class MediaError(BaseAppException):
+    """Exception raised when an inbound media attachment cannot be downloaded."""
+
+class MediaTooLargeError(MediaError):
+    """Exception raised when an attachment exceeds the configured size cap."""
+    def __init__(self, message: str, details: Optional[Dict[str, Any]] = None):
+        super().__init__(message, status_code=413, details=details)
+
+class UnreadableMediaError(MediaError):
+    """Exception raised when a downloaded attachment cannot be read; ``user_message`` is safe to send back."""
+    def __init__(self, message: str, user_message: str, details: Optional[Dict[str, Any]] = None):
+        super().__init__(message, status_code=422, details=details)
+        self.user_message = user_message
@@ -0,0 +1,68 @@
+import threading
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict
+
+class Metrics:
+    """In-process counters, gauges and latency samples.
+
+    Each process (API server, worker) keeps its own registry; the API
+    exposes its snapshot through the health router.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._window = window
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self._window))
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record a sample (typically a latency in milliseconds)."""
+        with self._lock:
+            self._samples[name].append(value)
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def percentile(self, name: str, pct: float) -> float:
+        """Return the ``pct`` percentile (0-100) of recent samples, or 0 with no samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        return _percentile(samples, pct)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+        return {
+            "counters": counters,
+            "gauges": gauges,
+            "timings": {
+                name: {
+                    "count": len(values),
+                    "avg": round(sum(values) / len(values), 2) if values else 0,
+                    "p50": round(_percentile(values, 50), 2),
+                    "p95": round(_percentile(values, 95), 2),
+                    "p99": round(_percentile(values, 99), 2),
+                }
+                for name, values in samples.items()
+            },
+        }
+
+def _percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return float(sorted_values[index])
+
+metrics = Metrics()
@@ -0,0 +1,16 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from pydantic import BaseModel, Field
+from src.models.webhook import InboundMessage
+
+class Job(BaseModel):
+    """A unit of work read from the inbound job queue."""
+    job_id: str = Field(..., description="Redis stream entry ID")
+    message: InboundMessage = Field(..., description="The inbound message to process")
+    delivery_count: int = Field(default=1, description="How many times this job has been delivered")
+    enqueued_at: datetime = Field(..., description="Time the job was added to the stream")
+
+class ProcessingRecord(BaseModel):
+    """Processing state of an inbound message, keyed on its Twilio MessageSid."""
+    status: str = Field(..., description="'in_progress' or 'done'")
+    outcome: Optional[Dict[str, Any]] = Field(None, description="Outcome summary once processing finished")
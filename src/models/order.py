@@ -1,8 +1,16 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List
 
+class OrderLineItem(BaseModel):
+    item_name: str = Field(..., description="Standardized English product name, including size or variant")
+    quantity: float = Field(..., description="Quantity as a number")
+    uom: str = Field(..., description="Unit of measure code (CTN, PKT, KG, GM, LTR, BTL, PCS, BOX)")
+    rate: Optional[float] = Field(None, description="Price per unit as a number; null means standard rate")
+    currency: Optional[str] = Field(None, description="ISO currency code of the rate, e.g. AED or INR")
+    item_code: Optional[str] = Field(None, description="Resolved Frappe item code")
+    customer_item_code: Optional[str] = Field(None, description="The customer's own code for the item, e.g. the SKU column of their PO")
+
 class OrderDetails(BaseModel):
-    item_name: str = Field(..., description="Name of the item being ordered")
-    quantity: int = Field(..., description="Quantity as a number")
-    price: float = Field(..., description="Price per unit as a number")
-    supplier: str = Field(..., description="Name of the supplier")
\ No newline at end of file
+    items: List[OrderLineItem] = Field(default_factory=list, description="Ordered line items")
+    customer_name: Optional[str] = Field(None, description="Customer the order is for")
+    instructions: Optional[str] = Field(None, description="Special instructions, if any")
@@ -1,7 +1,21 @@
+from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 
 class WebhookRequest(BaseModel):
     object: str = Field(..., description="Object type")
     entry: List[Dict[str, Any]] = Field(..., description="List of entries")
-    messaging: Optional[List[Dict[str, Any]]] = Field(None, description="List of messaging events") 
\ No newline at end of file
+    messaging: Optional[List[Dict[str, Any]]] = Field(None, description="List of messaging events")
+
+class MediaAttachment(BaseModel):
+    """A single media item attached to an inbound Twilio message."""
+    url: str = Field(..., description="Twilio media URL")
+    content_type: Optional[str] = Field(None, description="MIME type reported by Twilio")
+
+class InboundMessage(BaseModel):
+    """An inbound WhatsApp message as received by the Twilio webhook."""
+    from_number: str = Field(..., description="Sender, as given in the Twilio 'From' field")
+    message_sid: Optional[str] = Field(None, description="Twilio MessageSid, used to drop duplicate deliveries")
+    body: Optional[str] = Field(None, description="Text body of the message")
+    media: List[MediaAttachment] = Field(default_factory=list, description="Attached media items")
+    received_at: datetime = Field(default_factory=datetime.utcnow, description="Time the webhook was received")
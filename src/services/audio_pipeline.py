@@ -0,0 +1,219 @@
+import asyncio
+import re
+import shutil
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import structlog
+from src.core.metrics import metrics
+from src.services.media_fetcher import FetchedMedia
+
+# (extension, MIME type) Whisper is told for each container we can recognise.
+AUDIO_FORMATS = {
+    "ogg": ("ogg", "audio/ogg"),
+    "wav": ("wav", "audio/wav"),
+    "mp3": ("mp3", "audio/mpeg"),
+    "m4a": ("m4a", "audio/mp4"),
+    "webm": ("webm", "audio/webm"),
+    "flac": ("flac", "audio/flac"),
+    "amr": ("amr", "audio/amr"),
+}
+CONTENT_TYPE_FORMATS = {
+    "audio/ogg": "ogg", "audio/opus": "ogg", "audio/wav": "wav", "audio/x-wav": "wav",
+    "audio/mpeg": "mp3", "audio/mp3": "mp3", "audio/mp4": "m4a", "audio/aac": "m4a",
+    "audio/x-m4a": "m4a", "audio/webm": "webm", "audio/flac": "flac", "audio/amr": "amr",
+}
+# Containers Whisper rejects; these are always converted when ffmpeg is available.
+UNSUPPORTED_FORMATS = {"amr"}
+
+# Chunks shorter than this are not worth a separate request.
+MIN_CHUNK_SECONDS = 5.0
+
+DURATION = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+SILENCE_START = re.compile(r"silence_start:\s*(-?\d+(?:\.\d+)?)")
+SILENCE_END = re.compile(r"silence_end:\s*(\d+(?:\.\d+)?)")
+
+def detect_audio_format(header: bytes, content_type: Optional[str] = None) -> str:
+    """Container format from the file's magic bytes, falling back to the content type."""
+    if header.startswith(b"OggS"):
+        return "ogg"
+    if header.startswith(b"RIFF") and header[8:12] == b"WAVE":
+        return "wav"
+    if header.startswith(b"ID3") or header[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "mp3"
+    if header[4:8] == b"ftyp":
+        return "m4a"
+    if header.startswith(b"\x1a\x45\xdf\xa3"):
+        return "webm"
+    if header.startswith(b"fLaC"):
+        return "flac"
+    if header.startswith(b"#!AMR"):
+        return "amr"
+    base_type = (content_type or "").split(";")[0].strip().lower()
+    return CONTENT_TYPE_FORMATS.get(base_type, "ogg")
+
+def parse_silences(log: str) -> Tuple[Optional[float], List[Tuple[float, Optional[float]]]]:
+    """Duration and (start, end) silences from ffmpeg ``silencedetect`` output; end is None if the file ends silent."""
+    duration = None
+    match = DURATION.search(log)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    silences: List[Tuple[float, Optional[float]]] = []
+    for line in log.splitlines():
+        start = SILENCE_START.search(line)
+        if start:
+            silences.append((max(float(start.group(1)), 0.0), None))
+            continue
+        end = SILENCE_END.search(line)
+        if end and silences and silences[-1][1] is None:
+            silences[-1] = (silences[-1][0], float(end.group(1)))
+    return duration, silences
+
+def plan_chunks(
+    duration: float,
+    silences: List[Tuple[float, Optional[float]]],
+    target_seconds: float,
+    max_seconds: float,
+) -> List[Tuple[float, float]]:
+    """Split [speech start, speech end] into chunks cut in the middle of silences.
+
+    Leading and trailing silence is dropped. Each cut is made at the silence
+    closest to ``target_seconds`` into the chunk (but no further than
+    ``max_seconds``); with no silence in reach, the chunk is cut hard at
+    ``max_seconds``.
+    """
+    start, end = 0.0, duration
+    if silences and silences[0][0] <= 0.05 and silences[0][1] is not None:
+        start = silences[0][1]
+    if silences and (silences[-1][1] is None or silences[-1][1] >= duration - 0.05):
+        end = min(end, silences[-1][0])
+    if end <= start:
+        return []
+    cut_points = [(s + (e if e is not None else duration)) / 2 for s, e in silences]
+    chunks = []
+    while end - start > max_seconds:
+        candidates = [cut for cut in cut_points if start + MIN_CHUNK_SECONDS <= cut <= start + max_seconds]
+        cut = min(candidates, key=lambda point: abs(point - start - target_seconds)) if candidates else start + max_seconds
+        chunks.append((start, cut))
+        start = cut
+    chunks.append((start, end))
+    return chunks
+
+@dataclass
+class AudioChunk:
+    index: int
+    data: bytes
+    filename: str
+    content_type: str
+    start: float = 0.0
+    end: Optional[float] = None
+
+class AudioPipeline:
+    """Prepares voice notes for Whisper.
+
+    Every note is labelled with its real container format. Notes under
+    ``split_min_bytes`` (a minute or two of WhatsApp Opus) go up as they
+    are. Longer ones are run through ffmpeg: one ``silencedetect`` pass
+    finds the speech bounds and pauses, leading and trailing silence is
+    trimmed, and the speech is cut at pauses into chunks of about
+    ``target_chunk_seconds`` (re-encoded as mono 16 kHz Opus) that can be
+    transcribed concurrently. Without ffmpeg on PATH the whole file is sent.
+    """
+
+    def __init__(
+        self,
+        split_min_bytes: int = 384 * 1024,
+        target_chunk_seconds: float = 40.0,
+        max_chunk_seconds: float = 75.0,
+        silence_db: float = -35.0,
+        min_silence_seconds: float = 0.35,
+        ffmpeg_path: Optional[str] = None,
+    ):
+        self.split_min_bytes = split_min_bytes
+        self.target_chunk_seconds = target_chunk_seconds
+        self.max_chunk_seconds = max(max_chunk_seconds, target_chunk_seconds)
+        self.silence_db = silence_db
+        self.min_silence_seconds = min_silence_seconds
+        self.ffmpeg = ffmpeg_path or shutil.which("ffmpeg")
+        self.logger = structlog.get_logger(__name__)
+        if not self.ffmpeg:
+            self.logger.warning("ffmpeg_not_found_audio_sent_unsplit")
+
+    async def prepare(self, media: FetchedMedia) -> List[AudioChunk]:
+        with media.open() as handle:
+            header = handle.read(16)
+        audio_format = detect_audio_format(header, media.content_type)
+        extension, content_type = AUDIO_FORMATS[audio_format]
+        needs_conversion = audio_format in UNSUPPORTED_FORMATS
+        if not self.ffmpeg or (media.size < self.split_min_bytes and not needs_conversion):
+            return [AudioChunk(0, media.read(), f"audio.{extension}", content_type)]
+
+        started = time.perf_counter()
+        try:
+            duration, silences = await self._detect_silences(media)
+            if duration is None:
+                raise RuntimeError("ffmpeg did not report a duration")
+            spans = plan_chunks(duration, silences, self.target_chunk_seconds, self.max_chunk_seconds)
+            if not spans:
+                self.logger.info("audio_is_silent", url=media.url, duration=duration)
+                return []
+            chunks = await asyncio.gather(*(
+                self._encode(media, index, start, end) for index, (start, end) in enumerate(spans)
+            ))
+        except Exception as e:
+            self.logger.warning("audio_split_failed_sending_whole", url=media.url, error=str(e))
+            return [AudioChunk(0, media.read(), f"audio.{extension}", content_type)]
+
+        speech = sum(end - start for start, end in spans)
+        metrics.observe("audio.prepare_ms", (time.perf_counter() - started) * 1000)
+        metrics.increment("audio.trimmed_seconds", max(duration - speech, 0.0))
+        self.logger.info(
+            "audio_split",
+            url=media.url,
+            format=audio_format,
+            duration=round(duration, 1),
+            speech_seconds=round(speech, 1),
+            chunks=len(chunks),
+        )
+        return list(chunks)
+
+    def _input_args(self, media: FetchedMedia) -> Tuple[List[str], Optional[bytes]]:
+        if media.spooled:
+            return ["-i", media.path], None
+        return ["-i", "pipe:0"], media.read()
+
+    async def _run(self, args: List[str], stdin: Optional[bytes]) -> Tuple[bytes, bytes]:
+        # -nostdin stops ffmpeg reading the terminal; it must be left out when the input is piped.
+        options = ["-hide_banner"] + (["-nostdin"] if stdin is None else [])
+        process = await asyncio.create_subprocess_exec(
+            self.ffmpeg, *options, *args,
+            stdin=asyncio.subprocess.PIPE if stdin is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await process.communicate(stdin)
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with {process.returncode}: {stderr.decode(errors='replace')[-300:]}")
+        return stdout, stderr
+
+    async def _detect_silences(self, media: FetchedMedia) -> Tuple[Optional[float], List[Tuple[float, Optional[float]]]]:
+        input_args, stdin = self._input_args(media)
+        _, stderr = await self._run(
+            input_args + [
+                "-af", f"silencedetect=noise={self.silence_db}dB:d={self.min_silence_seconds}",
+                "-f", "null", "-",
+            ],
+            stdin,
+        )
+        return parse_silences(stderr.decode(errors="replace"))
+
+    async def _encode(self, media: FetchedMedia, index: int, start: float, end: float) -> AudioChunk:
+        input_args, stdin = self._input_args(media)
+        stdout, _ = await self._run(
+            ["-ss", f"{start:.3f}", "-to", f"{end:.3f}"] + input_args + [
+                "-vn", "-ac", "1", "-ar", "16000", "-c:a", "libopus", "-b:a", "24k", "-f", "ogg", "pipe:1",
+            ],
+            stdin,
+        )
+        return AudioChunk(index, stdout, f"chunk-{index}.ogg", "audio/ogg", start, end)
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional
+import structlog
+from src.core.metrics import metrics
+from src.models.job import Job
+from src.models.session import MessageDirection, MessageType
+from src.models.webhook import InboundMessage
+from src.services.session_service import SessionService
+
+FlushCallback = Callable[[List[Job], InboundMessage], None]
+
+class _Burst:
+    __slots__ = ("jobs", "started_at", "timer")
+
+    def __init__(self, started_at: float):
+        self.jobs: List[Job] = []
+        self.started_at = started_at
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+class BurstCoalescer:
+    """Merges rapid-fire text messages from one sender into a single order.
+
+    Texts are held with their jobs in the sender's open burst. The burst is
+    flushed once the sender has been quiet for ``window_seconds`` (or
+    ``max_wait_seconds`` after the first text, or after ``max_messages``
+    texts); the texts are then joined in arrival order, recorded in the
+    sender's session as one message and handed to ``on_flush``, so the
+    burst costs one extraction and one reply.
+    """
+
+    def __init__(
+        self,
+        session_service: SessionService,
+        on_flush: FlushCallback,
+        window_seconds: float = 4.0,
+        max_wait_seconds: float = 15.0,
+        max_messages: int = 10,
+    ):
+        self.session_service = session_service
+        self.on_flush = on_flush
+        self.window_seconds = window_seconds
+        self.max_wait_seconds = max(max_wait_seconds, window_seconds)
+        self.max_messages = max(max_messages, 1)
+        self.logger = structlog.get_logger(__name__)
+        self._bursts: Dict[str, _Burst] = {}
+
+    @property
+    def buffered(self) -> int:
+        """Jobs held in open bursts."""
+        return sum(len(burst.jobs) for burst in self._bursts.values())
+
+    def accepts(self, message: InboundMessage) -> bool:
+        return self.window_seconds > 0 and bool(message.body and message.body.strip()) and not message.media
+
+    def add(self, job: Job) -> None:
+        sender = job.message.from_number
+        now = time.monotonic()
+        burst = self._bursts.get(sender)
+        if burst is None:
+            burst = _Burst(started_at=now)
+            self._bursts[sender] = burst
+        burst.jobs.append(job)
+
+        if len(burst.jobs) >= self.max_messages:
+            self.flush(sender)
+            return
+        if burst.timer:
+            burst.timer.cancel()
+        delay = min(self.window_seconds, self.max_wait_seconds - (now - burst.started_at))
+        burst.timer = asyncio.get_running_loop().call_later(max(delay, 0), self.flush, sender)
+
+    def flush(self, sender: str) -> None:
+        """Close the sender's open burst, if any, and hand it to ``on_flush``."""
+        burst = self._bursts.pop(sender, None)
+        if burst is None:
+            return
+        if burst.timer:
+            burst.timer.cancel()
+
+        message = self._merge(sender, burst.jobs)
+        self.session_service.add_message(
+            phone_number=sender,
+            content=message.body,
+            message_type=MessageType.TEXT,
+            direction=MessageDirection.INBOUND,
+            metadata={"burst_messages": len(burst.jobs), "message_sids": [job.message.message_sid for job in burst.jobs]},
+        )
+        metrics.increment("burst.flushes")
+        metrics.increment("burst.messages", len(burst.jobs))
+        if len(burst.jobs) > 1:
+            self.logger.info("burst_coalesced", from_number=sender, messages=len(burst.jobs))
+        self.on_flush(burst.jobs, message)
+
+    def flush_all(self) -> None:
+        for sender in list(self._bursts):
+            self.flush(sender)
+
+    @staticmethod
+    def _merge(sender: str, jobs: List[Job]) -> InboundMessage:
+        first = jobs[0].message
+        return InboundMessage(
+            from_number=sender,
+            message_sid=first.message_sid,
+            body="\n".join(job.message.body.strip() for job in jobs),
+            received_at=first.received_at,
+        )
@@ -0,0 +1,56 @@
+from typing import List
+from src.services.rate_limiter import CHARS_PER_TOKEN
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def chunk_sections(sections: List[str], max_tokens: int) -> List[str]:
+    """Pack ``sections`` (e.g. PDF pages) into chunks of about ``max_tokens`` each.
+
+    Whole sections are kept together where they fit; a section larger than
+    the budget is split between lines, so a table row is never cut in two.
+    A single line over the budget becomes a chunk of its own.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    used = 0
+
+    def flush() -> None:
+        nonlocal current, used
+        if current:
+            chunks.append("\n".join(current))
+        current, used = [], 0
+
+    for section in sections:
+        if not section:
+            continue
+        cost = estimate_tokens(section)
+        if cost <= max_tokens:
+            if used + cost > max_tokens:
+                flush()
+            current.append(section)
+            used += cost
+            continue
+        for line in section.splitlines():
+            cost = estimate_tokens(line)
+            if current and used + cost > max_tokens:
+                flush()
+            current.append(line)
+            used += cost
+        # Start the next section on a fresh chunk rather than mid-page.
+        flush()
+    flush()
+    return chunks
+
+def split_in_half(text: str) -> List[str]:
+    """Split ``text`` into two parts of similar size between lines ([text] if it is one line)."""
+    lines = text.splitlines()
+    if len(lines) < 2:
+        return [text]
+    half = len(text) / 2
+    size = 0
+    for index, line in enumerate(lines[:-1], start=1):
+        size += len(line) + 1
+        if size >= half:
+            break
+    return ["\n".join(lines[:index]), "\n".join(lines[index:])]
@@ -0,0 +1,95 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+import redis.asyncio as redis
+import structlog
+from src.core.cache import TTLCache
+from src.core.metrics import metrics
+from src.models.job import ProcessingRecord
+
+IN_PROGRESS = "in_progress"
+DONE = "done"
+
+class DedupStore(ABC):
+    """Remembers which Twilio messages were already accepted.
+
+    ``claim`` atomically marks a MessageSid as in progress. It returns None
+    for a first delivery and the existing record for a duplicate, so a
+    Twilio retry never reaches OpenAI a second time.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.logger = structlog.get_logger(__name__)
+
+    async def claim(self, message_sid: str) -> Optional[ProcessingRecord]:
+        record = await self._claim(message_sid)
+        if record is None:
+            metrics.increment("dedup.miss")
+        else:
+            metrics.increment("dedup.hit")
+            self.logger.info("duplicate_delivery", message_sid=message_sid, status=record.status)
+        return record
+
+    @abstractmethod
+    async def complete(self, message_sid: str, outcome: Dict[str, Any]) -> None:
+        """Record the outcome of a processed message."""
+
+    @abstractmethod
+    async def release(self, message_sid: str) -> None:
+        """Forget a claim so that a later delivery is processed again."""
+
+    @abstractmethod
+    async def _claim(self, message_sid: str) -> Optional[ProcessingRecord]:
+        """Mark ``message_sid`` in progress unless it is known; returns the existing record if it is."""
+
+class InMemoryDedupStore(DedupStore):
+    """LRU-bounded store; only deduplicates within a single process."""
+
+    def __init__(self, ttl_seconds: int, max_entries: int = 10000):
+        super().__init__(ttl_seconds)
+        self._records: TTLCache[ProcessingRecord] = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    async def _claim(self, message_sid: str) -> Optional[ProcessingRecord]:
+        if self._records.add(message_sid, ProcessingRecord(status=IN_PROGRESS)):
+            return None
+        return self._records.get(message_sid) or ProcessingRecord(status=IN_PROGRESS)
+
+    async def complete(self, message_sid: str, outcome: Dict[str, Any]) -> None:
+        self._records.set(message_sid, ProcessingRecord(status=DONE, outcome=outcome))
+
+    async def release(self, message_sid: str) -> None:
+        self._records.delete(message_sid)
+
+class RedisDedupStore(DedupStore):
+    """Store shared by every API and worker process through Redis."""
+
+    def __init__(self, redis_client: redis.Redis, ttl_seconds: int, prefix: str = "shipra:dedup:"):
+        super().__init__(ttl_seconds)
+        self.redis = redis_client
+        self.prefix = prefix
+
+    async def _claim(self, message_sid: str) -> Optional[ProcessingRecord]:
+        key = self.prefix + message_sid
+        claimed = await self.redis.set(
+            key, ProcessingRecord(status=IN_PROGRESS).json(), nx=True, ex=self.ttl_seconds
+        )
+        if claimed:
+            return None
+        raw = await self.redis.get(key)
+        if raw is None:
+            # Expired between SET and GET; treat it as still being handled.
+            return ProcessingRecord(status=IN_PROGRESS)
+        return ProcessingRecord(**json.loads(raw))
+
+    async def complete(self, message_sid: str, outcome: Dict[str, Any]) -> None:
+        record = ProcessingRecord(status=DONE, outcome=outcome)
+        await self.redis.set(self.prefix + message_sid, record.json(), ex=self.ttl_seconds)
+
+    async def release(self, message_sid: str) -> None:
+        await self.redis.delete(self.prefix + message_sid)
+
+def create_dedup_store(backend: str, redis_client: redis.Redis, ttl_seconds: int, max_entries: int) -> DedupStore:
+    if backend == "memory":
+        return InMemoryDedupStore(ttl_seconds=ttl_seconds, max_entries=max_entries)
+    return RedisDedupStore(redis_client, ttl_seconds=ttl_seconds)
@@ -0,0 +1,64 @@
+import hashlib
+from typing import Optional, Union
+import redis.asyncio as redis
+import structlog
+from src.core.cache import TTLCache
+from src.core.metrics import metrics
+
+class ExtractionCache:
+    """Content-addressed cache of order extraction results.
+
+    Keys are a SHA-256 over (input kind, normalized input, prompt version,
+    model), so an identical order text, or the same downloaded file, never
+    pays for a second model call while the entry lives. Lookups go to the
+    in-process LRU first and then to Redis when a client is configured;
+    Redis hits are copied into the LRU.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        ttl_seconds: int = 7 * 86400,
+        redis_client: Optional[redis.Redis] = None,
+        prefix: str = "shipra:extract:",
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.redis = redis_client
+        self.prefix = prefix
+        self.logger = structlog.get_logger(__name__)
+        self._local: TTLCache[str] = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    @staticmethod
+    def make_key(kind: str, payload: Union[str, bytes], model: str, prompt_version: str) -> str:
+        digest = hashlib.sha256()
+        for part in (kind, model, prompt_version):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        digest.update(payload.encode("utf-8") if isinstance(payload, str) else payload)
+        return digest.hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self._local.get(key)
+        if value is not None:
+            metrics.increment("extraction_cache.hit.memory")
+            return value
+        if self.redis is not None:
+            try:
+                value = await self.redis.get(self.prefix + key)
+            except Exception as e:
+                self.logger.warning("extraction_cache_redis_get_failed", error=str(e))
+                value = None
+            if value is not None:
+                metrics.increment("extraction_cache.hit.redis")
+                self._local.set(key, value)
+                return value
+        metrics.increment("extraction_cache.miss")
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        self._local.set(key, value)
+        if self.redis is not None:
+            try:
+                await self.redis.set(self.prefix + key, value, ex=self.ttl_seconds)
+            except Exception as e:
+                self.logger.warning("extraction_cache_redis_set_failed", error=str(e))
@@ -1,21 +1,55 @@
+import json
 import httpx
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from src.core.exceptions import FrappeError
 from src.core.logging import LoggerAdapter
 from src.models.order import OrderDetails
 from src.repositories.frappe_repository import FrappeRepository
+from src.services.item_catalog import ItemCatalog
+
+ITEM_FIELDS = ["item_code", "item_name", "stock_uom"]
 
 class FrappeService:
     """Service for Frappe operations."""
     
-    def __init__(self, base_url: str, api_key: str, api_secret: str):
+    def __init__(self, base_url: str, api_key: str, api_secret: str, catalog: Optional[ItemCatalog] = None):
         self.base_url = base_url
         self.api_key = api_key
         self.api_secret = api_secret
         self.client = httpx.AsyncClient(base_url=base_url)
+        self.catalog = catalog
+    
+    async def get_items(self, page_size: int = 500) -> List[Dict[str, Any]]:
+        """All enabled sales items from Frappe's Item resource, page by page."""
+        items: List[Dict[str, Any]] = []
+        while True:
+            response = await self.client.get(
+                "/api/resource/Item",
+                params={
+                    "fields": json.dumps(ITEM_FIELDS),
+                    "filters": json.dumps([["disabled", "=", 0], ["is_sales_item", "=", 1]]),
+                    "limit_start": len(items),
+                    "limit_page_length": page_size
+                },
+                headers={
+                    "Authorization": f"token {self.api_key}:{self.api_secret}"
+                }
+            )
+            if response.status_code != 200:
+                raise FrappeError(f"Failed to fetch items: {response.text}")
+            page = response.json().get("data", [])
+            items.extend(page)
+            if len(page) < page_size:
+                return items
     
     async def create_order(self, order_details: OrderDetails) -> dict:
         try:
+            if self.catalog:
+                # Frappe only accepts exact item codes; map model-written names through the local catalog.
+                await self.catalog.refresh()
+                order_details = order_details.model_copy(
+                    update={"items": [self.catalog.resolve(item) for item in order_details.items]}
+                )
             response = await self.client.post(
                 "/api/resource/Sales Order",
                 json={
@@ -23,9 +57,10 @@ class FrappeService:
                     "delivery_date": "2024-03-20",
                     "items": [
                         {
-                            "item_code": item,
-                            "qty": 1,
-                            "rate": 100
+                            "item_code": item.item_code or item.item_name,
+                            "qty": item.quantity,
+                            **({"rate": item.rate} if item.rate is not None else {}),
+                            **({"customer_item_code": item.customer_item_code} if item.customer_item_code else {})
                         } for item in order_details.items
                     ]
                 },
@@ -48,12 +83,13 @@ class FrappeService:
             # Prepare the sales order data
             sales_order_data = {
                 "doctype": "Sales Order",
-                "customer": order_details.supplier,
+                "customer": order_details.customer_name,
                 "items": [{
-                    "item_code": order_details.item_name,
-                    "qty": order_details.quantity,
-                    "rate": order_details.price
-                }],
+                    "item_code": item.item_code or item.item_name,
+                    "qty": item.quantity,
+                    **({"rate": item.rate} if item.rate is not None else {}),
+                    **({"customer_item_code": item.customer_item_code} if item.customer_item_code else {})
+                } for item in order_details.items],
                 "status": "Draft"
             }
             
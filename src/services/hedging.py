@@ -0,0 +1,126 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+import structlog
+from src.core.metrics import _percentile, metrics
+
+T = TypeVar("T")
+
+class RequestHedger:
+    """Sends a backup request when the first one is slower than usual.
+
+    If a call has not finished after the ``percentile`` of the model's
+    recent latencies, an identical second call is started; whichever
+    finishes first wins and the other is cancelled. Hedges are paid for
+    out of a global budget that grows by ``budget_ratio`` per call (0.05
+    allows at most one hedge per 20 calls, i.e. +5% requests), so a slow
+    API cannot double spend. Nothing is hedged until ``min_samples``
+    latencies have been seen for the model.
+
+    Wrap only the API call (inside its rate limiter slot), so the latencies
+    are the API's and not the queue's; ``acquire_hedge`` is awaited before a
+    hedge goes out, so the extra request still takes a slot of its own.
+
+    ``hedge.<model>.latency_ms`` is the latency callers saw and
+    ``hedge.<model>.primary_ms`` what first requests took when they
+    finished (losers are cancelled, so it understates the unhedged tail);
+    comparing their p99s against ``hedge.<model>.sent`` (out of
+    ``hedge.<model>.calls``) shows what the extra calls buy.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        budget_ratio: float = 0.05,
+        min_samples: int = 20,
+        min_delay_seconds: float = 0.5,
+        window: int = 200,
+        max_budget: float = 10.0,
+    ):
+        self.percentile = percentile
+        self.budget_ratio = budget_ratio
+        self.min_samples = min_samples
+        self.min_delay_seconds = min_delay_seconds
+        self.max_budget = max_budget
+        self._window = window
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._budget = 0.0
+        self.logger = structlog.get_logger(__name__)
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging a ``model`` call, or None if there is too little history."""
+        samples = self._latencies.get(model)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        return max(_percentile(sorted(samples), self.percentile), self.min_delay_seconds)
+
+    def _record(self, model: str, seconds: float, primary_finished: bool = True) -> None:
+        # A cancelled primary still counts with its elapsed time so the threshold does not drift down.
+        self._latencies.setdefault(model, deque(maxlen=self._window)).append(seconds)
+        if primary_finished:
+            metrics.observe(f"hedge.{model}.primary_ms", seconds * 1000)
+
+    async def run(
+        self,
+        model: str,
+        call: Callable[[], Awaitable[T]],
+        acquire_hedge: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> T:
+        self._budget = min(self._budget + self.budget_ratio, self.max_budget)
+        metrics.increment(f"hedge.{model}.calls")
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(call())
+        try:
+            return await self._race(model, primary, call, started, acquire_hedge)
+        finally:
+            if not primary.done():
+                primary.cancel()
+            metrics.observe(f"hedge.{model}.latency_ms", (time.perf_counter() - started) * 1000)
+
+    async def _race(
+        self,
+        model: str,
+        primary: asyncio.Future,
+        call: Callable[[], Awaitable[T]],
+        started: float,
+        acquire_hedge: Optional[Callable[[], Awaitable[None]]],
+    ) -> T:
+        delay = self.hedge_delay(model)
+        if delay is not None:
+            await asyncio.wait({primary}, timeout=delay)
+        if delay is None or primary.done() or self._budget < 1.0:
+            try:
+                return await primary
+            finally:
+                if primary.done() and not primary.cancelled():
+                    self._record(model, time.perf_counter() - started)
+
+        self._budget -= 1.0
+        metrics.increment(f"hedge.{model}.sent")
+        self.logger.info("hedging_slow_request", model=model, after_ms=round(delay * 1000))
+        hedge = asyncio.ensure_future(self._hedge(call, acquire_hedge))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None:
+                    break
+            else:
+                # Both failed: surface the primary's error.
+                return primary.result()
+        finally:
+            for task in (primary, hedge):
+                if not task.done():
+                    task.cancel()
+        self._record(model, time.perf_counter() - started, primary_finished=winner is primary)
+        if winner is hedge:
+            metrics.increment(f"hedge.{model}.won")
+        return winner.result()
+
+    @staticmethod
+    async def _hedge(call: Callable[[], Awaitable[T]], acquire: Optional[Callable[[], Awaitable[None]]]) -> T:
+        if acquire:
+            await acquire()
+        return await call()
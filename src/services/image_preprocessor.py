@@ -0,0 +1,148 @@
+import io
+import math
+import time
+from dataclasses import dataclass
+from typing import BinaryIO
+import structlog
+from PIL import Image, ImageChops, ImageOps, ImageStat
+from src.core.metrics import metrics
+
+DETAIL_LEVELS = ("low", "high", "auto")
+# Long edge the vision API itself scales "low" detail images to.
+LOW_DETAIL_EDGE = 512
+
+def vision_tokens(width: int, height: int, detail: str = "auto") -> int:
+    """Tokens the vision API bills for an image of this size.
+
+    "low" is a flat 85. Otherwise the image is fitted into 2048x2048, its
+    short side scaled to 768, and each 512px tile costs 170 on top of 85.
+    """
+    if detail == "low":
+        return 85
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    content_type: str
+    width: int
+    height: int
+    detail: str
+    original_bytes: int
+    original_tokens: int
+
+    @property
+    def tokens(self) -> int:
+        return vision_tokens(self.width, self.height, self.detail)
+
+class ImagePreprocessor:
+    """Shrinks order photos before they are sent to the vision model.
+
+    Auto-orients from EXIF, crops to the document when it stands out from
+    the background, downscales to ``max_long_edge`` (512 for "low" detail),
+    converts low-saturation photos (printed or handwritten text) to
+    grayscale and re-encodes as JPEG at ``jpeg_quality``. CPU-bound: call
+    ``prepare`` from a worker thread.
+    """
+
+    def __init__(
+        self,
+        max_long_edge: int = 1568,
+        jpeg_quality: int = 80,
+        detail: str = "auto",
+        crop: bool = True,
+        grayscale_max_saturation: float = 40.0,
+    ):
+        if detail not in DETAIL_LEVELS:
+            raise ValueError(f"detail must be one of {DETAIL_LEVELS}")
+        self.detail = detail
+        self.max_long_edge = min(max_long_edge, LOW_DETAIL_EDGE) if detail == "low" else max_long_edge
+        self.jpeg_quality = jpeg_quality
+        self.crop = crop
+        self.grayscale_max_saturation = grayscale_max_saturation
+        self.logger = structlog.get_logger(__name__)
+
+    @property
+    def signature(self) -> str:
+        """Identifies the settings in cache keys, since they change what the model sees."""
+        return f"{self.detail}-{self.max_long_edge}-{self.jpeg_quality}-{int(self.crop)}-{self.grayscale_max_saturation:g}"
+
+    def prepare(self, source: BinaryIO, original_bytes: int) -> PreparedImage:
+        started = time.perf_counter()
+        with Image.open(source) as opened:
+            original_size = opened.size
+            # JPEG decoders can downscale by 1/2..1/8 while decoding, which is far cheaper than resizing after.
+            opened.draft("RGB", (self.max_long_edge, self.max_long_edge))
+            image = ImageOps.exif_transpose(opened).convert("RGB")
+
+        if self.crop:
+            image = self._crop_to_document(image)
+        if max(image.size) > self.max_long_edge:
+            image.thumbnail((self.max_long_edge, self.max_long_edge), Image.LANCZOS)
+        grayscale = self._is_text_photo(image)
+        if grayscale:
+            image = image.convert("L")
+
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=self.jpeg_quality, optimize=True)
+        prepared = PreparedImage(
+            data=buffer.getvalue(),
+            content_type="image/jpeg",
+            width=image.width,
+            height=image.height,
+            detail=self.detail,
+            original_bytes=original_bytes,
+            original_tokens=vision_tokens(*original_size, detail=self.detail),
+        )
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        metrics.observe("image.preprocess_ms", elapsed_ms)
+        metrics.increment("image.bytes_saved", max(original_bytes - len(prepared.data), 0))
+        metrics.increment("image.tokens_saved", max(prepared.original_tokens - prepared.tokens, 0))
+        self.logger.info(
+            "image_preprocessed",
+            original_size=original_size,
+            size=image.size,
+            grayscale=grayscale,
+            original_bytes=original_bytes,
+            bytes=len(prepared.data),
+            original_tokens=prepared.original_tokens,
+            tokens=prepared.tokens,
+            elapsed_ms=round(elapsed_ms, 1),
+        )
+        return prepared
+
+    @staticmethod
+    def _crop_to_document(image: Image.Image) -> Image.Image:
+        """Crop to the region that differs from the border colour (e.g. a sheet on a table)."""
+        gray = image.convert("L")
+        small = gray.copy()
+        small.thumbnail((256, 256))
+        border = [small.getpixel((x, 0)) for x in range(small.width)] + [small.getpixel((x, small.height - 1)) for x in range(small.width)]
+        background = sorted(border)[len(border) // 2]
+        difference = ImageChops.difference(small, Image.new("L", small.size, background))
+        box = difference.point(lambda value: 255 if value > 40 else 0).getbbox()
+        if not box:
+            return image
+        left, top, right, bottom = box
+        area = (right - left) * (bottom - top) / (small.width * small.height)
+        if area < 0.2 or area > 0.9:
+            return image
+        scale_x, scale_y = image.width / small.width, image.height / small.height
+        pad_x, pad_y = 0.02 * image.width, 0.02 * image.height
+        return image.crop((
+            max(0, int(left * scale_x - pad_x)),
+            max(0, int(top * scale_y - pad_y)),
+            min(image.width, int(right * scale_x + pad_x)),
+            min(image.height, int(bottom * scale_y + pad_y)),
+        ))
+
+    def _is_text_photo(self, image: Image.Image) -> bool:
+        if self.grayscale_max_saturation <= 0:
+            return False
+        saturation = ImageStat.Stat(image.convert("HSV").getchannel("S")).mean[0]
+        return saturation <= self.grayscale_max_saturation
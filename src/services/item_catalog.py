@@ -0,0 +1,283 @@
+import asyncio
+import heapq
+import math
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+import structlog
+from src.core.metrics import metrics
+from src.models.order import OrderLineItem
+
+# Pack sizes are compared in grams / millilitres, so "1 kg" matches "1000g".
+SIZE = re.compile(r"(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>kgs?|kilos?|kilograms?|gms?|grams?|g|ltrs?|litres?|liters?|l|ml)\b")
+SIZE_FACTORS = {"kg": 1000, "kgs": 1000, "kilo": 1000, "kilos": 1000, "kilogram": 1000, "kilograms": 1000, "ltr": 1000, "ltrs": 1000, "litre": 1000, "litres": 1000, "liter": 1000, "liters": 1000, "l": 1000}
+NON_WORD = re.compile(r"[^a-z0-9 ]+")
+NONZERO_BYTE = re.compile(rb"[^\x00]")
+BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+# Score multipliers when the pack size of the name and the catalog entry disagree
+SIZE_MISMATCH_FACTOR = 0.6
+SIZE_MISSING_FACTOR = 0.9
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    item_code: str
+    item_name: str
+    size: Optional[float]
+    trigrams: FrozenSet[str]
+
+@dataclass(frozen=True)
+class ItemMatch:
+    item_code: str
+    item_name: str
+    score: float
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """Word trigrams of ``text``, each word padded like pg_trgm ("  ab", " ab ", ...)."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return frozenset(grams)
+
+def bitmap(positions: Iterable[int], size: int) -> int:
+    """``positions`` as the set bits of an int ``size`` bits wide."""
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, "little")
+
+def set_bits(mask: int) -> Iterator[int]:
+    """Positions of the set bits of a non-negative ``mask``, lowest first."""
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    for match in NONZERO_BYTE.finditer(data):
+        offset = match.start()
+        for bit in BYTE_BITS[data[offset]]:
+            yield offset * 8 + bit
+
+class ItemCatalog:
+    """In-memory copy of the Frappe Item master with a trigram index for fuzzy lookups.
+
+    Every item is indexed under its name and its code. Names are lowercased,
+    local product words are replaced using ``synonyms`` (as the order
+    normalizer does), plurals are dropped and pack sizes are parsed out, so
+    "Badam 1 kg" finds "Almond 1000g". Each trigram is indexed as a bitmap
+    over the catalog's distinct word strings (about one bit per string per
+    trigram, ~4 MB for 20,000 items), so counting the trigrams every string
+    shares with a query takes a few big-int operations. Entries are ranked
+    by Dice similarity, adjusted for pack size; the best match at or above
+    ``min_score`` wins. Results are memoized per name until the next load.
+
+    ``loader`` returns the Item records (dicts with ``item_code`` and
+    ``item_name``). The catalog loads lazily on first use, reloads every
+    ``refresh_seconds``, and after a failed load keeps what it had and tries
+    again after ``retry_seconds``.
+    """
+
+    def __init__(
+        self,
+        loader: Optional[Callable[[], Awaitable[Iterable[Dict[str, Any]]]]] = None,
+        synonyms: Optional[Dict[str, str]] = None,
+        min_score: float = 0.55,
+        refresh_seconds: float = 3600,
+        retry_seconds: float = 60,
+        memo_size: int = 10000,
+    ):
+        self.loader = loader
+        self.synonyms = {key.lower(): value.lower() for key, value in (synonyms or {}).items()}
+        self.min_score = min_score
+        self.refresh_seconds = refresh_seconds
+        self.retry_seconds = retry_seconds
+        self.memo_size = memo_size
+        self.entries: List[CatalogEntry] = []
+        self.exact: Dict[str, ItemMatch] = {}
+        self.index: Dict[str, int] = {}
+        self.groups: List[Tuple[int, List[int]]] = []
+        self.memo: Dict[str, Optional[ItemMatch]] = {}
+        self.loaded_at = 0.0
+        self.next_load_at = 0.0
+        self._lock = asyncio.Lock()
+        self.logger = structlog.get_logger(__name__)
+
+    @property
+    def item_count(self) -> int:
+        return len({entry.item_code for entry in self.entries})
+
+    def normalize(self, text: str) -> Tuple[str, Optional[float]]:
+        """Lowercased, synonym-replaced words of ``text`` without its pack size, and that size."""
+        lowered = text.lower()
+        size = None
+        match = SIZE.search(lowered)
+        if match:
+            size = float(match.group("value")) * SIZE_FACTORS.get(match.group("unit"), 1)
+            lowered = lowered[:match.start()] + " " + lowered[match.end():]
+        words = [self.synonyms.get(word, word) for word in NON_WORD.sub(" ", lowered).split()]
+        return " ".join(self._singular(word) for word in words), size
+
+    def load(self, items: Iterable[Dict[str, Any]]) -> None:
+        """Replace the catalog with ``items`` and rebuild the index."""
+        entries: List[CatalogEntry] = []
+        exact: Dict[str, ItemMatch] = {}
+        postings: Dict[str, List[int]] = defaultdict(list)
+        # Pack sizes of one product share their words, so the index is over
+        # distinct word strings and each lists the entries spelled that way.
+        word_ids: Dict[str, int] = {}
+        groups: List[Tuple[int, List[int]]] = []
+        for item in items:
+            code = item.get("item_code") or item.get("name")
+            if not code:
+                continue
+            name = item.get("item_name") or code
+            for label in dict.fromkeys((name, code)):
+                words, size = self.normalize(label)
+                if not words:
+                    continue
+                exact.setdefault(self._exact_key(words, size), ItemMatch(code, name, 1.0))
+                entries.append(CatalogEntry(code, name, size, trigrams(words)))
+                if words not in word_ids:
+                    word_ids[words] = len(groups)
+                    groups.append((len(entries[-1].trigrams), []))
+                    for gram in entries[-1].trigrams:
+                        postings[gram].append(word_ids[words])
+                groups[word_ids[words]][1].append(len(entries) - 1)
+        index = {gram: bitmap(group_ids, len(groups)) for gram, group_ids in postings.items()}
+        self.entries, self.exact, self.index, self.groups = entries, exact, index, groups
+        self.memo = {}
+        self.loaded_at = time.monotonic()
+        self.next_load_at = self.loaded_at + self.refresh_seconds
+        metrics.set_gauge("item_catalog.items", self.item_count)
+
+    async def refresh(self, force: bool = False) -> None:
+        """Load the catalog from ``loader`` if it is due (or ``force``)."""
+        if not self.loader or (not force and time.monotonic() < self.next_load_at):
+            return
+        async with self._lock:
+            if not force and time.monotonic() < self.next_load_at:
+                return
+            started = time.perf_counter()
+            try:
+                items = list(await self.loader())
+            except Exception as e:
+                self.next_load_at = time.monotonic() + self.retry_seconds
+                metrics.increment("item_catalog.load_errors")
+                self.logger.warning("item_catalog_load_failed", error=str(e), cached_items=self.item_count)
+                return
+            await asyncio.to_thread(self.load, items)
+            self.logger.info("item_catalog_loaded", items=self.item_count, load_ms=round((time.perf_counter() - started) * 1000, 1))
+
+    def search(self, name: str, k: int = 5, min_score: float = 0.0) -> List[ItemMatch]:
+        """Top ``k`` catalog items for ``name`` scoring at least ``min_score``, best first.
+
+        Scoring is exact Dice over trigrams, so the ranking equals a full
+        scan; ties go to the item listed first in the catalog. The query's
+        trigram bitmaps are added up as bit-sliced counters (one big-int
+        operation covers every word string), then word strings are scored
+        from the most shared trigrams down. Dice >= s needs at least
+        s * |q| / (2 - s) shared trigrams (size factors only lower a score),
+        so the scan stops once the current k-th best score is out of reach.
+        """
+        words, size = self.normalize(name)
+        query = trigrams(words)
+        if not query or not self.entries:
+            return []
+        query_size = len(query)
+        # counts[b] has bit i set when bit b of word string i's shared trigram count is set.
+        counts: List[int] = []
+        for gram in query:
+            carry = self.index.get(gram, 0)
+            for bit, plane in enumerate(counts):
+                if not carry:
+                    break
+                counts[bit], carry = plane ^ carry, plane & carry
+            if carry:
+                counts.append(carry)
+
+        # The highest count: keep the word strings that have each bit, from the top, where any do.
+        level, leaders = 0, -1
+        for bit in reversed(range(len(counts))):
+            if leaders & counts[bit]:
+                leaders &= counts[bit]
+                level |= 1 << bit
+        best: Dict[str, Tuple[float, int]] = {}
+        floor = min_score
+        while level >= max(1, math.ceil(floor * query_size / (2 - floor) - 1e-9)):
+            for group_id in set_bits(self._with_count(counts, level)):
+                group_size, entry_ids = self.groups[group_id]
+                base = 2 * level / (query_size + group_size)
+                if base >= floor:
+                    self._score_entries(entry_ids, base, size, min_score, best)
+            if len(best) >= k:
+                floor = max(min_score, heapq.nlargest(k, (score for score, _ in best.values()))[-1])
+            level -= 1
+        top = heapq.nsmallest(k, best.values(), key=lambda match: (-match[0], match[1]))
+        return [ItemMatch(self.entries[entry_id].item_code, self.entries[entry_id].item_name, round(score, 3)) for score, entry_id in top]
+
+    @staticmethod
+    def _with_count(counts: List[int], count: int) -> int:
+        """Bitmap of the word strings sharing exactly ``count`` (> 0) trigrams with the query."""
+        mask = -1
+        for bit, plane in enumerate(counts):
+            mask &= plane if count >> bit & 1 else ~plane
+        return mask
+
+    def _score_entries(
+        self,
+        entry_ids: List[int],
+        base: float,
+        size: Optional[float],
+        min_score: float,
+        best: Dict[str, Tuple[float, int]],
+    ) -> None:
+        """Score the entries of one word string into ``best`` (item code -> (score, entry id))."""
+        for entry_id in entry_ids:
+            entry = self.entries[entry_id]
+            score = base
+            if size is not None and entry.size is not None and abs(size - entry.size) > 1e-6:
+                score *= SIZE_MISMATCH_FACTOR
+            elif (size is None) != (entry.size is None):
+                score *= SIZE_MISSING_FACTOR
+            if score < min_score:
+                continue
+            current = best.get(entry.item_code)
+            if current is None or score > current[0] or (score == current[0] and entry_id < current[1]):
+                best[entry.item_code] = (score, entry_id)
+
+    def match(self, name: str) -> Optional[ItemMatch]:
+        """Best catalog item for ``name`` if it scores at least ``min_score``."""
+        if name in self.memo:
+            return self.memo[name]
+        words, size = self.normalize(name)
+        result = self.exact.get(self._exact_key(words, size))
+        if result is None:
+            matches = self.search(name, k=1, min_score=self.min_score)
+            result = matches[0] if matches else None
+        if len(self.memo) >= self.memo_size:
+            self.memo.clear()
+        self.memo[name] = result
+        return result
+
+    def resolve(self, item: OrderLineItem) -> OrderLineItem:
+        """``item`` with ``item_code`` set from the catalog (unchanged if nothing matches)."""
+        if item.item_code:
+            return item
+        match = self.match(item.item_name)
+        metrics.increment("item_catalog.resolved" if match else "item_catalog.unresolved")
+        if not match:
+            return item
+        return item.model_copy(update={"item_code": match.item_code})
+
+    async def resolve_item(self, item: OrderLineItem) -> OrderLineItem:
+        """Async ``resolve`` that loads or refreshes the catalog first; usable as an ``item_resolver``."""
+        await self.refresh()
+        return self.resolve(item)
+
+    @staticmethod
+    def _singular(word: str) -> str:
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            return word[:-1]
+        return word
+
+    @staticmethod
+    def _exact_key(words: str, size: Optional[float]) -> str:
+        return f"{words}|{size:g}" if size is not None else words
@@ -0,0 +1,223 @@
+import json
+import socket
+import os
+from datetime import datetime
+from typing import Any, Collection, Dict, List, Optional
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+import structlog
+from src.core.exceptions import QueueError
+from src.models.job import Job
+from src.models.webhook import InboundMessage
+
+class JobQueue:
+    """Durable inbound job queue backed by a Redis stream and consumer group.
+
+    Jobs stay in the group's pending list until they are acked, so a worker
+    that dies mid-job leaves the entry behind for another worker to reclaim.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        stream: str,
+        group: str,
+        consumer: Optional[str] = None,
+        max_len: int = 100000,
+        claim_idle_ms: int = 60000,
+        max_deliveries: int = 5,
+    ):
+        self.redis = redis_client
+        self.stream = stream
+        self.group = group
+        self.dead_letter_stream = f"{stream}:dead"
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.max_len = max_len
+        self.claim_idle_ms = claim_idle_ms
+        self.max_deliveries = max_deliveries
+        self.logger = structlog.get_logger(__name__)
+        self._group_ready = False
+
+    async def ensure_group(self) -> None:
+        """Create the consumer group (and the stream) if they do not exist yet."""
+        if self._group_ready:
+            return
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+            self.logger.info("job_queue_group_created", stream=self.stream, group=self.group)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise QueueError("Failed to create consumer group", details={"error": str(e)})
+        self._group_ready = True
+
+    async def enqueue(self, message: InboundMessage) -> str:
+        """Append an inbound message to the stream and return its job ID."""
+        try:
+            job_id = await self.redis.xadd(
+                self.stream,
+                {"payload": message.json()},
+                maxlen=self.max_len,
+                approximate=True,
+            )
+        except Exception as e:
+            self.logger.error("job_enqueue_failed", error=str(e), from_number=message.from_number)
+            raise QueueError("Failed to enqueue inbound message", status_code=503, details={"error": str(e)})
+        self.logger.info("job_enqueued", job_id=job_id, from_number=message.from_number)
+        return job_id
+
+    async def read(self, count: int = 1, block_ms: int = 5000) -> List[Job]:
+        """Read up to ``count`` new jobs for this consumer, blocking up to ``block_ms``."""
+        await self.ensure_group()
+        response = await self.redis.xreadgroup(
+            self.group,
+            self.consumer,
+            streams={self.stream: ">"},
+            count=count,
+            block=block_ms,
+        )
+        jobs: List[Job] = []
+        for _stream, entries in response or []:
+            for entry_id, fields in entries:
+                job = self._to_job(entry_id, fields, delivery_count=1)
+                if job:
+                    jobs.append(job)
+                else:
+                    await self._discard(entry_id)
+        return jobs
+
+    async def reclaim_stuck(self, count: int = 10, skip: Collection[str] = ()) -> List[Job]:
+        """Take over jobs that another consumer read but never acked.
+
+        Jobs that have already been delivered ``max_deliveries`` times are
+        moved to the dead-letter stream instead of being handed out again.
+        Job IDs in ``skip`` (jobs this consumer still holds) are neither
+        returned nor dead-lettered.
+        """
+        await self.ensure_group()
+        result = await self.redis.xautoclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            min_idle_time=self.claim_idle_ms,
+            start_id="0-0",
+            count=count,
+        )
+        entries = [entry for entry in result[1] if entry[1] and entry[0] not in skip]
+        if not entries:
+            return []
+
+        delivery_counts = await self._delivery_counts([entry_id for entry_id, _ in entries])
+        jobs: List[Job] = []
+        for entry_id, fields in entries:
+            delivery_count = delivery_counts.get(entry_id, 1)
+            job = self._to_job(entry_id, fields, delivery_count=delivery_count)
+            if not job:
+                await self._discard(entry_id)
+                continue
+            if delivery_count > self.max_deliveries:
+                await self.dead_letter(job, reason="max_deliveries_exceeded")
+                continue
+            jobs.append(job)
+
+        if jobs:
+            self.logger.warning("jobs_reclaimed", count=len(jobs), job_ids=[job.job_id for job in jobs])
+        return jobs
+
+    async def touch(self, job_ids: List[str]) -> None:
+        """Reset the idle time of jobs this consumer still holds, so no one reclaims them.
+
+        Uses XCLAIM with JUSTID, which does not count as a delivery.
+        """
+        if not job_ids:
+            return
+        await self.redis.xclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            min_idle_time=0,
+            message_ids=job_ids,
+            justid=True,
+        )
+
+    async def ack(self, job: Job) -> None:
+        """Acknowledge a job and remove it from the stream."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.xack(self.stream, self.group, job.job_id)
+            pipe.xdel(self.stream, job.job_id)
+            await pipe.execute()
+
+    async def _discard(self, entry_id: str) -> None:
+        await self.redis.xack(self.stream, self.group, entry_id)
+        await self.redis.xdel(self.stream, entry_id)
+
+    async def dead_letter(self, job: Job, reason: str) -> None:
+        """Park a job that cannot be processed and ack it on the main stream."""
+        await self.redis.xadd(
+            self.dead_letter_stream,
+            {
+                "payload": job.message.json(),
+                "job_id": job.job_id,
+                "reason": reason,
+                "delivery_count": str(job.delivery_count),
+            },
+            maxlen=self.max_len,
+            approximate=True,
+        )
+        await self.ack(job)
+        self.logger.error("job_dead_lettered", job_id=job.job_id, reason=reason, delivery_count=job.delivery_count)
+
+    async def depth(self) -> Dict[str, Any]:
+        """Report queue depth: stream length, pending (unacked) and undelivered jobs."""
+        await self.ensure_group()
+        length = await self.redis.xlen(self.stream)
+        dead = await self.redis.xlen(self.dead_letter_stream)
+        stats: Dict[str, Any] = {"stream": self.stream, "length": length, "dead_letter": dead}
+        for group in await self.redis.xinfo_groups(self.stream):
+            if group.get("name") != self.group:
+                continue
+            pending = group.get("pending", 0)
+            stats["pending"] = pending
+            stats["consumers"] = group.get("consumers", 0)
+            lag = group.get("lag")
+            stats["lag"] = lag if lag is not None else max(length - pending, 0)
+        stats["oldest_job_age_seconds"] = await self._oldest_job_age()
+        return stats
+
+    async def close(self) -> None:
+        await self.redis.close()
+
+    async def _oldest_job_age(self) -> float:
+        """Age of the oldest entry still on the stream, in seconds."""
+        entries = await self.redis.xrange(self.stream, count=1)
+        if not entries:
+            return 0.0
+        enqueued_at = self._entry_time(entries[0][0])
+        return max((datetime.utcnow() - enqueued_at).total_seconds(), 0.0)
+
+    async def _delivery_counts(self, entry_ids: List[str]) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for entry_id in entry_ids:
+            pending = await self.redis.xpending_range(
+                self.stream, self.group, min=entry_id, max=entry_id, count=1
+            )
+            if pending:
+                counts[entry_id] = int(pending[0]["times_delivered"])
+        return counts
+
+    def _to_job(self, entry_id: str, fields: Dict[str, str], delivery_count: int) -> Optional[Job]:
+        try:
+            message = InboundMessage(**json.loads(fields["payload"]))
+        except Exception as e:
+            self.logger.error("job_payload_invalid", job_id=entry_id, error=str(e))
+            return None
+        return Job(
+            job_id=entry_id,
+            message=message,
+            delivery_count=delivery_count,
+            enqueued_at=self._entry_time(entry_id),
+        )
+
+    @staticmethod
+    def _entry_time(entry_id: str) -> datetime:
+        millis, _seq = entry_id.split("-", 1)
+        return datetime.utcfromtimestamp(int(millis) / 1000)
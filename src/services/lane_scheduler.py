@@ -0,0 +1,102 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Tuple
+import structlog
+from src.core.metrics import metrics
+
+Work = Callable[[], Awaitable[Any]]
+
+class LaneScheduler:
+    """Runs work in per-key lanes: strictly ordered within a lane, parallel across lanes.
+
+    Each key (a sender's phone number) gets its own FIFO lane drained by a
+    single task, so a salesman's text, photo and correction are handled in
+    the order they arrived. A shared semaphore caps how many items run at
+    once across all lanes. A lane is dropped as soon as it is empty, so
+    memory stays proportional to the senders with work outstanding rather
+    than to every sender ever seen.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(max_concurrency, 1)
+        self.logger = structlog.get_logger(__name__)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._lanes: Dict[str, Deque[Tuple[Work, asyncio.Future]]] = {}
+        self._runners: Dict[str, asyncio.Task] = {}
+        self._pending = 0
+        self._running = 0
+        self._progress: asyncio.Future = None
+
+    @property
+    def pending(self) -> int:
+        """Items submitted but not yet finished (queued in a lane or running)."""
+        return self._pending
+
+    @property
+    def active_lanes(self) -> int:
+        return len(self._lanes)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active_lanes": len(self._lanes),
+            "pending": self._pending,
+            "running": self._running,
+            "max_concurrency": self.max_concurrency,
+        }
+
+    def submit(self, key: str, work: Work) -> asyncio.Future:
+        """Queue ``work`` at the end of ``key``'s lane and return a future for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = deque()
+            self._lanes[key] = lane
+            self._runners[key] = asyncio.create_task(self._run_lane(key, lane))
+        lane.append((work, future))
+        self._pending += 1
+        self._publish()
+        return future
+
+    async def wait_for_progress(self) -> None:
+        """Wait until at least one submitted item finishes."""
+        if self._progress is None or self._progress.done():
+            self._progress = asyncio.get_running_loop().create_future()
+        await asyncio.shield(self._progress)
+
+    async def drain(self) -> None:
+        """Wait for every lane to empty."""
+        while self._runners:
+            await asyncio.gather(*list(self._runners.values()), return_exceptions=True)
+
+    async def _run_lane(self, key: str, lane: Deque[Tuple[Work, asyncio.Future]]) -> None:
+        try:
+            while lane:
+                work, future = lane.popleft()
+                async with self._semaphore:
+                    self._running += 1
+                    try:
+                        result = await work()
+                        if not future.done():
+                            future.set_result(result)
+                    except Exception as e:
+                        self.logger.error("lane_work_failed", lane=key, error=str(e))
+                        if not future.done():
+                            future.set_exception(e)
+                    finally:
+                        self._running -= 1
+                        self._pending -= 1
+                        self._publish()
+                        if self._progress is not None and not self._progress.done():
+                            self._progress.set_result(None)
+        finally:
+            # No await between the empty check and here, so nothing can be
+            # appended to this lane after the loop has decided to exit.
+            self._lanes.pop(key, None)
+            self._runners.pop(key, None)
+            metrics.set_gauge("lanes.active", len(self._lanes))
+
+    def _publish(self) -> None:
+        metrics.set_gauge("lanes.active", len(self._lanes))
+        metrics.set_gauge("lanes.pending", self._pending)
+        metrics.set_gauge("lanes.running", self._running)
@@ -0,0 +1,58 @@
+from typing import Optional
+import redis.asyncio as redis
+import structlog
+from src.core.cache import TTLCache
+from src.core.metrics import metrics
+
+class MediaCache:
+    """Extraction results for downloaded attachments.
+
+    Keyed by the SHA-256 of the file (in memory, and in Redis when a client
+    is configured, so all workers share them). Only byte-identical files
+    hit: orders written on the same printed form look alike to any cheap
+    perceptual hash, so "similar" images are never served from here. A
+    forward that WhatsApp recompressed is a new file and is extracted again.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2000,
+        ttl_seconds: int = 3 * 86400,
+        redis_client: Optional[redis.Redis] = None,
+        prefix: str = "shipra:media:",
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.redis = redis_client
+        self.prefix = prefix
+        self.logger = structlog.get_logger(__name__)
+        self._exact: TTLCache[str] = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    async def get(self, namespace: str, sha256: str) -> Optional[str]:
+        key = f"{namespace}:{sha256}"
+        value = self._exact.get(key)
+        if value is not None:
+            metrics.increment("media_cache.hit.exact")
+            return value
+        if self.redis is not None:
+            try:
+                value = await self.redis.get(self.prefix + key)
+            except Exception as e:
+                self.logger.warning("media_cache_redis_get_failed", error=str(e))
+                value = None
+            if value is not None:
+                metrics.increment("media_cache.hit.redis")
+                self._exact.set(key, value)
+                return value
+        return None
+
+    def record_miss(self) -> None:
+        metrics.increment("media_cache.miss")
+
+    async def set(self, namespace: str, sha256: str, value: str) -> None:
+        key = f"{namespace}:{sha256}"
+        self._exact.set(key, value)
+        if self.redis is not None:
+            try:
+                await self.redis.set(self.prefix + key, value, ex=self.ttl_seconds)
+            except Exception as e:
+                self.logger.warning("media_cache_redis_set_failed", error=str(e))
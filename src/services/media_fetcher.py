@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+import time
+from typing import BinaryIO, Optional, Union
+import aiohttp
+import structlog
+from src.core.exceptions import MediaError, MediaTooLargeError
+from src.core.metrics import metrics
+
+CHUNK_SIZE = 64 * 1024
+
+class FetchedMedia:
+    """A downloaded attachment, held in memory or spooled to a temp file.
+
+    Small files stay in memory; files over the spool threshold live on disk
+    and ``buffer()`` memory-maps them, so hashing, base64 encoding and
+    parsing never need a second full copy in RAM. ``sha256`` is computed
+    while streaming. Call ``close()`` (or use it as a context manager) to
+    drop the spool file.
+    """
+
+    def __init__(self, url: str, content_type: Optional[str], size: int, sha256: str, data: Optional[bytes] = None, path: Optional[str] = None):
+        self.url = url
+        self.content_type = content_type
+        self.size = size
+        self.sha256 = sha256
+        self.path = path
+        self._data = data
+        self._mmap: Optional[mmap.mmap] = None
+
+    @property
+    def spooled(self) -> bool:
+        return self.path is not None
+
+    def buffer(self) -> Union[bytes, mmap.mmap]:
+        """Zero-copy view of the content (bytes in memory, a read-only mmap on disk)."""
+        if self._data is not None:
+            return self._data
+        if self._mmap is None:
+            if self.size == 0:
+                return b""
+            with open(self.path, "rb") as handle:
+                self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def read(self) -> bytes:
+        """The content as bytes (a copy when spooled to disk)."""
+        return self._data if self._data is not None else bytes(self.buffer())
+
+    def open(self) -> BinaryIO:
+        """A new file object positioned at the start of the content."""
+        if self._data is not None:
+            return io.BytesIO(self._data)
+        return open(self.path, "rb")
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+        self._data = None
+
+    def __enter__(self) -> "FetchedMedia":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class MediaFetcher:
+    """Downloads Twilio media over one pooled, keep-alive HTTP session.
+
+    Bodies are streamed in chunks and refused as soon as they exceed
+    ``max_bytes`` (from Content-Length up front, or while reading). Up to
+    ``spool_threshold_bytes`` are kept in memory; larger files are written
+    to a temp file in ``spool_dir`` as they arrive.
+    """
+
+    def __init__(
+        self,
+        account_sid: str,
+        auth_token: str,
+        max_bytes: int = 25 * 1024 * 1024,
+        spool_threshold_bytes: int = 2 * 1024 * 1024,
+        spool_dir: Optional[str] = None,
+        pool_size: int = 20,
+        connect_timeout_seconds: float = 5.0,
+        read_timeout_seconds: float = 60.0,
+    ):
+        self.auth = aiohttp.BasicAuth(account_sid, auth_token) if account_sid and auth_token else None
+        self.max_bytes = max_bytes
+        self.spool_threshold_bytes = spool_threshold_bytes
+        self.spool_dir = spool_dir
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(total=None, connect=connect_timeout_seconds, sock_read=read_timeout_seconds)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_lock = asyncio.Lock()
+        self.logger = structlog.get_logger(__name__)
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily so the session binds to the event loop that uses it.
+        if self._session is None or self._session.closed:
+            async with self._session_lock:
+                if self._session is None or self._session.closed:
+                    connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60, ttl_dns_cache=300)
+                    self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout, auth=self.auth)
+        return self._session
+
+    async def fetch(self, url: str) -> FetchedMedia:
+        if self.auth is None:
+            raise MediaError("Twilio credentials are not configured", details={"url": url})
+        session = await self._get_session()
+        started = time.perf_counter()
+        async with session.get(url) as response:
+            if response.status != 200:
+                self.logger.error("media_download_failed", status=response.status, url=url)
+                raise MediaError(f"Failed to download media: {response.status}", details={"url": url, "status": response.status})
+            if response.content_length and response.content_length > self.max_bytes:
+                raise MediaTooLargeError(
+                    "Attachment is too large",
+                    details={"url": url, "size": response.content_length, "max_bytes": self.max_bytes},
+                )
+            media = await self._read_body(url, response)
+
+        metrics.observe("media.download_ms", (time.perf_counter() - started) * 1000)
+        metrics.increment("media.bytes", media.size)
+        metrics.increment("media.spooled" if media.spooled else "media.in_memory")
+        self.logger.info("media_downloaded", url=url, size=media.size, spooled=media.spooled, content_type=media.content_type)
+        return media
+
+    async def _read_body(self, url: str, response: aiohttp.ClientResponse) -> FetchedMedia:
+        digest = hashlib.sha256()
+        chunks = []
+        size = 0
+        spool = None
+        try:
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise MediaTooLargeError("Attachment is too large", details={"url": url, "max_bytes": self.max_bytes})
+                digest.update(chunk)
+                if spool is None and size > self.spool_threshold_bytes:
+                    spool = tempfile.NamedTemporaryFile(prefix="shipra-media-", dir=self.spool_dir, delete=False)
+                    for buffered in chunks:
+                        spool.write(buffered)
+                    chunks = []
+                if spool is not None:
+                    spool.write(chunk)
+                else:
+                    chunks.append(chunk)
+        except BaseException:
+            if spool is not None:
+                spool.close()
+                os.unlink(spool.name)
+            raise
+
+        content_type = response.content_type if "Content-Type" in response.headers else None
+        if spool is not None:
+            spool.close()
+            return FetchedMedia(url, content_type, size, digest.hexdigest(), path=spool.name)
+        return FetchedMedia(url, content_type, size, digest.hexdigest(), data=b"".join(chunks))
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -0,0 +1,109 @@
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import structlog
+from src.core.metrics import metrics
+from src.models.order import OrderDetails
+from src.services.order_format import parse_order_response
+from src.services.prompts import UOM_ALIASES
+
+PLACEHOLDER_ITEMS = {"", "n/a", "na", "unknown", "none", "item", "product"}
+MAX_QTY = 10000
+# Finish reasons of a completion that ended normally (a forced tool call ends with "stop").
+CLEAN_FINISH_REASONS = {"stop", "tool_calls"}
+
+Validator = Callable[[Any], Tuple[Any, float]]
+
+def score_order(order: Optional[OrderDetails], finish_reason: Optional[str] = None) -> float:
+    """Confidence (0-1) that ``order`` is a complete, sane extraction.
+
+    The share of line items with a known UOM, a real item name and a sane
+    quantity. Invalid tool arguments or a truncated completion score 0. An
+    empty order from a completion that ended cleanly scores 1: most messages
+    without items ("hi", "thanks") really have none, and a bigger model
+    would only say the same at a higher price.
+    """
+    if finish_reason == "length" or order is None:
+        return 0.0
+    if not order.items:
+        return 1.0 if finish_reason in CLEAN_FINISH_REASONS else 0.0
+    valid = sum(
+        1
+        for item in order.items
+        if item.uom.upper() in UOM_ALIASES
+        and item.item_name.strip().lower() not in PLACEHOLDER_ITEMS
+        and 0 < item.quantity <= MAX_QTY
+    )
+    return valid / len(order.items)
+
+def validate_order_response(response: Any) -> Tuple[Optional[OrderDetails], float]:
+    """Router validator: parse the ``record_order`` call and score it."""
+    order = parse_order_response(response)
+    return order, score_order(order, response.choices[0].finish_reason)
+
+def record_usage(model: str, usage: Any, costs: Dict[str, List[float]]) -> float:
+    """Record token usage and estimated cost (USD) for one completion; returns the cost."""
+    if usage is None:
+        return 0.0
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    prompt_rate, completion_rate = (costs.get(model) or [0.0, 0.0])[:2]
+    cost = prompt_tokens / 1000 * prompt_rate + completion_tokens / 1000 * completion_rate
+    metrics.increment(f"openai.{model}.prompt_tokens", prompt_tokens)
+    metrics.increment(f"openai.{model}.completion_tokens", completion_tokens)
+    metrics.increment(f"openai.{model}.cost_usd", cost)
+    return cost
+
+class ModelRouter:
+    """Tries the cheapest model first and escalates only when its output looks wrong.
+
+    ``tiers`` is ordered cheapest first. Each tier's completion is parsed and
+    scored by ``validator``; below ``min_confidence`` (or on an API error)
+    the next tier is tried. The last tier's answer is returned as-is. Per-tier
+    latency, escalations and cost are recorded in ``metrics``.
+    """
+
+    def __init__(
+        self,
+        tiers: List[str],
+        min_confidence: float = 0.8,
+        costs: Optional[Dict[str, List[float]]] = None,
+        validator: Validator = validate_order_response,
+    ):
+        if not tiers:
+            raise ValueError("ModelRouter needs at least one model tier")
+        self.tiers = tiers
+        self.min_confidence = min_confidence
+        self.costs = costs or {}
+        self.validator = validator
+        self.logger = structlog.get_logger(__name__)
+
+    @property
+    def cache_namespace(self) -> str:
+        """Identifies the routing setup in extraction cache keys."""
+        return ">".join(self.tiers)
+
+    async def complete(self, call: Callable[[str], Awaitable[Any]]) -> Tuple[str, Any, Any]:
+        """Run ``call(model)`` tier by tier; returns (model, parsed result, response) of the accepted tier."""
+        last_index = len(self.tiers) - 1
+        for index, model in enumerate(self.tiers):
+            started = time.perf_counter()
+            try:
+                response = await call(model)
+            except Exception as e:
+                metrics.increment(f"router.{model}.errors")
+                if index == last_index:
+                    raise
+                self.logger.warning("model_tier_failed_escalating", model=model, error=str(e))
+                metrics.increment("router.escalations")
+                continue
+            metrics.observe(f"router.{model}.latency_ms", (time.perf_counter() - started) * 1000)
+            metrics.increment(f"router.{model}.calls")
+            record_usage(model, getattr(response, "usage", None), self.costs)
+
+            result, confidence = self.validator(response)
+            metrics.observe(f"router.{model}.confidence", confidence)
+            if confidence >= self.min_confidence or index == last_index:
+                return model, result, response
+            self.logger.info("model_tier_low_confidence_escalating", model=model, confidence=round(confidence, 2))
+            metrics.increment("router.escalations")
+        raise RuntimeError("unreachable")
@@ -0,0 +1,65 @@
+import re
+import unicodedata
+from typing import Dict, Optional
+from src.core.metrics import metrics
+
+# Punctuation that is folded to its ASCII equivalent.
+PUNCTUATION_MAP = {
+    "،": ",",  # Arabic comma
+    "٫": ".",  # Arabic decimal separator
+    "٬": ",",  # Arabic thousands separator
+    "×": "x",
+}
+
+# Joiners and variation selectors that only exist to decorate emoji.
+EMOJI_COMPONENTS = {"‍", "︎", "️", "⃣"}
+
+HORIZONTAL_WHITESPACE = re.compile(r"[^\S\n]+")
+SPACE_BEFORE_PUNCTUATION = re.compile(r" +([,.;:!?])")
+
+class OrderTextNormalizer:
+    """Canonicalizes order text before it is hashed or sent to the model.
+
+    Digits in any script (Arabic-Indic, Devanagari, Malayalam, ...) are
+    folded to ASCII, decorative emoji are dropped, whitespace is collapsed
+    (line breaks are kept, blank lines are not) and local product names are
+    replaced using the synonym table. Near-duplicate orders therefore map to
+    the same cache key, and the model reads a shorter prompt.
+    """
+
+    def __init__(self, synonyms: Optional[Dict[str, str]] = None):
+        self.synonyms = {key.lower(): value for key, value in (synonyms or {}).items()}
+        self._synonym_pattern = None
+        if self.synonyms:
+            alternatives = sorted(self.synonyms, key=len, reverse=True)
+            self._synonym_pattern = re.compile(
+                r"\b(" + "|".join(re.escape(word) for word in alternatives) + r")\b",
+                re.IGNORECASE,
+            )
+
+    def normalize(self, text: str) -> str:
+        folded = "".join(self._fold_char(ch) for ch in unicodedata.normalize("NFKC", text))
+        if self._synonym_pattern:
+            folded = self._synonym_pattern.sub(lambda match: self.synonyms[match.group(0).lower()], folded)
+        lines = (
+            SPACE_BEFORE_PUNCTUATION.sub(r"\1", HORIZONTAL_WHITESPACE.sub(" ", line)).strip()
+            for line in folded.splitlines()
+        )
+        normalized = "\n".join(line for line in lines if line)
+        metrics.increment("normalizer.chars_removed", max(len(text) - len(normalized), 0))
+        return normalized
+
+    @staticmethod
+    def _fold_char(ch: str) -> str:
+        if ch.isascii():
+            return ch
+        if ch in PUNCTUATION_MAP:
+            return PUNCTUATION_MAP[ch]
+        if ch in EMOJI_COMPONENTS:
+            return ""
+        category = unicodedata.category(ch)
+        if category == "Nd":
+            return str(unicodedata.decimal(ch))
+        if category in ("So", "Sk", "Cs", "Co"):
+            return " "
+        return ch
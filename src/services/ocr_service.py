@@ -0,0 +1,128 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+import structlog
+from pypdf import PdfReader, PdfWriter
+from src.core.metrics import metrics
+
+def ocr_page(page_pdf: bytes, dpi: int, language: str, timeout_seconds: float) -> str:
+    """Rasterize and OCR a one-page PDF. Runs in a pool process.
+
+    pdftoppm and Tesseract are killed after ``timeout_seconds`` each, so a
+    task gives its pool slot back even when nobody waits for it any more.
+    """
+    # Imported here so the pool's child processes pay for them, not the server.
+    import pytesseract
+    from pdf2image import convert_from_bytes
+
+    images = convert_from_bytes(page_pdf, dpi=dpi, timeout=timeout_seconds)
+    return "\n".join(pytesseract.image_to_string(image, lang=language, timeout=timeout_seconds) for image in images)
+
+def split_pages(pdf_data: bytes, page_numbers: List[int]) -> Dict[int, bytes]:
+    """Each of the given pages (1-based) as a PDF of its own."""
+    reader = PdfReader(io.BytesIO(pdf_data))
+    if reader.is_encrypted:
+        reader.decrypt("")
+    pages: Dict[int, bytes] = {}
+    for page_number in page_numbers:
+        writer = PdfWriter()
+        writer.add_page(reader.pages[page_number - 1])
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        pages[page_number] = buffer.getvalue()
+    return pages
+
+class OcrService:
+    """OCR for scanned PDFs on a process pool, one task per page.
+
+    Pages are rasterized and recognized in parallel in ``max_workers``
+    processes (CPU count by default) so the event loop never blocks on
+    Tesseract; each page can be rendered at its own DPI. Each task is sent
+    only its own page, split off the PDF first. At most ``max_pages`` pages
+    are read per PDF, and after ``timeout_seconds`` the pages not yet done
+    are dropped; whatever was recognized is returned in page order.
+
+    Dropping a page only cancels tasks still queued: a page already running
+    keeps its pool process until pdftoppm or Tesseract hits its own
+    ``timeout_seconds`` limit, so a burst of slow scans can hold every slot
+    for up to twice that long.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_pages: int = 20,
+        timeout_seconds: float = 60.0,
+        language: str = "eng",
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pages = max_pages
+        self.timeout_seconds = timeout_seconds
+        self.language = language
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.logger = structlog.get_logger(__name__)
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop and client threads is unsafe.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def recognize_pages(self, pdf_data: bytes, pages: Dict[int, int]) -> Dict[int, str]:
+        """OCR the given pages ({1-based page number: DPI}); returns text for each page recognized in time."""
+        started = time.perf_counter()
+        page_numbers = sorted(pages)
+        if len(page_numbers) > self.max_pages:
+            self.logger.warning("ocr_page_limit_reached", pages=len(page_numbers), max_pages=self.max_pages)
+            page_numbers = page_numbers[:self.max_pages]
+        if not page_numbers:
+            return {}
+
+        page_pdfs = await asyncio.to_thread(split_pages, pdf_data, page_numbers)
+        loop = asyncio.get_running_loop()
+        futures = {
+            page: loop.run_in_executor(self.executor, ocr_page, page_pdfs[page], pages[page], self.language, self.timeout_seconds)
+            for page in page_numbers
+        }
+        done, pending = await asyncio.wait(futures.values(), timeout=self.timeout_seconds)
+        for future in pending:
+            # Only stops tasks still queued; running ones finish or time out in the child.
+            future.cancel()
+        if pending:
+            metrics.increment("ocr.timeouts")
+            self.logger.warning("ocr_timed_out", pages=len(page_numbers), unfinished=len(pending), timeout_seconds=self.timeout_seconds)
+
+        texts: Dict[int, str] = {}
+        for page, future in futures.items():
+            if future not in done:
+                continue
+            try:
+                texts[page] = future.result()
+            except Exception as e:
+                metrics.increment("ocr.page_errors")
+                self.logger.error("ocr_page_failed", page=page, error=str(e))
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        metrics.increment("ocr.pages", len(done))
+        metrics.observe("ocr.pdf_ms", elapsed_ms)
+        self.logger.info(
+            "ocr_completed",
+            pages=page_numbers,
+            recognized=len(texts),
+            text_length=sum(len(text) for text in texts.values()),
+            elapsed_ms=round(elapsed_ms),
+        )
+        return texts
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,195 +1,408 @@
-import os
-import json
+import asyncio
 import base64
-import aiohttp
 import io
-import tempfile
-from typing import Optional
+import time
+from typing import Awaitable, Callable, Optional
 from openai import AsyncOpenAI
-from src.models.order import OrderDetails
-from src.core.exceptions import OpenAIError
+from src.core.metrics import metrics
+from src.models.order import OrderDetails, OrderLineItem
+from src.core.exceptions import OpenAIError, UnreadableMediaError
+from src.services.extraction_cache import ExtractionCache
+from src.services.normalizer import OrderTextNormalizer
+from src.services.order_parser import FastPathOrderParser
+from src.services.model_router import ModelRouter, record_usage
+from src.services.rate_limiter import OpenAIRateLimiter, estimate_prompt_tokens
+from src.services.hedging import RequestHedger
+from src.services.media_fetcher import FetchedMedia, MediaFetcher
+from src.services.media_cache import MediaCache
+from src.services.image_preprocessor import ImagePreprocessor
+from src.services.audio_pipeline import AUDIO_FORMATS, AudioChunk, AudioPipeline, detect_audio_format
+from src.services.ocr_service import OcrService
+from src.services.pdf_text import PAGE_BREAK, TABLE_HINT, extract_layout_text, extract_pdf_text
+from src.services.chunker import chunk_sections, split_in_half
+from src.services.pdf_table import PdfTableParser
+from src.config.settings import get_settings
+from src.services.order_format import OrderStreamParser, merge_orders, parse_order_response
+from src.services.prompts import (
+    PROMPT_VERSION, TEXT_ORDER_PROMPT, IMAGE_ORDER_PROMPT, IMAGE_USER_INSTRUCTION, ORDER_TOOL, ORDER_TOOL_CHOICE
+)
 from src.core.logging import logger
 import structlog
-from langchain_community.document_loaders import PyPDFLoader
-import pytesseract
-from pdf2image import convert_from_bytes
-from PIL import Image
 import shutil
 
 class OpenAIService:
-    def __init__(self, api_key: str):
-        self.client = AsyncOpenAI(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        cache: Optional[ExtractionCache] = None,
+        normalizer: Optional[OrderTextNormalizer] = None,
+        fast_parser: Optional[FastPathOrderParser] = None,
+        router: Optional[ModelRouter] = None,
+        rate_limiter: Optional[OpenAIRateLimiter] = None,
+        hedger: Optional[RequestHedger] = None,
+        media_fetcher: Optional[MediaFetcher] = None,
+        media_cache: Optional[MediaCache] = None,
+        image_preprocessor: Optional[ImagePreprocessor] = None,
+        audio_pipeline: Optional[AudioPipeline] = None,
+        ocr_service: Optional[OcrService] = None,
+        table_parser: Optional[PdfTableParser] = None
+    ):
+        settings = get_settings()
+        # Retries happen in the rate limiter so they wait their turn in its queue.
+        self.client = AsyncOpenAI(api_key=api_key, max_retries=0)
+        self.cache = cache
+        self.normalizer = normalizer or OrderTextNormalizer()
+        self.fast_parser = fast_parser
+        self.router = router or ModelRouter(
+            [settings.OPENAI_MODEL, settings.OPENAI_ESCALATION_MODEL],
+            min_confidence=settings.OPENAI_ROUTER_MIN_CONFIDENCE,
+            costs=settings.OPENAI_MODEL_COSTS
+        )
+        self.vision_model = settings.OPENAI_VISION_MODEL
+        self.transcription_model = settings.OPENAI_TRANSCRIPTION_MODEL
+        self.max_tokens = settings.OPENAI_MAX_TOKENS
+        self.rate_limiter = rate_limiter or OpenAIRateLimiter(
+            settings.OPENAI_RATE_LIMITS,
+            default_rpm=settings.OPENAI_DEFAULT_RPM,
+            default_tpm=settings.OPENAI_DEFAULT_TPM,
+            max_retries=settings.OPENAI_MAX_RETRIES,
+            backoff_base_seconds=settings.OPENAI_BACKOFF_BASE_SECONDS,
+            backoff_max_seconds=settings.OPENAI_BACKOFF_MAX_SECONDS
+        )
+        self.hedger = hedger
+        self.media_cache = media_cache
+        self.image_preprocessor = image_preprocessor
+        self.audio_pipeline = audio_pipeline
+        self.table_parser = table_parser
+        self.pdf_max_pages = settings.PDF_MAX_PAGES
+        self.pdf_max_chars = settings.PDF_MAX_TEXT_CHARS
+        self.pdf_ocr_min_chars = settings.PDF_OCR_MIN_CHARS
+        self.pdf_ocr_min_density = settings.PDF_OCR_MIN_DENSITY
+        self.ocr_target_pixels = settings.OCR_TARGET_PIXELS
+        self.ocr_min_dpi = settings.OCR_MIN_DPI
+        self.ocr_max_dpi = settings.OCR_MAX_DPI
+        self.ocr_service = ocr_service or OcrService(
+            max_workers=settings.OCR_MAX_WORKERS or None,
+            max_pages=settings.OCR_MAX_PAGES,
+            timeout_seconds=settings.OCR_TIMEOUT_SECONDS,
+            language=settings.OCR_LANGUAGE
+        )
+        self.audio_max_parallel = max(settings.AUDIO_MAX_PARALLEL_CHUNKS, 1)
+        self.chunk_max_tokens = settings.EXTRACTION_CHUNK_MAX_TOKENS
+        self.chunk_max_splits = settings.EXTRACTION_CHUNK_MAX_SPLITS
+        self.chunk_max_parallel = max(settings.EXTRACTION_MAX_PARALLEL_CHUNKS, 1)
+        self.media_fetcher = media_fetcher or MediaFetcher(
+            settings.TWILIO_ACCOUNT_SID,
+            settings.TWILIO_AUTH_TOKEN,
+            max_bytes=settings.MEDIA_MAX_BYTES,
+            spool_threshold_bytes=settings.MEDIA_SPOOL_THRESHOLD_BYTES,
+            spool_dir=settings.MEDIA_SPOOL_DIR
+        )
         self.logger = structlog.get_logger(__name__)
 
-    async def extract_order_details(self, text: str) -> Optional[OrderDetails]:
+    async def _chat(self, model: str, messages: list, **kwargs):
+        """Create a chat completion within the rate limiter's budget for ``model``.
+
+        Non-streaming calls are hedged when a hedger is configured. Only the
+        API call is hedged, inside the limiter slot, so queue wait does not
+        look like a slow response; a hedge takes a limiter slot of its own.
+        """
+        tokens = estimate_prompt_tokens(messages, kwargs.get("tools")) + kwargs.get("max_tokens", self.max_tokens)
+
+        def create():
+            return self.client.chat.completions.create(model=model, messages=messages, **kwargs)
+
+        if self.hedger and not kwargs.get("stream"):
+            return await self.rate_limiter.run(
+                model,
+                tokens,
+                lambda: self.hedger.run(model, create, acquire_hedge=lambda: self.rate_limiter.acquire(model, tokens))
+            )
+        return await self.rate_limiter.run(model, tokens, create)
+
+    async def _cache_get(self, kind: str, payload, model: str) -> tuple:
+        """Look ``payload`` up in the extraction cache; returns (key, cached value or None)."""
+        if not self.cache:
+            return None, None
+        key = self.cache.make_key(kind, payload, model, PROMPT_VERSION)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            logger.info("Extraction cache hit", kind=kind, model=model)
+        return key, cached
+
+    async def _cache_set(self, key: Optional[str], value: str) -> None:
+        if self.cache and key:
+            await self.cache.set(key, value)
+
+    async def _cache_get_order(self, kind: str, payload, model: str) -> tuple:
+        """Like ``_cache_get`` but decodes the cached order JSON."""
+        key, cached = await self._cache_get(kind, payload, model)
+        if cached is None:
+            return key, None
+        return key, OrderDetails.model_validate_json(cached)
+
+    async def _media_cache_get(self, namespace: str, media: FetchedMedia) -> Optional[OrderDetails]:
+        """Cached order for a downloaded file with exactly the same bytes, if any."""
+        if not self.media_cache:
+            return None
+        cached = await self.media_cache.get(namespace, media.sha256)
+        if cached is None:
+            self.media_cache.record_miss()
+            return None
+        logger.info("Media cache hit", namespace=namespace, size=media.size)
+        return OrderDetails.model_validate_json(cached)
+
+    async def _media_cache_set(self, namespace: str, media_sha256: str, order: OrderDetails) -> None:
+        if self.media_cache:
+            await self.media_cache.set(namespace, media_sha256, order.json())
+
+    async def _prepare_image(self, media: FetchedMedia) -> dict:
+        """Build the ``image_url`` content part, preprocessing the photo off the event loop."""
+        if self.image_preprocessor:
+            try:
+                prepared = await asyncio.to_thread(self.image_preprocessor.prepare, media.open(), media.size)
+                image_base64 = base64.b64encode(prepared.data).decode('utf-8')
+                return {
+                    "url": f"data:{prepared.content_type};base64,{image_base64}",
+                    "detail": prepared.detail
+                }
+            except Exception as e:
+                logger.warning("Image preprocessing failed, sending original", error=str(e), url=media.url)
+        image_base64 = base64.b64encode(media.buffer()).decode('utf-8')
+        return {"url": f"data:{media.content_type or 'image/jpeg'};base64,{image_base64}"}
+
+    async def _emit_items(self, order: Optional[OrderDetails], on_item) -> None:
+        if on_item and order:
+            for item in order.items:
+                await on_item(item)
+
+    async def _stream_order(
+        self,
+        model: str,
+        messages: list,
+        on_item: Callable[[OrderLineItem], Awaitable[None]],
+        max_tokens: Optional[int] = None
+    ) -> tuple:
+        """Stream a ``record_order`` call, handing each line item to ``on_item`` as soon as it closes.
+
+        Returns (order, finish_reason).
+        """
+        started = time.perf_counter()
+        stream = await self._chat(
+            model,
+            messages,
+            tools=[ORDER_TOOL],
+            tool_choice=ORDER_TOOL_CHOICE,
+            max_tokens=max_tokens or self.max_tokens,
+            temperature=0.1,
+            stream=True
+        )
+        parser = OrderStreamParser()
+        finish_reason = None
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            for tool_call in choice.delta.tool_calls or []:
+                if not tool_call.function or not tool_call.function.arguments:
+                    continue
+                for item in parser.feed(tool_call.function.arguments):
+                    if len(parser.items) == 1:
+                        metrics.observe(f"stream.{model}.first_item_ms", (time.perf_counter() - started) * 1000)
+                    await on_item(item)
+            finish_reason = choice.finish_reason or finish_reason
+        metrics.observe(f"stream.{model}.latency_ms", (time.perf_counter() - started) * 1000)
+        metrics.increment(f"stream.{model}.calls")
+        return parser.result(), finish_reason
+
+    async def _complete_order(
+        self,
+        text: str,
+        semaphore: asyncio.Semaphore,
+        on_item=None,
+        max_tokens: Optional[int] = None
+    ) -> tuple:
+        """One ``record_order`` completion for ``text``; returns (model, order, finish_reason).
+
+        Streams from the last router tier when ``on_item`` is given,
+        otherwise goes through the router. ``semaphore`` caps the
+        concurrent completions of one extraction.
+        """
+        max_tokens = max_tokens or self.max_tokens
+        messages = [
+            {
+                "role": "system",
+                "content": TEXT_ORDER_PROMPT
+            },
+            {
+                "role": "user",
+                "content": text
+            }
+        ]
+        async with semaphore:
+            if on_item:
+                model = self.router.tiers[-1]
+                order, finish_reason = await self._stream_order(model, messages, on_item, max_tokens=max_tokens)
+                return model, order, finish_reason
+            model, order, response = await self.router.complete(
+                lambda model: self._chat(
+                    model,
+                    messages,
+                    tools=[ORDER_TOOL],
+                    tool_choice=ORDER_TOOL_CHOICE,
+                    max_tokens=max_tokens,
+                    temperature=0.1
+                )
+            )
+            return model, order, response.choices[0].finish_reason
+
+    async def _extract_chunk(self, text: str, semaphore: asyncio.Semaphore, on_item=None, depth: int = 0) -> tuple:
+        """Extract one chunk, retrying it on its own while the completion is truncated.
+
+        A truncated chunk is split in half and both halves are extracted
+        concurrently; a chunk that cannot be split (one long line) is retried
+        once with twice the token budget. Retries are not streamed, since the
+        truncated attempt has already handed its complete items to
+        ``on_item``. Returns (order, truncated).
+        """
+        model, order, finish_reason = await self._complete_order(text, semaphore, on_item)
+        if finish_reason != "length":
+            return order, False
+        metrics.increment("chunking.truncated")
+        logger.warning("Chunk extraction truncated, retrying it on its own",
+                       model=model, depth=depth, max_tokens=self.max_tokens, text_length=len(text))
+        halves = split_in_half(text)
+        if len(halves) > 1 and depth < self.chunk_max_splits:
+            results = await asyncio.gather(*(self._extract_chunk(half, semaphore, depth=depth + 1) for half in halves))
+            orders = [order for order, _ in results if order]
+            return (merge_orders(orders, dedupe_boundaries=True) if orders else None), any(truncated for _, truncated in results)
+        _, retried, finish_reason = await self._complete_order(text, semaphore, max_tokens=self.max_tokens * 2)
+        return retried or order, finish_reason == "length"
+
+    async def extract_order_details(
+        self,
+        text: str,
+        on_item: Optional[Callable[[OrderLineItem], Awaitable[None]]] = None
+    ) -> Optional[OrderDetails]:
+        """Extract an order from free text.
+
+        With ``on_item`` the completion is streamed and every line item is
+        passed to ``on_item`` as soon as it has been generated, so callers
+        can start per-item work (e.g. catalog lookups) while the model is
+        still writing. Streaming uses the router's last (most capable) tier
+        directly, since items already handed downstream cannot be taken
+        back by an escalation. ``on_item`` runs inline with the stream and
+        should hand work off rather than block.
+
+        Long inputs are split at page (``PAGE_BREAK``) or line boundaries
+        into chunks of ``EXTRACTION_CHUNK_MAX_TOKENS``, which are extracted
+        concurrently (at most ``EXTRACTION_MAX_PARALLEL_CHUNKS`` at a time
+        for this call) and merged, dropping a row read by the chunks on both
+        sides of a boundary.
+        """
         try:
             logger.info("Starting order extraction from text", text_length=len(text))
-            response = await self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system",
-                        "content":  """You are a sales agent at Better Grow FMCG company in Dubai. Your job is to process customer order messages that may be in English, Arabic, Malayalam, or Hindi, and return order details in a standardized English string format.
-Rules:
-
-Return only a string - no explanations, confirmations, or additional text
-Each item must be on a new line in this exact format: Item: [Product Name], Rate: [Price], UOM: [Unit], Qty: [Quantity]
-Number each item (1., 2., 3., etc.)
-Include customer name on a separate line after all items
-Include any special instructions on the final line
-Always extract specific product names, sizes, and variants mentioned
-If price is not mentioned, use "Standard Rate"
-Use appropriate UOM abbreviations:
-
-CTN (Cartons), PKT (Packets), KG (Kilograms), GM (Grams)
-LTR (Liters), BTL (Bottles), PCS (Pieces), BOX (Boxes)
-
-
-Convert any quantity mentioned in local languages to numbers
-Standardize product names (e.g., "Badam" → "Almond", "Kaju" → "Cashew")
-Convert currency symbols to appropriate format (₹, AED, etc.)
-
-Example Input: "Need 1 carton walnut at 20 rupees, 3 packets almonds, and 22 cashew packets for Empire Restaurant"
-Example Output:
-1. Item: Walnut, Rate: ₹20, UOM: CTN, Qty: 1
-2. Item: Almond, Rate: Standard Rate, UOM: PKT, Qty: 3
-3. Item: Cashew, Rate: Standard Rate, UOM: PKT, Qty: 22
-Customer Name: Empire Restaurant
-Please order at standard rates
-Language Hints:
-
-Arabic: Numbers may be written in Arabic numerals
-Malayalam/Hindi: Common product names (badam=almond, kaju=cashew, pista=pistachio)
-Always convert to English product names in output
-
-Process any order message following this exact format with no additional commentary.
-                        
-                        """
-                    },
-                    {
-                        "role": "user",
-                        "content": text
-                    }
-                ],
-                max_tokens=1000,
-                temperature=0.1
-            )
-
-            extracted_data = response.choices[0].message.content.strip()
-            logger.info("Order extraction completed successfully", 
-                       extracted_data=extracted_data, 
-                       response_length=len(extracted_data),
-                       finish_reason=response.choices[0].finish_reason)
-            
-            # Check if response was truncated
-            if response.choices[0].finish_reason == "length":
-                logger.warning("Response was truncated due to token limit", 
-                             extracted_data=extracted_data,
-                             max_tokens=1000)
-                # You could implement a retry with higher token limit here if needed
-            
-            return extracted_data
+            sections = [self.normalizer.normalize(section) for section in text.split(PAGE_BREAK)]
+            normalized_text = "\n".join(section for section in sections if section)
+            if not normalized_text:
+                logger.warning("Order text is empty after normalization", text_length=len(text))
+                return None
+            logger.info("Order text normalized", normalized_length=len(normalized_text))
+            if self.fast_parser:
+                parsed = self.fast_parser.parse(normalized_text)
+                if parsed:
+                    logger.info("Order parsed on the fast path", items=len(parsed.items))
+                    await self._emit_items(parsed, on_item)
+                    return parsed
+            cache_namespace = self.router.tiers[-1] if on_item else self.router.cache_namespace
+            cache_key, cached = await self._cache_get_order("text", normalized_text, cache_namespace)
+            if cached is not None:
+                await self._emit_items(cached, on_item)
+                return cached
+
+            chunks = chunk_sections(sections, self.chunk_max_tokens)
+            # Per call, so one long document cannot hold up the chunks of another.
+            semaphore = asyncio.Semaphore(self.chunk_max_parallel)
+            results = await asyncio.gather(*(self._extract_chunk(chunk, semaphore, on_item) for chunk in chunks))
+            orders = [order for order, _ in results if order]
+            order = merge_orders(orders, dedupe_boundaries=True) if len(orders) > 1 else (orders[0] if orders else None)
+            truncated = any(truncated for _, truncated in results)
+            if len(chunks) > 1:
+                metrics.increment("chunking.chunked_inputs")
+                metrics.observe("chunking.chunks", len(chunks))
+
+            logger.info("Order extraction completed successfully",
+                       streamed=bool(on_item),
+                       chunks=len(chunks),
+                       items=len(order.items) if order else 0,
+                       truncated=truncated)
+
+            if truncated:
+                # Keep what was read, but do not cache a partial order.
+                logger.warning("Response was truncated due to token limit even after retries",
+                             max_tokens=self.max_tokens)
+            elif order is not None:
+                await self._cache_set(cache_key, order.json())
+
+            return order if order and order.items else None
         except Exception as e:
             logger.error("Error in OpenAI API call", error=str(e), error_type=type(e).__name__)
             raise OpenAIError("Error in OpenAI API call", details={"error": str(e)})
 
     async def extract_order_from_image(self, image_url: str) -> Optional[OrderDetails]:
         try:
-            account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-            auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-            
-            if not account_sid or not auth_token:
-                raise OpenAIError("Twilio credentials not found in environment variables")
-
-            auth = aiohttp.BasicAuth(account_sid, auth_token)
-            async with aiohttp.ClientSession() as session:
-                async with session.get(image_url, auth=auth) as response:
-                    if response.status != 200:
-                        logger.error("Failed to download image", 
-                                        status=response.status,
-                                        url=image_url)
-                        raise OpenAIError(f"Failed to download image: {response.status}")
-                    image_data = await response.read()
-                    image_base64 = base64.b64encode(image_data).decode('utf-8')
+            preprocessing = self.image_preprocessor.signature if self.image_preprocessor else "raw"
+            cache_namespace = f"image:{self.vision_model}:{preprocessing}:{PROMPT_VERSION}"
+            with await self.media_fetcher.fetch(image_url) as media:
+                media_sha256 = media.sha256
+                cached = await self._media_cache_get(cache_namespace, media)
+                if cached is not None:
+                    return cached
+                image_url_part = await self._prepare_image(media)
 
             messages = [
                 {
                     "role": "system",
-                    "content": """You work at an FMCG company and you take care of new orders and many salesmen send you whatsapp images of the things they need your job is to 
-                    look at the image and extract the order details in a standardized string format only in english.
-                    Rules:
-
-Return only a string - no explanations, confirmations, or additional text
-Each item must be on a new line in this exact format: Item: [Product Name], Rate: [Price], UOM: [Unit], Qty: [Quantity]
-Number each item (1., 2., 3., etc.)
-Include customer name on a separate line after all items
-Include any special instructions on the final line
-Always extract specific product names, sizes, and variants mentioned
-If price is not mentioned, use "Standard Rate"
-Use appropriate UOM abbreviations:
-
-CTN (Cartons), PKT (Packets), KG (Kilograms), GM (Grams)
-LTR (Liters), BTL (Bottles), PCS (Pieces), BOX (Boxes)
-
-
-Convert any quantity mentioned in local languages to numbers
-Standardize product names (e.g., "Badam" → "Almond", "Kaju" → "Cashew")
-Convert currency symbols to appropriate format (₹, AED, etc.)
-
-Example Input: "Need 1 carton walnut at 20 rupees, 3 packets almonds, and 22 cashew packets for Empire Restaurant"
-Example Output:
-1. Item: Walnut, Rate: ₹20, UOM: CTN, Qty: 1
-2. Item: Almond, Rate: Standard Rate, UOM: PKT, Qty: 3
-3. Item: Cashew, Rate: Standard Rate, UOM: PKT, Qty: 22
-Customer Name: Empire Restaurant
-Please order at standard rates
-Language Hints:
-
-Arabic: Numbers may be written in Arabic numerals
-Malayalam/Hindi: Common product names (badam=almond, kaju=cashew, pista=pistachio)
-Always convert to English product names in output
-
-Process any order message following this exact format with no additional commentary.
-                    """
+                    "content": IMAGE_ORDER_PROMPT
                 },
                 {
                     "role": "user",
                     "content": [
                         {
                             "type": "text",
-                            "text": "Please analyze this image and extract any order details you can find."
+                            "text": IMAGE_USER_INSTRUCTION
                         },
                         {
                             "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{image_base64}"
-                            }
+                            "image_url": image_url_part
                         }
                     ]
                 }
             ]
 
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                max_tokens=1000,
+            response = await self._chat(
+                self.vision_model,
+                messages,
+                tools=[ORDER_TOOL],
+                tool_choice=ORDER_TOOL_CHOICE,
+                max_tokens=self.max_tokens,
                 temperature=0.1
             )
+            record_usage(self.vision_model, response.usage, self.router.costs)
 
-            extracted_data = response.choices[0].message.content.strip()
+            order = parse_order_response(response)
             logger.info("Image order extraction completed", 
-                       extracted_data=extracted_data,
-                       response_length=len(extracted_data),
+                       items=len(order.items) if order else 0,
                        finish_reason=response.choices[0].finish_reason)
             
             # Check if response was truncated
             if response.choices[0].finish_reason == "length":
                 logger.warning("Image response was truncated due to token limit", 
-                             extracted_data=extracted_data,
-                             max_tokens=1000)
+                             max_tokens=self.max_tokens)
+            elif order is not None:
+                await self._media_cache_set(cache_namespace, media_sha256, order)
             
-            print("Raw OpenAI content:", extracted_data)
-            return extracted_data
+            return order if order and order.items else None
 
         except Exception as e:
             logger.error("Error in OpenAI API call", 
@@ -197,32 +410,41 @@ Process any order message following this exact format with no additional comment
                             image_url=image_url)
             raise OpenAIError("Error in OpenAI API call", details={"error": str(e)})
 
-    async def transcribe_audio(self, audio_url: str) -> Optional[str]:
-        try:
-            account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-            auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-            
-            if not account_sid or not auth_token:
-                raise OpenAIError("Twilio credentials not found in environment variables")
-            auth = aiohttp.BasicAuth(account_sid, auth_token)
-            async with aiohttp.ClientSession() as session:
-                async with session.get(audio_url, auth=auth) as response:
-                    if response.status != 200:
-                        logger.error("Failed to download audio", 
-                                        status=response.status,
-                                        url=audio_url)
-                        raise OpenAIError(f"Failed to download audio: {response.status}")
-                    audio_data = await response.read()
-
-            # Transcribe audio using OpenAI Whisper
+    async def _transcribe_chunk(self, chunk: AudioChunk, semaphore: asyncio.Semaphore) -> str:
+        async with semaphore:
             # Note: Don't specify language parameter for auto-detection
-            transcription = await self.client.audio.transcriptions.create(
-                model="whisper-1",
-                file=("audio.wav", audio_data, "audio/wav")
-                # Removed language="auto" - Whisper will auto-detect language
+            transcription = await self.rate_limiter.run(
+                self.transcription_model,
+                0,
+                lambda: self.client.audio.transcriptions.create(
+                    model=self.transcription_model,
+                    file=(chunk.filename, chunk.data, chunk.content_type)
+                )
             )
+        return transcription.text.strip()
 
-            transcribed_text = transcription.text
+    async def transcribe_audio(self, audio_url: str) -> Optional[str]:
+        try:
+            with await self.media_fetcher.fetch(audio_url) as media:
+                cache_key, cached = await self._cache_get("audio", media.sha256, self.transcription_model)
+                if cached is not None:
+                    return cached
+
+                if self.audio_pipeline:
+                    chunks = await self.audio_pipeline.prepare(media)
+                else:
+                    data = media.read()
+                    extension, content_type = AUDIO_FORMATS[detect_audio_format(data[:16], media.content_type)]
+                    chunks = [AudioChunk(0, data, f"audio.{extension}", content_type)]
+
+            # Transcribe audio using OpenAI Whisper, chunks of long notes in parallel
+            # (capped per note, so one long note cannot hold up the others)
+            semaphore = asyncio.Semaphore(self.audio_max_parallel)
+            texts = await asyncio.gather(*(self._transcribe_chunk(chunk, semaphore) for chunk in chunks))
+            transcribed_text = " ".join(text for text in texts if text)
+            if len(chunks) > 1:
+                logger.info("Audio chunks transcribed", audio_url=audio_url, chunks=len(chunks))
+            await self._cache_set(cache_key, transcribed_text)
             logger.info("Audio transcribed successfully", 
                            audio_url=audio_url, 
                            transcription_length=len(transcribed_text),
@@ -236,7 +458,11 @@ Process any order message following this exact format with no additional comment
                             audio_url=audio_url)
             raise OpenAIError("Error in audio transcription", details={"error": str(e)})
 
-    async def extract_order_from_audio(self, audio_url: str) -> Optional[OrderDetails]:
+    async def extract_order_from_audio(
+        self,
+        audio_url: str,
+        on_item: Optional[Callable[[OrderLineItem], Awaitable[None]]] = None
+    ) -> Optional[OrderDetails]:
         """Extract order details from audio by first transcribing it."""
         try:
             # Step 1: Transcribe the audio
@@ -251,7 +477,7 @@ Process any order message following this exact format with no additional comment
                            transcription=transcribed_text)
             
             # Step 2: Extract order details from transcribed text
-            order_details = await self.extract_order_details(transcribed_text)
+            order_details = await self.extract_order_details(transcribed_text, on_item=on_item)
             
             return order_details
 
@@ -261,122 +487,119 @@ Process any order message following this exact format with no additional comment
                             audio_url=audio_url)
             raise OpenAIError("Error in audio order extraction", details={"error": str(e)})
 
-    async def extract_text_with_ocr(self, pdf_data: bytes) -> str:
-        logger.info("Starting OCR extraction for PDF", size=len(pdf_data))
-        images = convert_from_bytes(pdf_data)
-        extracted_text = ""
-        for idx, img in enumerate(images):
-            logger.info("Running OCR on page", page=idx+1)
-            try:
-                text = pytesseract.image_to_string(img)
-                logger.info("OCR result for page", page=idx+1, text_length=len(text))
-                extracted_text += text + "\n"
-            except Exception as ocr_error:
-                logger.error("OCR failed on page", page=idx+1, error=str(ocr_error))
-        logger.info("Completed OCR extraction for PDF", total_text_length=len(extracted_text))
-        return extracted_text
-
-    async def extract_order_from_pdf(self, pdf_url: str) -> Optional[OrderDetails]:
+    async def extract_order_from_pdf(
+        self,
+        pdf_url: str,
+        on_item: Optional[Callable[[OrderLineItem], Awaitable[None]]] = None
+    ) -> Optional[OrderDetails]:
+        """Extract an order from a PDF; None when it holds no order.
+
+        Raises ``UnreadableMediaError`` (with a message for the sender) when
+        the file cannot be read at all, and ``OpenAIError`` when the model
+        call fails.
+        """
         logger.info("Starting PDF extraction", pdf_url=pdf_url)
-        # Check for pdftoppm binary required by pdf2image
-        if not shutil.which("pdftoppm"):
-            logger.error("pdftoppm (poppler-utils) not found in PATH. PDF to image conversion will fail.")
-            return {
-                "message": "PDF processing is not available because pdftoppm (poppler-utils) is missing on the server. Please contact support.",
-                "pdf_url": pdf_url,
-                "status": "pdf_extraction_failed"
-            }
         try:
-            account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-            auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-            
-            if not account_sid or not auth_token:
-                logger.error("Twilio credentials missing for PDF extraction")
-                raise OpenAIError("Twilio credentials not found in environment variables")
-
-            auth = aiohttp.BasicAuth(account_sid, auth_token)
-            async with aiohttp.ClientSession() as session:
-                async with session.get(pdf_url, auth=auth) as response:
-                    if response.status != 200:
-                        logger.error("Failed to download PDF", 
-                                        status=response.status,
-                                        url=pdf_url)
-                        raise OpenAIError(f"Failed to download PDF: {response.status}")
-                    pdf_data = await response.read()
+            cache_namespace = f"pdf:{self.router.cache_namespace}:{PROMPT_VERSION}"
+            with await self.media_fetcher.fetch(pdf_url) as media:
+                media_sha256 = media.sha256
+                cached = await self._media_cache_get(cache_namespace, media)
+                if cached is not None:
+                    await self._emit_items(cached, on_item)
+                    return cached
+                pdf_data = media.read()
             logger.info("PDF downloaded", size=len(pdf_data))
 
-            # Use LangChain's PyPDFLoader for better text extraction
             try:
-                logger.info("Attempting LangChain text extraction")
-                # Create a temporary file to save the PDF
-                with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                    temp_file.write(pdf_data)
-                    temp_file_path = temp_file.name
-                
-                logger.info("Temporary PDF file created", temp_file_path=temp_file_path, file_size=len(pdf_data))
-                
-                # Use LangChain's PyPDFLoader
-                loader = PyPDFLoader(temp_file_path)
-                logger.info("PyPDFLoader initialized, loading documents")
-                documents = loader.load()
-                logger.info("Documents loaded from PDF", document_count=len(documents))
-                
-                # Extract text from all pages
-                extracted_text = ""
-                for doc in documents:
-                    if doc.page_content:
-                        extracted_text += doc.page_content + "\n"
-                
-                # Clean up temporary file
-                os.unlink(temp_file_path)
-                logger.info("Temporary file cleaned up")
+                pdf_text = await asyncio.to_thread(
+                    extract_pdf_text,
+                    pdf_data,
+                    max_pages=self.pdf_max_pages,
+                    max_chars=self.pdf_max_chars,
+                    min_chars=self.pdf_ocr_min_chars,
+                    min_density=self.pdf_ocr_min_density,
+                    target_pixels=self.ocr_target_pixels,
+                    min_dpi=self.ocr_min_dpi,
+                    max_dpi=self.ocr_max_dpi
+                )
+                logger.info("PDF text extraction done",
+                           text_length=len(pdf_text.text),
+                           pages=pdf_text.page_count,
+                           pages_read=len(pdf_text.pages),
+                           ocr_pages=sorted(pdf_text.ocr_pages),
+                           stopped_early=pdf_text.stopped_early)
                 
-                logger.info("LangChain extraction done", text_length=len(extracted_text), pages=len(documents))
-                
-                # OCR fallback if no text extracted
-                if not extracted_text.strip():
-                    logger.warning("No text extracted from PDF, attempting OCR", pdf_url=pdf_url)
-                    extracted_text = await self.extract_text_with_ocr(pdf_data)
-                    logger.info("OCR extraction done", text_length=len(extracted_text))
-                    if not extracted_text.strip():
-                        logger.error("No text extracted from PDF, even with OCR", pdf_url=pdf_url)
-                        return {
-                            "message": "The PDF appears to be empty or contains no extractable text, even with OCR. Please send your order as text or image.",
-                            "pdf_url": pdf_url,
-                            "status": "no_text_extracted"
-                        }
-                
-                # Process the extracted text with the existing order extraction method
-                logger.info("Sending extracted text to OpenAI for order extraction", text_length=len(extracted_text))
-                order_details = await self.extract_order_details(extracted_text)
-                
-                if order_details:
-                    logger.info("Order details extracted from PDF text", 
-                                   pdf_url=pdf_url,
-                                   order_details=order_details)
-                    return order_details
-                else:
-                    logger.warning("No order details found in extracted text", pdf_url=pdf_url)
-                    return {
-                        "message": "I couldn't detect any order details in the PDF content. Please ensure the PDF contains clear order information or send your order as text.",
-                        "pdf_url": pdf_url,
-                        "extracted_text": extracted_text[:200] + "..." if len(extracted_text) > 200 else extracted_text,
-                        "status": "no_order_found"
-                    }
-                    
+                # System-generated POs: read the item table directly when it is fully recognized
+                table_order = None
+                if self.table_parser and not pdf_text.ocr_pages and TABLE_HINT.search(pdf_text.text):
+                    layout_pages = await asyncio.to_thread(extract_layout_text, pdf_data, len(pdf_text.pages))
+                    table_order = self.table_parser.parse(layout_pages)
+                    if not table_order:
+                        logger.info("PDF table not fully recognized, using the model", pdf_url=pdf_url)
+
+                # OCR only the pages whose text layer is missing or too thin
+                if not table_order and pdf_text.ocr_pages:
+                    # Check for pdftoppm binary required by pdf2image
+                    if shutil.which("pdftoppm"):
+                        ocr_texts = await self.ocr_service.recognize_pages(pdf_data, pdf_text.ocr_pages)
+                        pdf_text.merge_ocr(ocr_texts)
+                        logger.info("OCR extraction done", pages=sorted(ocr_texts), text_length=sum(len(text) for text in ocr_texts.values()))
+                    elif not pdf_text.text.strip():
+                        logger.error("pdftoppm (poppler-utils) not found in PATH. PDF to image conversion will fail.")
+                        raise UnreadableMediaError(
+                            "pdftoppm is not installed",
+                            "PDF processing is not available because pdftoppm (poppler-utils) is missing on the server. Please contact support.",
+                            details={"pdf_url": pdf_url, "status": "pdf_extraction_failed"}
+                        )
+                    else:
+                        logger.warning("pdftoppm not found, skipping OCR of image-only pages", pdf_url=pdf_url, pages=sorted(pdf_text.ocr_pages))
+
+            except UnreadableMediaError:
+                raise
             except Exception as pdf_error:
-                logger.error("Error extracting text from PDF using LangChain", 
+                logger.error("Error extracting text from PDF", 
                                 error=str(pdf_error),
                                 error_type=type(pdf_error).__name__,
                                 pdf_url=pdf_url,
                                 pdf_size=len(pdf_data))
-                return {
-                    "message": "Sorry, I couldn't read the PDF file. It might be corrupted, password-protected, or in an unsupported format. Please send your order as text or image.",
-                    "pdf_url": pdf_url,
-                    "status": "pdf_extraction_failed",
-                    "error_details": str(pdf_error)
-                }
+                raise UnreadableMediaError(
+                    "Error extracting text from PDF",
+                    "Sorry, I couldn't read the PDF file. It might be corrupted, password-protected, or in an unsupported format. Please send your order as text or image.",
+                    details={"pdf_url": pdf_url, "status": "pdf_extraction_failed", "error": str(pdf_error)}
+                ) from pdf_error
+
+            if table_order:
+                logger.info("Order read from PDF table", pdf_url=pdf_url, items=len(table_order.items))
+                await self._emit_items(table_order, on_item)
+                await self._media_cache_set(cache_namespace, media_sha256, table_order)
+                return table_order
+
+            extracted_text = pdf_text.text
+            if not extracted_text.strip():
+                logger.error("No text extracted from PDF, even with OCR", pdf_url=pdf_url)
+                raise UnreadableMediaError(
+                    "No text extracted from PDF",
+                    "The PDF appears to be empty or contains no extractable text, even with OCR. Please send your order as text or image.",
+                    details={"pdf_url": pdf_url, "status": "no_text_extracted"}
+                )
+            
+            # Outside the try above: a rate limit or timeout here says nothing about the file
+            logger.info("Sending extracted text to OpenAI for order extraction", text_length=len(extracted_text))
+            order_details = await self.extract_order_details(extracted_text, on_item=on_item)
+            
+            if order_details:
+                logger.info("Order details extracted from PDF text", 
+                               pdf_url=pdf_url,
+                               items=len(order_details.items))
+                await self._media_cache_set(cache_namespace, media_sha256, order_details)
+                return order_details
+            else:
+                logger.warning("No order details found in extracted text", pdf_url=pdf_url,
+                               extracted_text=extracted_text[:200])
+                return None
 
+        except (UnreadableMediaError, OpenAIError):
+            raise
         except Exception as e:
             logger.error("Error in PDF order extraction", 
                             error=str(e),
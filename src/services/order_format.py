@@ -0,0 +1,166 @@
+import json
+from typing import Any, List, Optional
+import structlog
+from pydantic import ValidationError as PydanticValidationError
+from src.models.order import OrderDetails, OrderLineItem
+from src.services.prompts import ORDER_TOOL_NAME
+
+logger = structlog.get_logger(__name__)
+
+CURRENCY_SYMBOLS = {"INR": "₹"}
+
+def format_rate(item: OrderLineItem) -> str:
+    if item.rate is None:
+        return "Standard Rate"
+    amount = f"{item.rate:g}"
+    currency = (item.currency or "").upper()
+    if currency in CURRENCY_SYMBOLS:
+        return f"{CURRENCY_SYMBOLS[currency]}{amount}"
+    if currency:
+        return f"{currency} {amount}"
+    return amount
+
+def render_order_lines(order: OrderDetails) -> str:
+    """Render an order in the numbered line format salesmen are used to."""
+    lines = [
+        f"{number}. Item: {item.item_name}, Rate: {format_rate(item)}, UOM: {item.uom}, Qty: {item.quantity:g}"
+        for number, item in enumerate(order.items, start=1)
+    ]
+    if order.customer_name:
+        lines.append(f"Customer Name: {order.customer_name}")
+    if order.instructions:
+        lines.append(order.instructions)
+    return "\n".join(lines)
+
+def _item_key(item: OrderLineItem) -> tuple:
+    return (" ".join(item.item_name.lower().split()), item.uom.upper(), item.quantity, item.rate)
+
+def merge_orders(orders: List[OrderDetails], dedupe_boundaries: bool = False) -> OrderDetails:
+    """Merge several extracted orders into one, keeping items in source order.
+
+    With ``dedupe_boundaries`` the orders are consecutive chunks of one
+    document, and an order's first item is dropped when it repeats the
+    previous order's last item (same name, UOM, quantity and rate): a row at
+    a chunk boundary can be read by both chunks. Any other repeat is a real
+    order line and is kept.
+    """
+    items: List[OrderLineItem] = []
+    customers: List[str] = []
+    instructions: List[str] = []
+    previous_last = None
+    for order in orders:
+        order_items = order.items
+        if dedupe_boundaries and order_items and _item_key(order_items[0]) == previous_last:
+            order_items = order_items[1:]
+        items.extend(order_items)
+        if order.items:
+            previous_last = _item_key(order.items[-1])
+        if order.customer_name and order.customer_name not in customers:
+            customers.append(order.customer_name)
+        if order.instructions and order.instructions not in instructions:
+            instructions.append(order.instructions)
+    return OrderDetails(
+        items=items,
+        customer_name=", ".join(customers) or None,
+        instructions="\n".join(instructions) or None,
+    )
+
+def parse_order_arguments(arguments: Optional[str]) -> Optional[OrderDetails]:
+    """Validate the JSON arguments of a ``record_order`` tool call."""
+    if not arguments:
+        return None
+    try:
+        return OrderDetails.model_validate_json(arguments)
+    except PydanticValidationError as e:
+        logger.warning("order_tool_arguments_invalid", error=str(e))
+        return None
+
+def parse_order_response(response: Any) -> Optional[OrderDetails]:
+    """Extract the order from a chat completion that was forced to call ``record_order``."""
+    message = response.choices[0].message
+    for tool_call in message.tool_calls or []:
+        if tool_call.function.name == ORDER_TOOL_NAME:
+            return parse_order_arguments(tool_call.function.arguments)
+    return None
+
+class OrderStreamParser:
+    """Incrementally parses streamed ``record_order`` arguments.
+
+    ``feed`` takes argument fragments as they arrive from a streaming
+    completion and returns every line item whose JSON object closed in
+    that fragment, so downstream work can start before generation ends.
+    ``result`` returns the whole order once the stream is done (or the
+    items seen so far when the JSON was cut off).
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.items: List[OrderLineItem] = []
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._last_string = None
+        self._items_depth = None
+        self._item_start = None
+
+    def feed(self, fragment: str) -> List[OrderLineItem]:
+        self.buffer += fragment
+        completed: List[OrderLineItem] = []
+        while self._position < len(self.buffer):
+            char = self.buffer[self._position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = self.buffer[self._string_start:self._position]
+            elif char == '"':
+                self._in_string = True
+                self._string_start = self._position + 1
+            elif char in "{[":
+                if char == "[" and self._depth == 1 and self._items_depth is None and self._last_string == "items":
+                    self._items_depth = self._depth + 1
+                elif char == "{" and self._items_depth is not None and self._depth == self._items_depth:
+                    self._item_start = self._position
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if char == "}" and self._item_start is not None and self._depth == self._items_depth:
+                    item = self._parse_item(self.buffer[self._item_start:self._position + 1])
+                    self._item_start = None
+                    if item is not None:
+                        self.items.append(item)
+                        completed.append(item)
+                elif char == "]" and self._items_depth is not None and self._depth == self._items_depth - 1:
+                    self._items_depth = -1
+            self._position += 1
+        return completed
+
+    def result(self) -> OrderDetails:
+        order = parse_order_arguments(self.buffer)
+        if order is not None and len(order.items) == len(self.items):
+            return order
+        # Fall back to the items that validated; keep the other fields if the JSON itself is whole.
+        try:
+            raw = json.loads(self.buffer)
+        except ValueError:
+            raw = {}
+        if not isinstance(raw, dict):
+            raw = {}
+        return OrderDetails(
+            items=list(self.items),
+            customer_name=raw.get("customer_name") if isinstance(raw.get("customer_name"), str) else None,
+            instructions=raw.get("instructions") if isinstance(raw.get("instructions"), str) else None,
+        )
+
+    @staticmethod
+    def _parse_item(raw: str) -> Optional[OrderLineItem]:
+        try:
+            return OrderLineItem.model_validate_json(raw)
+        except PydanticValidationError as e:
+            logger.warning("streamed_order_item_invalid", error=str(e))
+            return None
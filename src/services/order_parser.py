@@ -0,0 +1,143 @@
+import re
+import time
+from typing import List, Optional, Tuple
+import structlog
+from src.core.metrics import metrics
+from src.models.order import OrderDetails, OrderLineItem
+from src.services.prompts import UOM_ALIASES
+
+UOM_BY_ALIAS = {alias: code for code, aliases in UOM_ALIASES.items() for alias in aliases}
+_UOM = "|".join(sorted((re.escape(alias) for alias in UOM_BY_ALIAS), key=len, reverse=True))
+_QTY = r"(?P<qty>\d{1,5}(?:\.\d+)?)"
+_ITEM = r"(?P<item>[a-z][a-z'\- ]*?[a-z])"
+_RATE = (
+    r"(?:\s+(?:at|@)\s*(?P<rate>(?:rs\.?|inr|aed|₹)?\s*\d+(?:\.\d+)?)"
+    r"\s*(?P<currency>rs|rupees?|aed|dirhams?)?(?:\s*(?:each|per\s+\w+))?)?"
+)
+
+LINE_PATTERNS = [
+    # "3 ctn almond", "3 cartons of almonds at 20 aed"
+    re.compile(rf"^{_QTY}\s*(?P<uom>{_UOM})\.?\s+(?:of\s+)?{_ITEM}{_RATE}$", re.IGNORECASE),
+    # "22 cashew packets"
+    re.compile(rf"^{_QTY}\s+{_ITEM}\s+(?P<uom>{_UOM})\.?{_RATE}$", re.IGNORECASE),
+    # "almond 3 ctn", "almond - 3 ctn"
+    re.compile(rf"^{_ITEM}\s*[-:]?\s*{_QTY}\s*(?P<uom>{_UOM})\.?{_RATE}$", re.IGNORECASE),
+]
+CUSTOMER_SUFFIX = re.compile(r"^(?P<rest>.*?)\s*\bfor\s+(?P<customer>[A-Za-z][\w&'.\- ]{1,60}?)\s*[.!]?$", re.IGNORECASE)
+CUSTOMER_LINE = re.compile(r"^(?:customer(?:\s+name)?|for)\s*[:\-]?\s*(?P<customer>[A-Za-z][\w&'.\- ]{1,60}?)\s*[.!]?$", re.IGNORECASE)
+LEADING_FILLER = re.compile(r"^(?:(?:hi|hello|pls|please|kindly|need|send|want|i\s+need|i\s+want|we\s+need|order)\b[\s,:]*)+", re.IGNORECASE)
+SEGMENT_SPLIT = re.compile(r"\s*(?:[\n,;]|\band\b)\s*", re.IGNORECASE)
+ITEM_STOPWORDS = {"for", "and", "of", "at", "the", "with", "customer", "rate", "price"}
+# Delivery and timing words: "for tomorrow" is an instruction, not a customer.
+TIME_WORDS = {
+    "today", "tomorrow", "tonight", "morning", "afternoon", "evening", "noon", "now", "asap", "urgent", "urgently",
+    "delivery", "deliver", "dispatch", "week", "weekend", "day", "monday", "tuesday", "wednesday",
+    "thursday", "friday", "saturday", "sunday",
+}
+# Words around an item that change what is meant; the model reads those lines.
+FILLER_WORDS = {
+    "send", "need", "want", "please", "pls", "plz", "kindly", "thanks", "thank", "thx", "also", "more", "extra",
+    "same", "usual", "again", "only", "approx", "around", "about",
+}
+
+class FastPathOrderParser:
+    """Parses simple orders locally so they do not need a model call.
+
+    Handles messages made only of "<qty> <uom> <item>" style lines (in any
+    of a few word orders), optionally with a rate and a trailing
+    "for <customer>". Anything it cannot account for completely returns
+    None and goes to the LLM instead: a "for" that names a time or delivery
+    ("for tomorrow"), or filler and timing words around an item ("raisins
+    asap", "almond please"). Output is the same ``OrderDetails``
+    the model's ``record_order`` call produces.
+    """
+
+    def __init__(self, max_items: int = 30):
+        self.max_items = max_items
+        self.logger = structlog.get_logger(__name__)
+
+    def parse(self, text: str) -> Optional[OrderDetails]:
+        started = time.perf_counter()
+        result = self._parse(text)
+        metrics.observe("fast_path.parse_ms", (time.perf_counter() - started) * 1000)
+        metrics.increment("fast_path.hit" if result else "fast_path.miss")
+        return result
+
+    def _parse(self, text: str) -> Optional[OrderDetails]:
+        body = LEADING_FILLER.sub("", text.strip())
+        segments = [segment.strip(" .") for segment in SEGMENT_SPLIT.split(body) if segment.strip(" .")]
+        if not segments or len(segments) > self.max_items + 1:
+            return None
+
+        customer = None
+        items: List[OrderLineItem] = []
+        for index, segment in enumerate(segments):
+            is_last = index == len(segments) - 1
+            customer_only = CUSTOMER_LINE.match(segment)
+            if customer_only and is_last:
+                customer = customer_only.group("customer")
+                if self._has_time_words(customer):
+                    return None
+                continue
+            if is_last:
+                suffix = CUSTOMER_SUFFIX.match(segment)
+                if suffix and suffix.group("rest"):
+                    customer = suffix.group("customer")
+                    if self._has_time_words(customer):
+                        return None
+                    segment = suffix.group("rest")
+            item = self._parse_item(segment)
+            if item is None:
+                return None
+            items.append(item)
+
+        if not items:
+            return None
+        return OrderDetails(items=items, customer_name=customer.strip() if customer else None)
+
+    def _parse_item(self, segment: str) -> Optional[OrderLineItem]:
+        for pattern in LINE_PATTERNS:
+            match = pattern.match(segment)
+            if not match:
+                continue
+            words = match.group("item").split()
+            if len(words) > 5 or any(
+                word.lower() in ITEM_STOPWORDS or word.lower() in UOM_BY_ALIAS or word.lower() in TIME_WORDS or word.lower() in FILLER_WORDS
+                for word in words
+            ):
+                return None
+            qty = float(match.group("qty"))
+            if qty <= 0:
+                return None
+            rate, currency = self._rate(match.group("rate"), match.group("currency"))
+            return OrderLineItem(
+                item_name=self._item_name(words),
+                quantity=qty,
+                uom=UOM_BY_ALIAS[match.group("uom").lower()],
+                rate=rate,
+                currency=currency,
+            )
+        return None
+
+    @staticmethod
+    def _has_time_words(text: str) -> bool:
+        return any(word in TIME_WORDS for word in re.findall(r"[a-z]+", text.lower()))
+
+    @staticmethod
+    def _item_name(words: List[str]) -> str:
+        last = words[-1]
+        if len(last) > 3 and last.lower().endswith("s") and not last.lower().endswith("ss"):
+            words = words[:-1] + [last[:-1]]
+        return " ".join(word.capitalize() for word in words)
+
+    @staticmethod
+    def _rate(rate: Optional[str], currency: Optional[str]) -> Tuple[Optional[float], Optional[str]]:
+        if not rate:
+            return None, None
+        amount = float(re.sub(r"[^\d.]", "", rate))
+        marker = (rate + " " + (currency or "")).lower()
+        if "aed" in marker or "dirham" in marker:
+            return amount, "AED"
+        if "rs" in marker or "rupee" in marker or "inr" in marker or "₹" in marker:
+            return amount, "INR"
+        return amount, None
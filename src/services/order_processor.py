@@ -0,0 +1,217 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import structlog
+from src.core.exceptions import OpenAIError, UnreadableMediaError
+from src.models.order import OrderDetails, OrderLineItem
+from src.models.webhook import InboundMessage, MediaAttachment
+from src.services.openai_service import OpenAIService
+from src.services.order_format import merge_orders, render_order_lines
+from src.services.twillio_service import TwillioService
+
+ERROR_MESSAGES = {
+    "text": "⚠️ There was an error processing your order. Please try again later.",
+    "image": "⚠️ Sorry, we couldn't process the image. Please try again with a clearer photo or send it as text.",
+    "audio": "⚠️ Sorry, we couldn't process the audio. Please try again with clearer speech or send your order as text.",
+    "pdf": "⚠️ Sorry, we couldn't process the PDF. Please try again with a different file or send your order as text.",
+}
+NO_ORDER_MESSAGES = {
+    "text": "✅ Order received: No order details found.",
+    "image": "I couldn't detect any order details in the image. Please send your order as text.",
+    "audio": "I couldn't detect any order details in the audio. Please send your order as text or try speaking more clearly.",
+    "pdf": "I couldn't detect any order details in the PDF content. Please ensure the PDF contains clear order information or send your order as text.",
+}
+MULTI_ERROR_MESSAGE = "⚠️ Sorry, we couldn't process your attachments. Please try again or send your order as text."
+MULTI_NO_ORDER_MESSAGE = "I couldn't detect any order details in your message. Please send your order as text."
+HELP_MESSAGE = "Please send your order as text, image, audio, or PDF."
+
+def format_order_confirmation(order: Optional[OrderDetails]) -> str:
+    if not order or not order.items:
+        return "✅ Order received: No order details found."
+    confirmation = f"✅ Order received:\n{render_order_lines(order)}"
+
+    return confirmation
+
+def media_kind(attachment: MediaAttachment) -> Optional[str]:
+    content_type = (attachment.content_type or "").lower()
+    if content_type.startswith("image/"):
+        return "image"
+    if content_type.startswith("audio/"):
+        return "audio"
+    if content_type == "application/pdf":
+        return "pdf"
+    return None
+
+class OrderProcessor:
+    """Runs the order pipeline for one inbound WhatsApp message.
+
+    The text body and every supported attachment (image, audio, PDF) are
+    extracted concurrently, at most ``media_concurrency`` at a time, and
+    merged into one order so the salesman gets a single confirmation.
+
+    ``item_resolver``, when set, post-processes every line item (e.g. to
+    match it against the item catalog) once the order has been extracted.
+    With ``stream_items`` (for slow, remote resolvers) text, audio and PDF
+    extraction are streamed instead, so each item is resolved while the
+    model is still generating the rest of the order. Streaming always uses
+    the most capable model, bypassing cheap-first routing and hedging, so
+    leave it off for local resolvers.
+    """
+
+    def __init__(
+        self,
+        openai_service: OpenAIService,
+        twillio_service: TwillioService,
+        media_concurrency: int = 4,
+        item_resolver: Optional[Callable[[OrderLineItem], Awaitable[OrderLineItem]]] = None,
+        stream_items: bool = False,
+    ):
+        self.openai_service = openai_service
+        self.twillio_service = twillio_service
+        self.media_concurrency = max(media_concurrency, 1)
+        self.item_resolver = item_resolver
+        self.stream_items = stream_items
+        self.logger = structlog.get_logger(__name__)
+
+    async def process(self, message: InboundMessage, retry_failures: bool = False) -> Dict[str, Any]:
+        """Process a message end to end and return a short outcome summary.
+
+        With ``retry_failures``, a message that yields no order because an
+        input failed with ``OpenAIError`` (rate limit, timeout, 5xx) raises
+        it instead of sending the error reply, so the job can be retried.
+        """
+        from_number = message.from_number
+        sources: List[Tuple[str, str]] = []
+        if message.body and message.body.strip():
+            sources.append(("text", message.body.strip()))
+        for attachment in message.media:
+            kind = media_kind(attachment)
+            if kind:
+                sources.append((kind, attachment.url))
+            else:
+                self.logger.warning("unsupported_attachment", from_number=from_number, content_type=attachment.content_type)
+
+        if not sources:
+            self.logger.warning("empty_or_unsupported_input", from_number=from_number)
+            await self.reply(HELP_MESSAGE, from_number)
+            return {"status": "unsupported", "reply": HELP_MESSAGE}
+
+        inputs = [kind for kind, _ in sources]
+        self.logger.info("Processing message", from_number=from_number, inputs=inputs)
+        semaphore = asyncio.Semaphore(self.media_concurrency)
+
+        async def bounded(kind: str, payload: str):
+            async with semaphore:
+                return await self._extract(kind, payload)
+
+        results = await asyncio.gather(
+            *(bounded(kind, payload) for kind, payload in sources),
+            return_exceptions=True,
+        )
+
+        orders: List[OrderDetails] = []
+        failures: List[str] = []
+        for (kind, payload), result in zip(sources, results):
+            if isinstance(result, UnreadableMediaError):
+                self.logger.warning("attachment_not_readable", kind=kind, status=result.details.get("status"))
+                failures.append(kind)
+            elif isinstance(result, BaseException):
+                self.logger.error(f"failed_to_process_{kind}_order", error=str(result), source=payload if kind != "text" else None)
+                failures.append(kind)
+            elif result and result.items:
+                self.logger.info(f"Order details extracted from {kind}", items=len(result.items))
+                orders.append(result)
+
+        single = sources[0][0] if len(sources) == 1 else None
+        if not orders:
+            model_errors = [result for result in results if isinstance(result, OpenAIError)]
+            if retry_failures and model_errors:
+                raise model_errors[0]
+            if failures:
+                if single and isinstance(results[0], UnreadableMediaError):
+                    error_message = results[0].user_message
+                else:
+                    error_message = ERROR_MESSAGES[single] if single else MULTI_ERROR_MESSAGE
+                await self.reply(error_message, from_number)
+                return {"status": "failed", "inputs": inputs, "reply": error_message}
+            no_order_message = NO_ORDER_MESSAGES[single] if single else MULTI_NO_ORDER_MESSAGE
+            await self.reply(no_order_message, from_number)
+            return {"status": "no_order_found", "inputs": inputs, "reply": no_order_message}
+
+        order = orders[0] if len(orders) == 1 else merge_orders(orders)
+        confirmation_message = format_order_confirmation(order)
+        if failures:
+            confirmation_message += f"\n⚠️ {len(failures)} attachment(s) could not be read. Please resend them or type those items."
+        await self.reply(confirmation_message, from_number)
+        return {
+            "status": "processed",
+            "inputs": inputs,
+            "failed": failures,
+            "order": order.dict(),
+            "reply": confirmation_message,
+        }
+
+    async def _extract(self, kind: str, payload: str):
+        if not self.item_resolver:
+            return await self._run_extraction(kind, payload)
+        if not self.stream_items:
+            result = await self._run_extraction(kind, payload)
+            if not result or not result.items:
+                return result
+            resolving = [asyncio.create_task(self.item_resolver(item)) for item in result.items]
+            return await self._apply_resolved(result, resolving)
+
+        # Chunks of a long document stream concurrently, so items arrive out
+        # of document order; lookups are keyed by the item and applied to the
+        # final (merged, document-ordered) items.
+        streamed: Dict[str, asyncio.Task] = {}
+
+        async def on_item(item: OrderLineItem) -> None:
+            key = item.model_dump_json()
+            if key not in streamed:
+                streamed[key] = asyncio.create_task(self.item_resolver(item))
+
+        try:
+            result = await self._run_extraction(kind, payload, on_item)
+        except BaseException:
+            for task in streamed.values():
+                task.cancel()
+            raise
+        if not result or not result.items:
+            for task in streamed.values():
+                task.cancel()
+            return result
+        resolving = []
+        for item in result.items:
+            # Items that were not streamed (images, retried chunks) are resolved now.
+            key = item.model_dump_json()
+            if key not in streamed:
+                streamed[key] = asyncio.create_task(self.item_resolver(item))
+            resolving.append(streamed[key])
+        for task in streamed.values():
+            if task not in resolving:
+                task.cancel()
+        return await self._apply_resolved(result, resolving)
+
+    async def _apply_resolved(self, result: OrderDetails, resolving: List[asyncio.Task]) -> OrderDetails:
+        resolved = await asyncio.gather(*resolving, return_exceptions=True)
+        items = []
+        for item, outcome in zip(result.items, resolved):
+            if isinstance(outcome, BaseException):
+                self.logger.warning("item_resolution_failed", item=item.item_name, error=str(outcome))
+                items.append(item)
+            else:
+                items.append(outcome)
+        return result.model_copy(update={"items": items})
+
+    async def _run_extraction(self, kind: str, payload: str, on_item=None):
+        if kind == "text":
+            return await self.openai_service.extract_order_details(payload, on_item=on_item)
+        if kind == "image":
+            return await self.openai_service.extract_order_from_image(payload)
+        if kind == "audio":
+            return await self.openai_service.extract_order_from_audio(payload, on_item=on_item)
+        return await self.openai_service.extract_order_from_pdf(payload, on_item=on_item)
+
+    async def reply(self, message: str, to: str) -> None:
+        """Send a WhatsApp reply without blocking the event loop on the Twilio client."""
+        await asyncio.to_thread(self.twillio_service.send_message, message, to)
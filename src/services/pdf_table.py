@@ -0,0 +1,222 @@
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import structlog
+from src.core.metrics import metrics
+from src.models.order import OrderDetails, OrderLineItem
+from src.services.order_parser import UOM_BY_ALIAS
+from src.services.pdf_text import ORDER_END
+
+# Column header wording seen on customer POs, by the field it holds.
+COLUMN_ALIASES = {
+    "item": ["item", "items", "item name", "item description", "description", "product", "product name", "particulars", "material", "goods"],
+    "code": ["item code", "code", "sku", "product code", "article no"],
+    "qty": ["qty", "quantity", "order qty", "ordered qty", "qty ordered"],
+    "uom": ["uom", "unit", "units", "unit of measure", "pack"],
+    "rate": ["rate", "price", "unit price", "unit rate", "rate per unit", "price per unit"],
+    "amount": ["amount", "total", "line total", "value", "net amount"],
+    "sno": ["s no", "sno", "sr no", "sl no", "no", "#", "line"],
+}
+COLUMN_BY_ALIAS = {alias: column for column, aliases in COLUMN_ALIASES.items() for alias in aliases}
+# PO systems print a few units the chat prompt never asks for.
+TABLE_UOMS = {**UOM_BY_ALIAS, "nos": "PCS", "no": "PCS", "ea": "PCS", "each": "PCS", "unit": "PCS", "units": "PCS"}
+
+CUSTOMER_FIELD = re.compile(r"^\s*(?:customer(?:\s+name)?|bill\s+to|buyer|party(?:\s+name)?)\s*[:\-]\s*(?P<customer>\S+(?: \S+)*)", re.IGNORECASE | re.MULTILINE)
+CELL = re.compile(r"\S+(?: \S+)*")
+NUMBER = re.compile(r"\d[\d,]*(?:\.\d+)?")
+CURRENCY_MARKERS = {"aed": "AED", "dhs": "AED", "dirham": "AED", "inr": "INR", "rs": "INR", "₹": "INR"}
+
+@dataclass
+class _Column:
+    field: str
+    start: int
+    end: int
+
+    @property
+    def center(self) -> float:
+        return (self.start + self.end) / 2
+
+def _cells(line: str) -> List[Tuple[int, int, str]]:
+    """Cells of a layout line: runs of text separated by two or more spaces."""
+    return [(match.start(), match.end(), match.group()) for match in CELL.finditer(line)]
+
+def _normalize(label: str) -> str:
+    label = re.sub(r"\(.*?\)", " ", label.lower())
+    return " ".join(re.sub(r"[^\w#₹ ]", " ", label).split())
+
+def _currency(text: str) -> Optional[str]:
+    lowered = text.lower()
+    for marker, code in CURRENCY_MARKERS.items():
+        if re.search(rf"(?<![a-z]){re.escape(marker)}(?![a-z])", lowered):
+            return code
+    return None
+
+def _number(text: str) -> Optional[float]:
+    stripped = re.sub(r"(?i)^(?:aed|dhs|inr|rs\.?|₹)\s*|\s*(?:aed|dhs|inr)$", "", text.strip())
+    if not NUMBER.fullmatch(stripped):
+        return None
+    return float(stripped.replace(",", ""))
+
+class PdfTableParser:
+    """Reads the line items of a system-generated PO straight from its table.
+
+    Works on layout-mode text (see ``extract_layout_text``): finds a header
+    line with at least an item and a quantity column plus a unit, rate or
+    amount column, then maps every following cell to the header column it
+    sits under. Wrapped descriptions are joined to their row, repeated
+    headers on later pages are skipped, and the table ends at a totals
+    line unless its header repeats on a later page (per-page totals).
+    Like ``FastPathOrderParser``, anything it cannot account for completely
+    (an unknown unit, a non-numeric quantity, an amount that is not
+    qty × rate) returns None and the PDF goes to the LLM instead.
+    """
+
+    def __init__(self, max_items: int = 200, amount_tolerance: float = 0.01):
+        self.max_items = max_items
+        self.amount_tolerance = amount_tolerance
+        self.logger = structlog.get_logger(__name__)
+
+    def parse(self, pages: List[str]) -> Optional[OrderDetails]:
+        started = time.perf_counter()
+        result = self._parse(pages)
+        metrics.observe("pdf_table.parse_ms", (time.perf_counter() - started) * 1000)
+        metrics.increment("pdf_table.hit" if result else "pdf_table.miss")
+        return result
+
+    def _parse(self, pages: List[str]) -> Optional[OrderDetails]:
+        columns: Optional[List[_Column]] = None
+        currency: Optional[str] = None
+        rows: List[Dict[str, str]] = []
+        closed = False
+        for page in pages:
+            # Continuation lines only follow a row directly, never across pages or gaps.
+            in_rows = False
+            for line in page.splitlines():
+                if not line.strip():
+                    in_rows = False
+                    continue
+                header = self._header(line)
+                if header:
+                    if columns and [column.field for column in header] != [column.field for column in columns]:
+                        return None
+                    columns = header
+                    currency = currency or _currency(line)
+                    in_rows = closed = False
+                    continue
+                if columns is None or closed:
+                    continue
+                if ORDER_END.search(line) or _normalize(line).startswith(("total", "sub total", "subtotal")):
+                    closed = bool(rows)
+                    in_rows = False
+                    continue
+                row = self._row(line, columns)
+                if row is None:
+                    return None
+                if row.get("qty"):
+                    rows.append(row)
+                    in_rows = True
+                elif in_rows and set(row) <= {"item", "code"}:
+                    # Description wrapped onto the next line of the same row.
+                    rows[-1]["item"] = f"{rows[-1].get('item', '')} {row.get('item', '')}".strip()
+                elif row.keys() & {"uom", "rate", "amount"}:
+                    # Looks like a row but has no quantity: not a table we can read.
+                    return None
+                else:
+                    # Page footers, notes and the like between or under the rows.
+                    in_rows = False
+
+        if not rows or len(rows) > self.max_items:
+            return None
+        items: List[OrderLineItem] = []
+        for row in rows:
+            item = self._item(row, currency)
+            if item is None:
+                return None
+            items.append(item)
+        return OrderDetails(items=items, customer_name=self._customer(pages))
+
+    @staticmethod
+    def _header(line: str) -> Optional[List[_Column]]:
+        columns = []
+        for start, end, text in _cells(line):
+            field = COLUMN_BY_ALIAS.get(_normalize(text))
+            if field is None and _normalize(text).startswith(("rate", "price", "unit price")):
+                field = "rate"
+            if field is None and _normalize(text).startswith(("amount", "total")):
+                field = "amount"
+            columns.append(_Column(field or "", start, end))
+        fields = [column.field for column in columns if column.field]
+        if "item" not in fields or "qty" not in fields or len(fields) != len(set(fields)):
+            return None
+        if not {"uom", "rate", "amount"} & set(fields):
+            return None
+        return columns
+
+    @staticmethod
+    def _row(line: str, columns: List[_Column]) -> Optional[Dict[str, str]]:
+        row: Dict[str, str] = {}
+        for start, end, text in _cells(line):
+            overlapping = [column for column in columns if start < column.end and end > column.start]
+            if len(overlapping) == 1:
+                column = overlapping[0]
+            else:
+                candidates = overlapping or columns
+                column = min(candidates, key=lambda column: abs(column.center - (start + end) / 2))
+            if not column.field:
+                continue
+            if column.field in row:
+                if column.field != "item":
+                    return None
+                row["item"] = f"{row['item']} {text}"
+            else:
+                row[column.field] = text
+        return row
+
+    def _item(self, row: Dict[str, str], currency: Optional[str]) -> Optional[OrderLineItem]:
+        name = row.get("item", "").strip()
+        qty_text = row["qty"]
+        uom_text = row.get("uom")
+        if uom_text is None:
+            # "10 CTN" in the quantity column
+            match = re.fullmatch(r"(?P<qty>\S+)\s+(?P<uom>[A-Za-z.]+)", qty_text)
+            if not match:
+                return None
+            qty_text, uom_text = match.group("qty"), match.group("uom")
+        qty = _number(qty_text)
+        uom = TABLE_UOMS.get(uom_text.lower().rstrip("."))
+        if not name or qty is None or qty <= 0 or uom is None:
+            return None
+
+        rate = amount = None
+        if row.get("rate"):
+            rate = _number(row["rate"])
+            if rate is None:
+                return None
+        if row.get("amount"):
+            amount = _number(row["amount"])
+            if amount is None:
+                return None
+        if rate is not None and amount is not None and abs(qty * rate - amount) > max(amount * self.amount_tolerance, 0.01):
+            # Discount, tax or a misread column: let the model make sense of it.
+            return None
+        if rate is None and amount is not None:
+            rate = round(amount / qty, 2)
+        row_currency = _currency(row.get("rate", "")) or _currency(row.get("amount", "")) or currency
+        return OrderLineItem(
+            item_name=name,
+            quantity=qty,
+            uom=uom,
+            rate=rate,
+            currency=row_currency if rate is not None else None,
+            # The code column holds the buyer's SKU; item_code is left for the catalog.
+            customer_item_code=row.get("code") or None,
+        )
+
+    @staticmethod
+    def _customer(pages: List[str]) -> Optional[str]:
+        for page in pages:
+            match = CUSTOMER_FIELD.search(page)
+            if match:
+                return match.group("customer").strip()
+        return None
@@ -0,0 +1,115 @@
+import io
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+from pypdf import PdfReader
+
+# A totals line after the items usually means the order part of a PO is over.
+ORDER_END = re.compile(r"\b(?:grand\s+total|net\s+total|total\s+amount|amount\s+in\s+words|total\s+qty)\b", re.IGNORECASE)
+# An item table header: a line naming both an item and a quantity column.
+TABLE_HINT = re.compile(r"^.*\b(?:item|description|product|particulars)\b.*\b(?:qty|quantity)\b.*$", re.IGNORECASE | re.MULTILINE)
+POINTS_PER_INCH = 72
+# Separates pages in ``PdfText.text`` so extraction can chunk at page boundaries.
+PAGE_BREAK = "\f"
+
+def choose_dpi(width_points: float, height_points: float, target_pixels: int = 3300, min_dpi: int = 150, max_dpi: int = 300) -> int:
+    """DPI that renders the page's long edge at about ``target_pixels``.
+
+    Small pages (receipts, A5 slips) get more DPI so their print stays
+    legible to Tesseract; large ones (A3, plotter scans) get less.
+    """
+    long_edge_inches = max(width_points, height_points) / POINTS_PER_INCH
+    if long_edge_inches <= 0:
+        return max_dpi
+    return int(min(max(target_pixels / long_edge_inches, min_dpi), max_dpi))
+
+@dataclass
+class PdfText:
+    pages: List[str] = field(default_factory=list)
+    page_count: int = 0
+    stopped_early: bool = False
+    # 1-based page number -> DPI, for pages whose text layer is missing or too thin
+    ocr_pages: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def text(self) -> str:
+        return PAGE_BREAK.join(page for page in self.pages if page)
+
+    def merge_ocr(self, texts: Dict[int, str]) -> None:
+        """Put OCR results in place of the thin text layer of their pages (kept if OCR found nothing)."""
+        for page_number, text in texts.items():
+            if text and text.strip():
+                self.pages[page_number - 1] = text
+
+def _page_info(page) -> Tuple[float, float, bool]:
+    box = page.mediabox
+    try:
+        has_images = len(page.images) > 0
+    except Exception:
+        has_images = True
+    return float(box.width), float(box.height), has_images
+
+def extract_pdf_text(
+    pdf_data: bytes,
+    max_pages: int = 20,
+    max_chars: int = 20000,
+    min_chars: int = 20,
+    min_density: float = 2.0,
+    target_pixels: int = 3300,
+    min_dpi: int = 150,
+    max_dpi: int = 300,
+) -> PdfText:
+    """Text layer of a PDF, read in memory one page at a time, plus the pages that need OCR.
+
+    A page is marked for OCR when it carries images and its text layer has
+    fewer than ``min_chars`` characters or fewer than ``min_density``
+    characters per square inch (a scan, perhaps with a typed header or
+    stamp). Pages without images have nothing more to recognize. Each
+    marked page gets a DPI from its size.
+
+    Stops after ``max_pages`` pages, once ``max_chars`` characters have been
+    collected, or at the first page after a totals line that does not carry
+    on with the item table (no repeated table header), since the rest of a
+    PO is usually terms and conditions. Per-page totals on a multi-page
+    table do not stop it. Blocking: run it in a worker thread.
+    """
+    reader = PdfReader(io.BytesIO(pdf_data))
+    if reader.is_encrypted:
+        # Many POs are "encrypted" with an empty owner password only.
+        reader.decrypt("")
+    result = PdfText(page_count=len(reader.pages))
+    collected = 0
+    totals_seen = False
+    for index in range(min(result.page_count, max_pages)):
+        page = reader.pages[index]
+        text = page.extract_text() or ""
+        width, height, has_images = _page_info(page)
+        chars = len(text.strip())
+        area = max(width * height / POINTS_PER_INCH ** 2, 1.0)
+        if has_images and (chars < min_chars or chars / area < min_density):
+            # A scan: whether it continues the table is only known after OCR.
+            result.pages.append(text)
+            result.ocr_pages[index + 1] = choose_dpi(width, height, target_pixels, min_dpi, max_dpi)
+            continue
+        if totals_seen and not TABLE_HINT.search(text):
+            result.stopped_early = True
+            break
+        result.pages.append(text)
+        collected += len(text)
+        if collected >= max_chars:
+            result.stopped_early = index + 1 < result.page_count
+            break
+        totals_seen = bool(ORDER_END.search(text))
+    return result
+
+def extract_layout_text(pdf_data: bytes, page_count: int) -> List[str]:
+    """Text of the first ``page_count`` pages with their horizontal layout kept.
+
+    Columns stay at their character positions, which is what table parsing
+    needs; it is slower and much wider than plain extraction, so it is only
+    run on PDFs that look tabular. Blocking: run it in a worker thread.
+    """
+    reader = PdfReader(io.BytesIO(pdf_data))
+    if reader.is_encrypted:
+        reader.decrypt("")
+    return [reader.pages[index].extract_text(extraction_mode="layout") or "" for index in range(min(page_count, len(reader.pages)))]
@@ -0,0 +1,77 @@
+"""Prompts used for order extraction.
+
+Bump ``PROMPT_VERSION`` whenever a prompt changes: it is part of the
+extraction cache key, so cached results from an older prompt are not reused.
+"""
+
+PROMPT_VERSION = "2024-07-01-structured"
+
+# UOM abbreviations the prompt asks for, with the words salesmen use for them.
+UOM_ALIASES = {
+    "CTN": ["ctn", "ctns", "carton", "cartons"],
+    "PKT": ["pkt", "pkts", "packet", "packets", "pack", "packs"],
+    "KG": ["kg", "kgs", "kilo", "kilos", "kilogram", "kilograms"],
+    "GM": ["gm", "gms", "g", "gram", "grams"],
+    "LTR": ["ltr", "ltrs", "l", "litre", "litres", "liter", "liters"],
+    "BTL": ["btl", "btls", "bottle", "bottles"],
+    "PCS": ["pcs", "pc", "piece", "pieces"],
+    "BOX": ["box", "boxes"],
+}
+
+_ORDER_RULES = """Rules:
+
+Always call the record_order function; never answer in prose.
+Add one entry to items for every product ordered, with specific product names, sizes and variants.
+Translate product names to standard English names (e.g. "Badam" → "Almond", "Kaju" → "Cashew", "Pista" → "Pistachio").
+Convert quantities written in words or in any language or numeral system to numbers.
+Use one of these UOM codes: CTN (Cartons), PKT (Packets), KG (Kilograms), GM (Grams), LTR (Liters), BTL (Bottles), PCS (Pieces), BOX (Boxes).
+Set rate only when a price is mentioned, with its currency code (₹/rupees → INR, dirhams → AED); otherwise leave it null.
+Put the customer name in customer_name and any special instructions in instructions.
+If the message contains no order, call record_order with an empty items list.
+"""
+
+TEXT_ORDER_PROMPT = (
+    "You are a sales agent at Better Grow FMCG company in Dubai. You process customer order "
+    "messages that may be in English, Arabic, Malayalam, or Hindi and record them in English.\n" + _ORDER_RULES
+)
+
+IMAGE_ORDER_PROMPT = (
+    "You work at an FMCG company and take care of new orders. Salesmen send you WhatsApp images of "
+    "the things they need; look at the image and record the order details in English.\n" + _ORDER_RULES
+)
+
+IMAGE_USER_INSTRUCTION = "Please analyze this image and extract any order details you can find."
+
+ORDER_TOOL_NAME = "record_order"
+
+ORDER_TOOL = {
+    "type": "function",
+    "function": {
+        "name": ORDER_TOOL_NAME,
+        "description": "Record the order extracted from the customer's message.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "items": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "item_name": {"type": "string"},
+                            "quantity": {"type": "number"},
+                            "uom": {"type": "string", "enum": list(UOM_ALIASES)},
+                            "rate": {"type": ["number", "null"]},
+                            "currency": {"type": ["string", "null"]},
+                        },
+                        "required": ["item_name", "quantity", "uom"],
+                    },
+                },
+                "customer_name": {"type": ["string", "null"]},
+                "instructions": {"type": ["string", "null"]},
+            },
+            "required": ["items"],
+        },
+    },
+}
+
+ORDER_TOOL_CHOICE = {"type": "function", "function": {"name": ORDER_TOOL_NAME}}
@@ -0,0 +1,208 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+import structlog
+from openai import APIConnectionError, InternalServerError, RateLimitError
+from src.core.metrics import metrics
+
+T = TypeVar("T")
+
+# Rough chars-per-token ratio for English/Latin text; only used for budgeting.
+CHARS_PER_TOKEN = 4
+# Tokens billed for one image at "high" detail (a 512px tile grid); "low" detail is a flat 85.
+IMAGE_TOKENS = {"low": 85, "high": 765, "auto": 765}
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def estimate_prompt_tokens(messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]] = None) -> int:
+    """Cheap upper-ish estimate of the prompt tokens of a chat request."""
+    chars = 0
+    images = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    chars += len(part.get("text", ""))
+                elif part.get("type") == "image_url":
+                    images += IMAGE_TOKENS.get(part.get("image_url", {}).get("detail", "auto"), 765)
+    if tools:
+        chars += len(repr(tools))
+    return chars // CHARS_PER_TOKEN + images + MESSAGE_OVERHEAD_TOKENS * len(messages)
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay requested by a 429 response, from the Retry-After(-ms) headers."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+class TokenBucket:
+    """Continuously refilling bucket of ``capacity`` units per minute."""
+
+    def __init__(self, capacity: float):
+        self.capacity = max(float(capacity), 1.0)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` units are available (0 if they are now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def refund(self, amount: float) -> None:
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+class _ModelBudget:
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        # asyncio.Lock wakes waiters in FIFO order, which is what makes the queue fair.
+        self.lock = asyncio.Lock()
+        self.paused_until = 0.0
+        self.queued = 0
+
+class OpenAIRateLimiter:
+    """Client-side RPM/TPM budgeting for OpenAI calls, shared by everything in the process.
+
+    Each model gets a request bucket and a token bucket sized from
+    ``limits`` (``{model: [rpm, tpm]}``, falling back to the defaults).
+    ``run`` waits its turn in a per-model FIFO queue until both buckets
+    can cover the request, then makes the call. A 429 pauses the model's
+    queue for the Retry-After the API asked for (or an exponential
+    backoff with jitter) and the call is retried, up to ``max_retries``;
+    connection errors and 5xx responses are retried with the same backoff
+    without pausing the queue. The OpenAI client's own retries should be
+    disabled so they do not bypass the queue.
+    Limits are per process, so size them for the number of API and
+    worker processes sharing the account.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, List[int]]] = None,
+        default_rpm: int = 500,
+        default_tpm: int = 60000,
+        max_retries: int = 5,
+        backoff_base_seconds: float = 1.0,
+        backoff_max_seconds: float = 30.0,
+    ):
+        self.limits = limits or {}
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._budgets: Dict[str, _ModelBudget] = {}
+        self.logger = structlog.get_logger(__name__)
+
+    def _budget(self, model: str) -> _ModelBudget:
+        budget = self._budgets.get(model)
+        if budget is None:
+            rpm, tpm = (self.limits.get(model) or [self.default_rpm, self.default_tpm])[:2]
+            budget = self._budgets[model] = _ModelBudget(rpm, tpm)
+        return budget
+
+    async def acquire(self, model: str, tokens: int = 0) -> None:
+        """Wait (in FIFO order) until ``model`` has budget for one request of ``tokens`` tokens."""
+        budget = self._budget(model)
+        started = time.perf_counter()
+        budget.queued += 1
+        metrics.set_gauge(f"ratelimit.{model}.queued", budget.queued)
+        try:
+            async with budget.lock:
+                throttled = False
+                while True:
+                    wait = max(
+                        budget.paused_until - time.monotonic(),
+                        budget.requests.wait_time(1),
+                        budget.tokens.wait_time(tokens),
+                    )
+                    if wait <= 0:
+                        break
+                    throttled = True
+                    await asyncio.sleep(wait)
+                budget.requests.consume(1)
+                budget.tokens.consume(tokens)
+        finally:
+            budget.queued -= 1
+            metrics.set_gauge(f"ratelimit.{model}.queued", budget.queued)
+        if throttled:
+            metrics.increment(f"ratelimit.{model}.throttled")
+        metrics.observe(f"ratelimit.{model}.wait_ms", (time.perf_counter() - started) * 1000)
+
+    def settle(self, model: str, estimated_tokens: int, usage: Any) -> None:
+        """Return the unused part of a token estimate once the real usage is known."""
+        total = getattr(usage, "total_tokens", None) if usage is not None else None
+        if total is not None and total < estimated_tokens:
+            self._budget(model).tokens.refund(estimated_tokens - total)
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+    def _pause(self, model: str, error: Exception, attempt: int) -> float:
+        delay = retry_after_seconds(error)
+        if delay is None:
+            delay = self._backoff(attempt)
+        budget = self._budget(model)
+        budget.paused_until = max(budget.paused_until, time.monotonic() + delay)
+        return delay
+
+    async def run(self, model: str, tokens: int, call: Callable[[], Awaitable[T]]) -> T:
+        """Make ``call()`` within ``model``'s budget, retrying 429s."""
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(model, tokens)
+            try:
+                result = await call()
+            except RateLimitError as e:
+                metrics.increment(f"ratelimit.{model}.429")
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._pause(model, e, attempt)
+                metrics.increment(f"ratelimit.{model}.retries")
+                self.logger.warning("openai_rate_limited_backing_off", model=model, attempt=attempt + 1, delay=round(delay, 2))
+                continue
+            except (APIConnectionError, InternalServerError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                metrics.increment(f"ratelimit.{model}.retries")
+                self.logger.warning("openai_call_failed_retrying", model=model, attempt=attempt + 1, delay=round(delay, 2), error=str(e))
+                await asyncio.sleep(delay)
+                continue
+            self.settle(model, tokens, getattr(result, "usage", None))
+            return result
+        raise RuntimeError("unreachable")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        now = time.monotonic()
+        return {
+            model: {
+                "queued": budget.queued,
+                "requests_available": round(budget.requests.level, 1),
+                "tokens_available": round(budget.tokens.level, 1),
+                "paused_for_seconds": round(max(budget.paused_until - now, 0.0), 2),
+            }
+            for model, budget in self._budgets.items()
+        }
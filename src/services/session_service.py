@@ -86,19 +86,11 @@ class SessionService:
         session = self.get_session_by_phone(phone_number)
         
         if not session:
-            # Create new session
-            session_data = SessionCreate(
-                phone_number=phone_number,
-                initial_message=content if direction == MessageDirection.INBOUND else None
-            )
-            session = self.create_session(session_data)
-            
-            # If this is an outbound message, add it to the new session
-            if direction == MessageDirection.OUTBOUND:
-                self._add_message_to_session(session, content, message_type, direction, metadata)
-        else:
-            # Add message to existing session
-            self._add_message_to_session(session, content, message_type, direction, metadata)
+            # Create new session; the message is added below so that its
+            # type and metadata are kept.
+            session = self.create_session(SessionCreate(phone_number=phone_number))
+        
+        self._add_message_to_session(session, content, message_type, direction, metadata)
         
         return session
     
@@ -0,0 +1,244 @@
+import argparse
+import asyncio
+import signal
+import time
+from typing import List, Optional, Set
+import structlog
+from src.config.settings import get_settings
+from src.core.container import Container
+from src.core.logging import setup_logging
+from src.core.metrics import metrics
+from src.models.job import Job
+from src.models.webhook import InboundMessage
+from src.services.burst_coalescer import BurstCoalescer
+from src.services.dedup_store import DedupStore
+from src.services.job_queue import JobQueue
+from src.services.lane_scheduler import LaneScheduler
+from src.services.order_processor import OrderProcessor
+from src.services.session_service import SessionService
+
+class Worker:
+    """Consumes inbound jobs from the queue and runs the order pipeline.
+
+    Jobs are dispatched into per-sender lanes: messages from one sender are
+    processed strictly in stream order, while different senders run in
+    parallel up to ``concurrency`` jobs at once. At most ``prefetch`` jobs
+    are held in memory. Ordering holds within one worker process; run more
+    processes only when cross-process ordering does not matter.
+
+    Held jobs stay pending in the consumer group while they wait for their
+    lane, so their idle time is reset every third of the queue's claim
+    timeout; otherwise another worker would reclaim (or dead-letter) jobs
+    that are merely queued here.
+
+    When a ``session_service`` is given, text-only messages are first held
+    in a per-sender burst (see ``BurstCoalescer``) so that several short
+    lines sent seconds apart become one extraction and one reply. Expired
+    sessions are dropped every ``session_cleanup_interval_seconds``.
+
+    A job is acked only after the pipeline finished; if processing raises,
+    the job stays pending and is picked up again by the periodic reclaim
+    once it has been idle for the queue's claim timeout.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        processor: OrderProcessor,
+        dedup_store: Optional[DedupStore] = None,
+        session_service: Optional[SessionService] = None,
+        burst_window_seconds: float = 0.0,
+        burst_max_wait_seconds: float = 15.0,
+        burst_max_messages: int = 10,
+        concurrency: int = 4,
+        prefetch: int = 32,
+        block_ms: int = 5000,
+        reclaim_interval_seconds: float = 30.0,
+        metrics_interval_seconds: float = 60.0,
+        session_cleanup_interval_seconds: float = 600.0,
+    ):
+        self.queue = queue
+        self.processor = processor
+        self.dedup_store = dedup_store
+        self.concurrency = max(concurrency, 1)
+        self.prefetch = max(prefetch, self.concurrency)
+        self.scheduler = LaneScheduler(self.concurrency)
+        self.session_service = session_service
+        self.coalescer = None
+        if session_service and burst_window_seconds > 0:
+            self.coalescer = BurstCoalescer(
+                session_service,
+                on_flush=self._dispatch,
+                window_seconds=burst_window_seconds,
+                max_wait_seconds=burst_max_wait_seconds,
+                max_messages=burst_max_messages,
+            )
+        self.block_ms = block_ms
+        self.reclaim_interval_seconds = reclaim_interval_seconds
+        self.metrics_interval_seconds = metrics_interval_seconds
+        self.session_cleanup_interval_seconds = session_cleanup_interval_seconds
+        self.logger = structlog.get_logger(__name__)
+        self._in_flight: Set[str] = set()
+        self._stopping = asyncio.Event()
+        self._last_reclaim = 0.0
+        self._last_metrics_log = time.monotonic()
+        self._last_session_cleanup = time.monotonic()
+
+    def stop(self) -> None:
+        self.logger.info("worker_stopping", **self.scheduler.stats())
+        self._stopping.set()
+
+    async def run(self) -> None:
+        await self.queue.ensure_group()
+        self.logger.info("worker_started", consumer=self.queue.consumer, concurrency=self.concurrency)
+        keep_alive = asyncio.create_task(self._keep_alive())
+        while not self._stopping.is_set():
+            free_slots = self.prefetch - self.scheduler.pending - self._buffered()
+            if free_slots <= 0:
+                await self.scheduler.wait_for_progress()
+                continue
+            try:
+                self._log_metrics_if_due()
+                self._cleanup_sessions_if_due()
+                jobs = await self._reclaim_if_due(free_slots)
+                if not jobs:
+                    jobs = await self.queue.read(count=free_slots, block_ms=self.block_ms)
+            except Exception as e:
+                self.logger.error("worker_read_failed", error=str(e))
+                await asyncio.sleep(1)
+                continue
+            for job in jobs:
+                if job.job_id in self._in_flight:
+                    # Reclaimed from ourselves while still running; leave it be.
+                    continue
+                self._in_flight.add(job.job_id)
+                if self.coalescer and self.coalescer.accepts(job.message):
+                    self.coalescer.add(job)
+                    continue
+                if self.coalescer:
+                    # Keep the sender's earlier texts ahead of this message.
+                    self.coalescer.flush(job.message.from_number)
+                self._dispatch([job], job.message)
+
+        if self.coalescer:
+            self.coalescer.flush_all()
+        await self.scheduler.drain()
+        keep_alive.cancel()
+        self.logger.info("worker_stopped")
+
+    def _log_metrics_if_due(self) -> None:
+        """The worker has no HTTP endpoint, so its metrics are reported in the log."""
+        now = time.monotonic()
+        if now - self._last_metrics_log < self.metrics_interval_seconds:
+            return
+        self._last_metrics_log = now
+        self.logger.info("worker_metrics", **metrics.snapshot())
+
+    def _cleanup_sessions_if_due(self) -> None:
+        if not self.session_service:
+            return
+        now = time.monotonic()
+        if now - self._last_session_cleanup < self.session_cleanup_interval_seconds:
+            return
+        self._last_session_cleanup = now
+        self.session_service.cleanup_expired_sessions()
+
+    async def _reclaim_if_due(self, count: int) -> list:
+        now = time.monotonic()
+        if now - self._last_reclaim < self.reclaim_interval_seconds:
+            return []
+        self._last_reclaim = now
+        return await self.queue.reclaim_stuck(count=count, skip=self._in_flight)
+
+    async def _keep_alive(self) -> None:
+        """Keep jobs held by this worker (queued in a lane, buffered or running) from going idle."""
+        interval = self.queue.claim_idle_ms / 3000
+        while True:
+            await asyncio.sleep(interval)
+            if not self._in_flight:
+                continue
+            try:
+                await self.queue.touch(list(self._in_flight))
+            except Exception as e:
+                self.logger.warning("worker_keep_alive_failed", held=len(self._in_flight), error=str(e))
+
+    def _buffered(self) -> int:
+        return self.coalescer.buffered if self.coalescer else 0
+
+    def _dispatch(self, jobs: List[Job], message: InboundMessage) -> None:
+        """Queue ``message`` on its sender's lane; ``jobs`` are acked once it is processed."""
+        self.scheduler.submit(message.from_number, lambda: self._handle(jobs, message))
+
+    async def _handle(self, jobs: List[Job], message: InboundMessage) -> None:
+        logger = self.logger.bind(job_ids=[job.job_id for job in jobs], from_number=message.from_number)
+        started = time.monotonic()
+        try:
+            # Model failures are retried while redeliveries remain; the last attempt replies with the error.
+            retry_failures = all(job.delivery_count < self.queue.max_deliveries for job in jobs)
+            outcome = await self.processor.process(message, retry_failures=retry_failures)
+            for job in jobs:
+                await self.queue.ack(job)
+        except Exception as e:
+            logger.error("job_failed", error=str(e), delivery_counts=[job.delivery_count for job in jobs])
+            for job in jobs:
+                if job.delivery_count >= self.queue.max_deliveries:
+                    await self.queue.dead_letter(job, reason=str(e))
+                    await self._record_outcome(job, {"status": "dead_lettered", "error": str(e)})
+            return
+        finally:
+            for job in jobs:
+                self._in_flight.discard(job.job_id)
+        for job in jobs:
+            await self._record_outcome(job, outcome)
+        logger.info(
+            "job_completed",
+            status=outcome.get("status"),
+            duration_ms=round((time.monotonic() - started) * 1000),
+            messages=len(jobs),
+        )
+
+    async def _record_outcome(self, job: Job, outcome: dict) -> None:
+        if not self.dedup_store or not job.message.message_sid:
+            return
+        try:
+            await self.dedup_store.complete(job.message.message_sid, outcome)
+        except Exception as e:
+            self.logger.warning("dedup_record_failed", job_id=job.job_id, error=str(e))
+
+async def run_worker(concurrency: Optional[int] = None) -> None:
+    settings = get_settings()
+    container = Container()
+    worker = Worker(
+        queue=container.job_queue,
+        processor=container.order_processor,
+        dedup_store=container.dedup_store,
+        session_service=container.session_service,
+        burst_window_seconds=settings.BURST_WINDOW_SECONDS,
+        burst_max_wait_seconds=settings.BURST_MAX_WAIT_SECONDS,
+        burst_max_messages=settings.BURST_MAX_MESSAGES,
+        concurrency=concurrency or settings.WORKER_CONCURRENCY,
+        prefetch=settings.WORKER_PREFETCH,
+        block_ms=settings.WORKER_BLOCK_MS,
+        reclaim_interval_seconds=settings.WORKER_RECLAIM_INTERVAL_SECONDS,
+        metrics_interval_seconds=settings.WORKER_METRICS_INTERVAL_SECONDS,
+        session_cleanup_interval_seconds=settings.WORKER_SESSION_CLEANUP_INTERVAL_SECONDS,
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        container.ocr_service.shutdown()
+        await container.media_fetcher.close()
+        await container.job_queue.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Shipra inbound order worker")
+    parser.add_argument("--concurrency", type=int, default=None, help="Jobs processed in parallel (default: WORKER_CONCURRENCY)")
+    args = parser.parse_args()
+    setup_logging()
+    asyncio.run(run_worker(args.concurrency))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+from src.services.chunker import chunk_sections, estimate_tokens, split_in_half
+
+ROWS = [f"{number}. Almond 250g  PKT  {number}  12.50" for number in range(1, 41)]
+
+def test_small_sections_share_a_chunk():
+    assert chunk_sections(["page one", "", "page two"], 100) == ["page one\npage two"]
+
+def test_large_section_is_split_between_lines():
+    page = "\n".join(ROWS)
+    chunks = chunk_sections([page], 60)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 60 for chunk in chunks)
+    # Every row lands in exactly one chunk, whole and in order.
+    assert [line for chunk in chunks for line in chunk.splitlines()] == ROWS
+
+def test_next_section_starts_a_fresh_chunk_after_a_split_page():
+    page = "\n".join(ROWS[:10])
+    chunks = chunk_sections([page, "Customer: Empire"], 60)
+    assert chunks[-1] == "Customer: Empire"
+
+def test_split_in_half_keeps_every_line_once():
+    text = "\n".join(ROWS[:7])
+    first, second = split_in_half(text)
+    assert first.splitlines() + second.splitlines() == ROWS[:7]
+    assert abs(len(first) - len(second)) < len(ROWS[0]) * 2
+
+def test_single_line_is_not_split():
+    assert split_in_half(ROWS[0]) == [ROWS[0]]
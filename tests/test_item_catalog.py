@@ -0,0 +1,71 @@
+import random
+import time
+from src.services.item_catalog import SIZE_MISMATCH_FACTOR, SIZE_MISSING_FACTOR, ItemCatalog, trigrams
+
+PRODUCTS = ["Almond", "Cashew", "Pistachio", "Walnut", "Raisin", "Dates", "Fig", "Apricot", "Hazelnut", "Peanut", "Prune", "Cranberry", "Pine Nut", "Macadamia", "Brazil Nut"]
+GRADES = ["Gurbandi", "Mamra", "California", "W320", "W240", "Salted", "Roasted", "Raw", "Jumbo", "Golden", "Black", "Kimia", "Medjool", "Afghani", "Iranian", "Premium", "Organic", "Plain", "Honey", "Peri Peri"]
+SIZES = ["100g", "250g", "500g", "1kg", "2kg", "5kg", ""]
+
+def dry_fruit_catalog(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    seen = set()
+    items = []
+    while len(items) < count:
+        name = " ".join(part for part in (rng.choice(PRODUCTS), *rng.sample(GRADES, rng.randint(1, 2)), rng.choice(SIZES)) if part)
+        if name in seen:
+            continue
+        seen.add(name)
+        items.append({"item_code": f"DF-{len(items):05d}", "item_name": name})
+    return items
+
+def with_typo(name: str, rng: random.Random) -> str:
+    letters = [index for index, char in enumerate(name) if char.isalpha()]
+    index = rng.choice(letters)
+    return name[:index] + rng.choice("abcdefghijklmnopqrstuvwxyz".replace(name[index].lower(), "")) + name[index + 1:]
+
+def brute_force(catalog: ItemCatalog, name: str):
+    words, size = catalog.normalize(name)
+    query = trigrams(words)
+    best = None
+    for entry_id, entry in enumerate(catalog.entries):
+        score = 2 * len(query & entry.trigrams) / (len(query) + len(entry.trigrams))
+        if size is not None and entry.size is not None and abs(size - entry.size) > 1e-6:
+            score *= SIZE_MISMATCH_FACTOR
+        elif (size is None) != (entry.size is None):
+            score *= SIZE_MISSING_FACTOR
+        if score >= catalog.min_score and (best is None or score > best[0]):
+            best = (score, entry_id)
+    return catalog.entries[best[1]].item_code if best else None
+
+def test_search_matches_brute_force_scan():
+    items = dry_fruit_catalog(3000)
+    catalog = ItemCatalog()
+    catalog.load(items)
+    rng = random.Random(11)
+    queries = [with_typo(item["item_name"], rng) for item in rng.sample(items, 200)]
+    mismatches = []
+    for name in queries:
+        match = catalog.match(name)
+        if (match.item_code if match else None) != brute_force(catalog, name):
+            mismatches.append(name)
+    assert mismatches == []
+
+def test_typo_resolves_to_item():
+    catalog = ItemCatalog(synonyms={"pista": "Pistachio"})
+    catalog.load([{"item_code": "PG-500", "item_name": "Pistachio Gurbandi 500g"}, {"item_code": "PG-1K", "item_name": "Pistachio Gurbandi 1kg"}])
+    assert catalog.match("pistechio gurbandi 500g").item_code == "PG-500"
+    assert catalog.match("Pista Gurbandi 1 kg").item_code == "PG-1K"
+
+def test_fuzzy_lookup_stays_under_a_millisecond_on_5000_items():
+    items = dry_fruit_catalog(5000)
+    catalog = ItemCatalog()
+    catalog.load(items)
+    rng = random.Random(3)
+    queries = [with_typo(item["item_name"], rng) for item in rng.sample(items, 300)]
+    per_line = []
+    for _ in range(3):
+        started = time.perf_counter()
+        for query in queries:
+            catalog.search(query, k=1, min_score=catalog.min_score)
+        per_line.append((time.perf_counter() - started) / len(queries))
+    assert min(per_line) < 0.001
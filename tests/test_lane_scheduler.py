@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from src.services.lane_scheduler import LaneScheduler
+
+def test_work_in_one_lane_runs_in_submission_order():
+    async def scenario():
+        scheduler = LaneScheduler(max_concurrency=4)
+        finished = []
+
+        def work(label, delay):
+            async def run():
+                await asyncio.sleep(delay)
+                finished.append(label)
+                return label
+            return run
+
+        # Later items are faster, so any overlap within the lane would reorder them.
+        futures = [scheduler.submit("+971500000001", work(label, delay)) for label, delay in [("text", 0.03), ("photo", 0.01), ("correction", 0)]]
+        results = await asyncio.gather(*futures)
+        await scheduler.drain()
+        return finished, results, scheduler.active_lanes
+
+    finished, results, active_lanes = asyncio.run(scenario())
+    assert finished == results == ["text", "photo", "correction"]
+    assert active_lanes == 0
+
+def test_lanes_run_in_parallel_up_to_the_concurrency_cap():
+    async def scenario():
+        scheduler = LaneScheduler(max_concurrency=2)
+        running = peak = 0
+
+        async def work():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await asyncio.gather(*(scheduler.submit(f"sender-{number}", work) for number in range(5)))
+        return peak
+
+    assert asyncio.run(scenario()) == 2
+
+def test_a_failure_does_not_stop_the_lane():
+    async def scenario():
+        scheduler = LaneScheduler(max_concurrency=1)
+
+        async def fail():
+            raise ValueError("bad message")
+
+        async def succeed():
+            return "ok"
+
+        failed = scheduler.submit("sender", fail)
+        succeeded = scheduler.submit("sender", succeed)
+        with pytest.raises(ValueError):
+            await failed
+        return await succeeded, scheduler.pending
+
+    assert asyncio.run(scenario()) == ("ok", 0)
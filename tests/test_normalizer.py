@@ -0,0 +1,17 @@
+from src.services.normalizer import OrderTextNormalizer
+
+def test_digits_in_other_scripts_become_ascii():
+    normalizer = OrderTextNormalizer()
+    assert normalizer.normalize("٣ ctn almond\n५ pkt cashew\n൭ kg dates") == "3 ctn almond\n5 pkt cashew\n7 kg dates"
+
+def test_emoji_and_whitespace_are_collapsed():
+    normalizer = OrderTextNormalizer()
+    text = "  3 ctn   almond 👍🏻 ,\n\n\n2 pkt\tcashew ✅️  "
+    assert normalizer.normalize(text) == "3 ctn almond,\n2 pkt cashew"
+
+def test_arabic_punctuation_is_folded():
+    assert OrderTextNormalizer().normalize("2٫5 kg almond، 3 ctn dates") == "2.5 kg almond, 3 ctn dates"
+
+def test_synonyms_replace_whole_words_only():
+    normalizer = OrderTextNormalizer({"badam": "Almond", "kaju": "Cashew"})
+    assert normalizer.normalize("3 ctn BADAM, 2 pkt kaju, 1 kg badamii") == "3 ctn Almond, 2 pkt Cashew, 1 kg badamii"
@@ -0,0 +1,58 @@
+import json
+from src.services.order_format import OrderStreamParser, merge_orders
+from src.models.order import OrderDetails, OrderLineItem
+
+ARGUMENTS = json.dumps({
+    "items": [
+        {"item_name": "Almond {Premium}", "quantity": 3, "uom": "CTN", "rate": None},
+        {"item_name": "Cashew \"W320\"", "quantity": 2, "uom": "PKT", "rate": 45.5, "currency": "AED"},
+        {"item_name": "Dates [Medjool]", "quantity": 1, "uom": "BOX"},
+    ],
+    "customer_name": "Empire Restaurant",
+})
+
+def feed_in_pieces(size: int):
+    parser = OrderStreamParser()
+    arrivals = []
+    for start in range(0, len(ARGUMENTS), size):
+        for item in parser.feed(ARGUMENTS[start:start + size]):
+            arrivals.append((item.item_name, start + size))
+    return parser, arrivals
+
+def test_stream_parser_emits_each_item_when_it_closes():
+    for size in (1, 2, 3, 7, 16, len(ARGUMENTS)):
+        parser, arrivals = feed_in_pieces(size)
+        assert [name for name, _ in arrivals] == ["Almond {Premium}", "Cashew \"W320\"", "Dates [Medjool]"]
+        order = parser.result()
+        assert order.customer_name == "Empire Restaurant"
+        assert [item.item_name for item in order.items] == [name for name, _ in arrivals]
+
+def test_stream_parser_emits_items_before_the_stream_ends():
+    _, arrivals = feed_in_pieces(5)
+    first_closes = ARGUMENTS.index("}, {") + 1
+    assert arrivals[0][1] - 5 < first_closes <= arrivals[0][1]
+
+def test_stream_parser_keeps_items_of_a_cut_off_stream():
+    parser = OrderStreamParser()
+    cut = ARGUMENTS.index("Dates")
+    parser.feed(ARGUMENTS[:cut])
+    order = parser.result()
+    assert [item.item_name for item in order.items] == ["Almond {Premium}", "Cashew \"W320\""]
+
+def test_merge_orders_keeps_source_order_and_joins_customers():
+    first = OrderDetails(items=[OrderLineItem(item_name="Almond", quantity=3, uom="CTN")], customer_name="Empire")
+    second = OrderDetails(items=[OrderLineItem(item_name="Cashew", quantity=2, uom="PKT")], customer_name="Al Noor")
+    merged = merge_orders([first, second])
+    assert [item.item_name for item in merged.items] == ["Almond", "Cashew"]
+    assert merged.customer_name == "Empire, Al Noor"
+
+def test_merge_orders_drops_only_a_row_repeated_across_a_chunk_boundary():
+    almond = OrderLineItem(item_name="Almond", quantity=3, uom="CTN")
+    cashew = OrderLineItem(item_name="Cashew", quantity=2, uom="PKT")
+    dates = OrderLineItem(item_name="Dates", quantity=1, uom="BOX")
+    first = OrderDetails(items=[almond, cashew, almond, cashew])
+    second = OrderDetails(items=[cashew, dates, almond])
+    merged = merge_orders([first, second], dedupe_boundaries=True)
+    # The repeated PO lines stay; only the boundary row read by both chunks is dropped.
+    assert [item.item_name for item in merged.items] == ["Almond", "Cashew", "Almond", "Cashew", "Dates", "Almond"]
+    assert len(merge_orders([first, second]).items) == 7
@@ -0,0 +1,43 @@
+import pytest
+from src.services.order_parser import FastPathOrderParser
+
+@pytest.fixture
+def parser():
+    return FastPathOrderParser()
+
+def test_items_with_trailing_customer(parser):
+    order = parser.parse("3 ctn almond, 2 pkt cashew for Empire Restaurant")
+    assert [(item.item_name, item.quantity, item.uom) for item in order.items] == [("Almond", 3, "CTN"), ("Cashew", 2, "PKT")]
+    assert order.customer_name == "Empire Restaurant"
+
+def test_word_orders_and_rate(parser):
+    order = parser.parse("almond - 3 ctn\n22 cashew packets\n5 kg raisins at 20 aed")
+    assert [(item.item_name, item.quantity, item.uom) for item in order.items] == [
+        ("Almond", 3, "CTN"), ("Cashew", 22, "PKT"), ("Raisin", 5, "KG")
+    ]
+    assert (order.items[2].rate, order.items[2].currency) == (20, "AED")
+
+def test_customer_line(parser):
+    order = parser.parse("3 ctn almond\ncustomer: Al Noor Stores")
+    assert order.customer_name == "Al Noor Stores"
+
+@pytest.mark.parametrize("text", [
+    "3 ctn almond for tomorrow",
+    "2 pkt cashew for delivery tomorrow",
+    "3 ctn almond\nfor tomorrow morning",
+])
+def test_time_words_are_not_a_customer(parser, text):
+    assert parser.parse(text) is None
+
+@pytest.mark.parametrize("text", [
+    "send 5 kg raisins asap",
+    "3 ctn almond please",
+    "2 box dates urgently",
+    "3 ctn same almond",
+])
+def test_filler_around_items_goes_to_the_model(parser, text):
+    assert parser.parse(text) is None
+
+@pytest.mark.parametrize("text", ["hi", "what is the price of almonds?", "3 almonds", "0 ctn almond"])
+def test_unparseable_messages(parser, text):
+    assert parser.parse(text) is None
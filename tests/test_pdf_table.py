@@ -0,0 +1,54 @@
+import pytest
+from src.services.pdf_table import PdfTableParser
+
+HEADER = "S No   Item Description          Item Code    Qty   UOM    Rate (AED)    Amount"
+
+@pytest.fixture
+def parser():
+    return PdfTableParser()
+
+def test_reads_rows_under_their_columns(parser):
+    page = "\n".join([
+        "Customer Name: Empire Restaurant",
+        "",
+        HEADER,
+        "1      Almond California 250g    ALM-250      10    CTN    12.50         125.00",
+        "2      Cashew W320               CSH-320      4     PKT    20.00         80.00",
+        "                                              Grand Total                205.00",
+    ])
+    order = parser.parse([page])
+    assert [(item.item_name, item.quantity, item.uom, item.rate, item.currency, item.customer_item_code) for item in order.items] == [
+        ("Almond California 250g", 10, "CTN", 12.5, "AED", "ALM-250"),
+        ("Cashew W320", 4, "PKT", 20.0, "AED", "CSH-320"),
+    ]
+    assert order.customer_name == "Empire Restaurant"
+
+def test_wrapped_description_joins_its_row(parser):
+    page = "\n".join([
+        HEADER,
+        "1      Dates Medjool Premium     DTS-1        2     BOX    30.00         60.00",
+        "       Jumbo Size",
+        "Total                                                                    60.00",
+    ])
+    order = parser.parse([page])
+    assert [item.item_name for item in order.items] == ["Dates Medjool Premium Jumbo Size"]
+
+def test_repeated_header_on_the_next_page_continues_the_table(parser):
+    first = "\n".join([HEADER, "1      Almond 250g               ALM-250      10    CTN    12.50         125.00", "Sub Total   125.00"])
+    second = "\n".join([HEADER, "2      Cashew W320               CSH-320      4     PKT    20.00         80.00"])
+    order = parser.parse([first, second])
+    assert [item.item_name for item in order.items] == ["Almond 250g", "Cashew W320"]
+
+@pytest.mark.parametrize("row", [
+    # Amount is not qty x rate (discount or misread column).
+    "1      Almond 250g               ALM-250      10    CTN    12.50         100.00",
+    # Unknown unit.
+    "1      Almond 250g               ALM-250      10    DRUM   12.50         125.00",
+    # Non-numeric quantity.
+    "1      Almond 250g               ALM-250      ten   CTN    12.50         125.00",
+])
+def test_rows_it_cannot_account_for_send_the_pdf_to_the_model(parser, row):
+    assert parser.parse([f"{HEADER}\n{row}"]) is None
+
+def test_no_table_header(parser):
+    assert parser.parse(["Please send 10 ctn almond and 4 pkt cashew"]) is None